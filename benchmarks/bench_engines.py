@@ -0,0 +1,152 @@
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import warnings
+
+import pandas as pd
+
+from preprocessing.s1_loading.loading import load_data
+from preprocessing.pipeline.engine import Pipeline, ENGINES
+from preprocessing.pipeline.stages import preprocessing_stages
+from preprocessing.pipeline.instrumentation import PipelineTracer
+from preprocessing.pipeline.full_preprocessing import full_preprocessing
+from preprocessing.pipeline.chunked_preprocessing import full_preprocessing_chunked
+
+from benchmarks.bench_stages import dataset_path
+
+# -------------------------------------------------
+# Purpose of this file:
+# -------------------------------------------------
+# Compare the "pandas" and "pyarrow" engines of the pipeline
+# (preprocessing/pipeline/arrow_engine.py):
+#   - parity: the cleaned DataFrame must be identical (values, NaN, dtypes,
+#     column order) on the repository datasets, in the default, categorical
+#     and chunked modes, and on every benchmarked size
+#   - speed: per-stage wall time of both engines on generated datasets
+#
+#   python -m benchmarks.bench_engines --parity
+#   python -m benchmarks.bench_engines --sizes 100000 1000000
+
+
+PARITY_FILES = [
+    "data/morocco_ecommerce.csv",
+    "data/morocco_ecommerce.xlsx",
+    "data/morocco_ecommerce_anomalies.xlsx",
+]
+
+
+def assert_same_frame(left, right, label):
+    try:
+        pd.testing.assert_frame_equal(left, right, check_exact=True)
+    except AssertionError as error:
+        raise AssertionError(f"{label}: engines differ\n{error}") from None
+
+
+def run_quietly(func, *args, **kwargs):
+    """Run func in a temporary folder (analysis plots), without its prints and warnings."""
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                return func(*args, **kwargs)
+        finally:
+            os.chdir(cwd)
+
+
+def check_parity(paths=PARITY_FILES, chunksize=700):
+    """Every engine must give the same cleaned DataFrame as the pandas engine."""
+    paths = [os.path.abspath(path) for path in paths]
+    checks = []
+    for path in paths:
+        for categorical in (False, True):
+            results = {
+                engine: run_quietly(full_preprocessing, path, categorical=categorical,
+                                    tracer=PipelineTracer(log_level=None), engine=engine)
+                for engine in ENGINES
+            }
+            label = f"{os.path.basename(path)} categorical={categorical}"
+            for engine in ENGINES[1:]:
+                assert_same_frame(results["pandas"], results[engine], f"{label} [{engine}]")
+            checks.append(label)
+            print(f"  OK  {label} ({len(results['pandas'])} rows)")
+
+        if path.endswith(".csv"):
+            with tempfile.TemporaryDirectory() as tmp:
+                results = {}
+                for engine in ENGINES:
+                    output = os.path.join(tmp, f"{engine}.parquet")
+                    run_quietly(full_preprocessing_chunked, path, output, chunksize,
+                                tracer=PipelineTracer(log_level=None), engine=engine)
+                    results[engine] = pd.read_parquet(output)
+            label = f"{os.path.basename(path)} chunked"
+            for engine in ENGINES[1:]:
+                assert_same_frame(results["pandas"], results[engine], f"{label} [{engine}]")
+            checks.append(label)
+            print(f"  OK  {label} ({len(results['pandas'])} rows)")
+
+    return checks
+
+
+def bench_size(n_rows, seed=0, repeat=2):
+    """
+    Best per-stage wall time of every engine over `repeat` rounds (engines
+    alternate, so that both run warm) on one generated dataset, + parity check.
+    """
+    df = load_data(os.path.abspath(dataset_path(n_rows, seed)))
+    timings = {engine: [] for engine in ENGINES}
+    outputs = {}
+
+    for _ in range(repeat):
+        for engine in ENGINES:
+            tracer = PipelineTracer(log_level=None)
+            pipeline = Pipeline(preprocessing_stages(), engine=engine).select(skip=["analysis"])
+            outputs[engine] = run_quietly(pipeline.run, df, tracer)
+            timings[engine].append(tracer.summary(by_stage=True).set_index("stage")["wall_s"])
+    timings = {engine: pd.concat(runs, axis=1).min(axis=1) for engine, runs in timings.items()}
+
+    for engine in ENGINES[1:]:
+        assert_same_frame(outputs["pandas"], outputs[engine], f"{n_rows} rows [{engine}]")
+
+    table = pd.DataFrame({f"{engine}_s": timings[engine] for engine in ENGINES})
+    table.loc["total"] = table.sum()
+    for engine in ENGINES[1:]:
+        table[f"speedup_{engine}"] = (table["pandas_s"] / table[f"{engine}_s"]).round(2)
+    table.insert(0, "rows", n_rows)
+    return table.round(4)
+
+
+def run_benchmark(sizes, seed=0, repeat=2):
+    tables = []
+    for n in sizes:
+        print(f"\n=== {n:,} rows (outputs identical across engines) ===")
+        table = bench_size(n, seed, repeat)
+        print(table.drop(columns="rows").sort_values("pandas_s", ascending=False).to_string())
+        tables.append(table)
+    return pd.concat(tables)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare the pandas and pyarrow pipeline engines.")
+
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000],
+                        help="Generated dataset sizes (rows) to benchmark")
+
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed of the generated datasets")
+
+    parser.add_argument("--repeat", type=int, default=2,
+                        help="Rounds per engine (best time per stage is kept)")
+
+    parser.add_argument("--parity", action="store_true",
+                        help="Only check that both engines give the same output on the repository datasets")
+
+    args = parser.parse_args()
+
+    if args.parity:
+        print(f"{len(check_parity())} parity checks passed")
+    else:
+        run_benchmark(args.sizes, args.seed, args.repeat)
@@ -0,0 +1,85 @@
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from preprocessing.s3_cleaning.missing_values import (
+    fix_region_with_city,
+    fix_region_with_city_rowwise,
+)
+
+# -------------------------------------------------
+# Purpose of this file:
+# -------------------------------------------------
+# Compare the vectorized fix_region_with_city (Series.map + masked assignment)
+# with the old row-wise DataFrame.apply(axis=1) version on synthetic data
+# scaled from data/morocco_ecommerce.csv.
+#
+#   python -m benchmarks.bench_fix_region_with_city --sizes 10000 100000 1000000
+
+
+SOURCE = "data/morocco_ecommerce.csv"
+FAKE_REGIONS = [None, "nan", "NaN", " none ", "N/A", "", "<NA>"]
+
+
+def make_synthetic(n_rows, source=SOURCE, missing_ratio=0.1, seed=0):
+    """Replicate the source file to n_rows and blank/fake ~missing_ratio of the regions."""
+    base = pd.read_csv(source, sep="|", usecols=["city", "region"])
+    reps = -(-n_rows // len(base))
+    df = pd.concat([base] * reps, ignore_index=True).iloc[:n_rows].copy()
+
+    rng = np.random.default_rng(seed)
+    mask = rng.random(n_rows) < missing_ratio
+    df["region"] = df["region"].astype(object)
+    df.loc[mask, "region"] = rng.choice(np.array(FAKE_REGIONS, dtype=object), size=mask.sum())
+    return df
+
+
+def time_function(func, df, repeat=3):
+    """Best wall time (seconds) over `repeat` runs, each on a fresh copy."""
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        data = df.copy()
+        start = time.perf_counter()
+        result = func(data)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run_benchmark(sizes, repeat=3):
+    rows = []
+    for n in sizes:
+        df = make_synthetic(n)
+
+        t_vec, vec = time_function(fix_region_with_city, df, repeat)
+        t_row, row = time_function(fix_region_with_city_rowwise, df, 1 if n >= 1_000_000 else repeat)
+
+        identical = vec["region"].astype(object).fillna("<missing>").equals(
+            row["region"].astype(object).fillna("<missing>")
+        )
+        rows.append({
+            "rows": n,
+            "rowwise_s": round(t_row, 4),
+            "vectorized_s": round(t_vec, 4),
+            "speedup": round(t_row / t_vec, 1),
+            "identical": identical,
+        })
+        print(rows[-1])
+
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark fix_region_with_city implementations.")
+
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000],
+                        help="Numbers of rows to benchmark")
+
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Runs per measurement (best time is kept)")
+
+    args = parser.parse_args()
+
+    print(run_benchmark(args.sizes, args.repeat).to_string(index=False))
@@ -0,0 +1,213 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+
+from preprocessing.s1_loading.loading import load_data
+from preprocessing.s3_cleaning.type_fixing import clean_numeric_column, convert_to_type
+from preprocessing.s3_cleaning.string_cleaning import (
+    clean_city_column,
+    clean_region_column,
+    standardize_case,
+    replace_nan_columns_by_words,
+)
+from preprocessing.s3_cleaning.missing_values import (
+    complete_amounts,
+    fix_region_with_city,
+    fill_missing_dates,
+)
+from preprocessing.s3_cleaning.date_cleaning import normalize_date
+from preprocessing.s3_cleaning.duplicates import drop_duplicates_all, drop_duplicates_order_id
+from preprocessing.s3_cleaning.outliers import mark_outliers_iqr
+from preprocessing.s4_features.date_features import add_date_variables
+from preprocessing.s4_features.feature_engineering import apply_discount
+from preprocessing.s5_analysis.grouped_kpis import compute_grouped_kpis
+from preprocessing.s5_analysis.time_series import analyze_time_series
+from preprocessing.pipeline.full_preprocessing import DISCOUNT_MAPPING
+
+from benchmarks.data_generator import write_orders_csv
+from benchmarks.measure import measure
+
+# -------------------------------------------------
+# Purpose of this file:
+# -------------------------------------------------
+# Time every preprocessing stage separately (wall time, CPU time, peak RSS,
+# rows in/out) on generated datasets of several sizes, in the same order as
+# full_preprocessing, and save the results as JSON so that two commits can
+# be compared:
+#
+#   python -m benchmarks.bench_stages --sizes 10000 1000000 10000000
+#   python -m benchmarks.bench_stages --compare old.json new.json
+
+
+DATA_DIR = os.path.join("benchmarks", "data")
+RESULTS_DIR = os.path.join("benchmarks", "results")
+DEFAULT_SIZES = [10_000, 1_000_000, 10_000_000]
+
+STRING_COLUMNS = ["order_id", "customer_id", "product_category", "product_id",
+                  "discount_code", "order_status", "payment_method", "total_amount"]
+STRING_TYPES = ["string", "string", "string", "string", "string", "string", "string", "numerique"]
+
+# (stage name, function of the current DataFrame). Stages returning something
+# other than a DataFrame (analysis) leave the current DataFrame unchanged.
+STAGES = [
+    ("clean_numeric_column[quantity]", lambda df: clean_numeric_column(df, "quantity")),
+    ("clean_numeric_column[unit_price]", lambda df: clean_numeric_column(df, "unit_price")),
+    ("convert_to_type", lambda df: convert_to_type(df, STRING_COLUMNS, STRING_TYPES)),
+    ("clean_city_column", lambda df: clean_city_column(df, "city")),
+    ("clean_region_column", lambda df: clean_region_column(df, "region")),
+    ("standardize_case", lambda df: standardize_case(df, ["product_category", "payment_method", "city", "region"])),
+    ("complete_amounts", lambda df: complete_amounts(df)),
+    ("fix_region_with_city", lambda df: fix_region_with_city(df)),
+    ("fill_missing_dates", lambda df: fill_missing_dates(df, ["order_date", "ship_date"])),
+    ("replace_nan_columns_by_words", lambda df: replace_nan_columns_by_words(
+        df, ["discount_code", "region", "city"], ["No code", "Unknown", "Unknown"])),
+    ("normalize_date[order_date]", lambda df: normalize_date(df, "order_date")),
+    ("normalize_date[ship_date]", lambda df: normalize_date(df, "ship_date")),
+    ("add_date_variables", lambda df: add_date_variables(df)),
+    ("apply_discount", lambda df: apply_discount(df, DISCOUNT_MAPPING)),
+    ("drop_duplicates_all", lambda df: drop_duplicates_all(df)),
+    ("drop_duplicates_order_id", lambda df: drop_duplicates_order_id(df)),
+    ("mark_outliers_iqr", lambda df: mark_outliers_iqr(df, "total_amount")),
+    ("compute_grouped_kpis", lambda df: compute_grouped_kpis(df)),
+    ("analyze_time_series", lambda df: analyze_time_series(df)),
+]
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def dataset_path(n_rows, seed=0):
+    """Generate (once) and return the CSV for n_rows."""
+    path = os.path.join(DATA_DIR, f"orders_{n_rows}_seed{seed}.csv")
+    if not os.path.exists(path):
+        write_orders_csv(path, n_rows, seed=seed)
+    return path
+
+
+def bench_size(n_rows, seed=0, stages=None):
+    """Run all stages on one generated dataset, returns a list of stage records."""
+    path = os.path.abspath(dataset_path(n_rows, seed))
+    wanted = set(stages) if stages else None
+    records = []
+
+    def record(name, metrics, rows_in, rows_out):
+        records.append({"stage": name, "rows_in": rows_in, "rows_out": rows_out, **metrics})
+        print(f"  {name:<36} {metrics['wall_s']:>10.4f}s  peak {metrics['peak_rss_mb']:>9.1f} MB")
+
+    df, metrics = measure(load_data, path)
+    record("load_data", metrics, None, len(df))
+
+    # Report stages may write files (plots) in the working directory
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)
+        try:
+            for name, func in STAGES:
+                rows_in = len(df)
+                # Stage outputs (invalid values, ...) are not part of the measure
+                with contextlib.redirect_stdout(io.StringIO()):
+                    result, metrics = measure(func, df)
+                if isinstance(result, pd.DataFrame):
+                    df = result
+                if wanted is None or name in wanted:
+                    record(name, metrics, rows_in, len(df))
+        finally:
+            os.chdir(cwd)
+
+    return records
+
+
+def run_suite(sizes, seed=0, stages=None, output=None):
+    results = {
+        "commit": git_commit(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "sizes": {},
+    }
+
+    for n in sizes:
+        print(f"\n=== {n:,} rows ===")
+        results["sizes"][str(n)] = bench_size(n, seed, stages)
+
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"stages_{results['commit'] or 'nogit'}_{stamp}.json")
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"\nResults saved to {output}")
+    return results
+
+
+def compare_results(old_path, new_path):
+    """Stage-by-stage ratio table (new / old) for wall time and peak RSS."""
+    with open(old_path, encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)
+
+    rows = []
+    for size, new_records in new["sizes"].items():
+        old_records = {r["stage"]: r for r in old["sizes"].get(size, [])}
+        for r in new_records:
+            o = old_records.get(r["stage"])
+            if o is None:
+                continue
+            rows.append({
+                "rows": int(size),
+                "stage": r["stage"],
+                "old_s": o["wall_s"],
+                "new_s": r["wall_s"],
+                "time_ratio": round(r["wall_s"] / o["wall_s"], 2) if o["wall_s"] else None,
+                "old_peak_mb": o["peak_rss_mb"],
+                "new_peak_mb": r["peak_rss_mb"],
+            })
+
+    table = pd.DataFrame(rows)
+    print(f"{old.get('commit')} → {new.get('commit')}")
+    print(table.to_string(index=False))
+    return table
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark every preprocessing stage.")
+
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="Dataset sizes (rows) to benchmark")
+
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Seed of the generated datasets")
+
+    parser.add_argument("--stages", type=str, nargs="+", default=None,
+                        help="Only report these stages (all stages still run)")
+
+    parser.add_argument("--output", type=str, default=None,
+                        help="JSON results path (default: benchmarks/results/stages_<commit>_<date>.json)")
+
+    parser.add_argument("--compare", type=str, nargs=2, metavar=("OLD", "NEW"),
+                        help="Compare two result files instead of running the suite")
+
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_results(*args.compare)
+    else:
+        run_suite(args.sizes, args.seed, args.stages, args.output)
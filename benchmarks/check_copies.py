@@ -0,0 +1,84 @@
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+from preprocessing.s1_loading.loading import load_data
+from preprocessing.pipeline.engine import Pipeline, ENGINES
+from preprocessing.pipeline.stages import preprocessing_stages
+from preprocessing.pipeline.instrumentation import PipelineTracer
+from preprocessing.pipeline.full_preprocessing import full_preprocessing
+
+from benchmarks.bench_engines import PARITY_FILES, run_quietly
+from benchmarks.bench_stages import dataset_path
+
+# -------------------------------------------------
+# Purpose of this file:
+# -------------------------------------------------
+# Copy budget of the pipeline (copy-on-write ownership contract, see
+# preprocessing/pipeline/engine.py):
+#   - full_preprocessing must not copy the whole DataFrame more than
+#     `budget` times per run (PipelineTracer(track_copies=True): a stage
+#     that keeps the rows and rewrites every column is a full copy)
+#   - Pipeline.run must leave the caller's DataFrame unchanged
+#
+# Checked on the repository datasets, in the default and categorical
+# modes and with every engine. Exit code 1 when a check fails.
+#
+#   python -m benchmarks.check_copies
+#   python -m benchmarks.check_copies --sizes 1000000 --budget 0
+
+
+def count_full_copies(path, budget=0, **kwargs):
+    """Stages of one full_preprocessing run that copied the whole frame."""
+    tracer = PipelineTracer(log_level=None, track_copies=True)
+    run_quietly(full_preprocessing, os.path.abspath(path), tracer=tracer, **kwargs)
+    copies = tracer.full_copies()
+    if len(copies) > budget:
+        raise AssertionError(f"{path} {kwargs}: {len(copies)} full copies > budget {budget}: {copies}")
+    return tracer
+
+
+def check_input_unchanged(path):
+    """Pipeline.run must not modify the DataFrame it receives."""
+    df = load_data(os.path.abspath(path))
+    before = df.copy()
+    pipeline = Pipeline(preprocessing_stages()).select(skip=["analysis"])
+    run_quietly(pipeline.run, df, PipelineTracer(log_level=None))
+    try:
+        pd.testing.assert_frame_equal(df, before)
+    except AssertionError as error:
+        raise AssertionError(f"{path}: Pipeline.run modified its input\n{error}") from None
+
+
+def check_copies(paths=PARITY_FILES, budget=0):
+    for path in paths:
+        for categorical in (False, True):
+            for engine in ENGINES:
+                tracer = count_full_copies(path, budget, categorical=categorical, engine=engine)
+                copied = tracer.summary()["copied_columns"].sum()
+                print(f"  OK  {os.path.basename(path)} categorical={categorical} engine={engine} "
+                      f"({len(tracer.full_copies())} full copies, {copied} columns rewritten)")
+        check_input_unchanged(path)
+        print(f"  OK  {os.path.basename(path)} input unchanged")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the full-frame copy budget of the pipeline.")
+
+    parser.add_argument("--budget", type=int, default=0,
+                        help="Maximum number of full-frame copies per run")
+
+    parser.add_argument("--sizes", type=int, nargs="*", default=[],
+                        help="Also check generated datasets of these sizes (rows)")
+
+    args = parser.parse_args()
+
+    paths = PARITY_FILES + [dataset_path(n) for n in args.sizes]
+    try:
+        check_copies(paths, args.budget)
+    except AssertionError as error:
+        print(f"FAILED: {error}")
+        sys.exit(1)
+    print("copy budget respected")
@@ -0,0 +1,165 @@
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from preprocessing.s3_cleaning.duplicates import count_duplicates, drop_duplicates_all
+from preprocessing.s3_cleaning.dedup_index import DedupIndex
+from preprocessing.s4_features.date_features import add_date_variables
+from preprocessing.s5_analysis.grouped_kpis import compute_grouped_kpis
+from preprocessing.s1_loading.loading import load_data, save_data
+from preprocessing.pipeline.instrumentation import PipelineTracer
+from preprocessing.pipeline.full_preprocessing import full_preprocessing
+from preprocessing.pipeline.incremental import full_preprocessing_incremental
+
+from benchmarks.bench_engines import PARITY_FILES, run_quietly
+
+# -------------------------------------------------
+# Purpose of this file:
+# -------------------------------------------------
+# Regression checks for cases the parity and copy checks do not cover:
+#   - dedup: drop_duplicates_all / count_duplicates / DedupIndex keep the
+#     same rows as df.duplicated() when an object column mixes None, NaN
+#     and pd.NA
+#   - KPIs: compute_grouped_kpis matches a direct groupby on the cleaned
+#     repository datasets (global statistics exactly, per-group sums and
+#     means within 1e-12: the cube adds up its cells), and returns NaN
+#     statistics for an all-missing Float64 total_amount
+#   - lazy date variables: a column projection that drops a declared date
+#     column can still be saved (its pending variables are skipped)
+#   - incremental mode: a run interrupted after appending its output but
+#     before saving its state does not leave duplicated rows
+#
+# Exit code 1 when a check fails.
+#
+#   python -m benchmarks.check_regressions
+
+
+def check_dedup_missing_values():
+    """None, NaN and pd.NA are one value in a row key, and different values in a one-column key."""
+    df = pd.DataFrame({"a": pd.Series([None, np.nan, pd.NA], dtype=object), "b": "x"})
+
+    expected = df.drop_duplicates()
+    pd.testing.assert_frame_equal(drop_duplicates_all(df), expected)
+    if count_duplicates(df) != int(df.duplicated().sum()):
+        raise AssertionError(f"count_duplicates: {count_duplicates(df)} != {int(df.duplicated().sum())}")
+
+    pd.testing.assert_frame_equal(DedupIndex().drop_seen(df), expected)
+    pd.testing.assert_frame_equal(DedupIndex(columns=["a"]).drop_seen(df), df.drop_duplicates(subset=["a"]))
+
+
+def direct_grouped_kpis(df):
+    """compute_grouped_kpis computed directly on the rows (before the KPI cube)."""
+    def by(key):
+        return df.groupby(key).agg(
+            Total_Revenue=("total_amount", "sum"),
+            Avg_Order_Value=("total_amount", "mean"),
+            Order_Count=("order_id", "count"),
+        ).sort_values(by="Total_Revenue", ascending=False)
+
+    return {
+        "total_amount_stats": df["total_amount"].agg(["mean", "median", "min", "max"]),
+        "region_analysis": by("region"),
+        "category_analysis": by("product_category"),
+        "top_5_products": df.groupby("product_id")["total_amount"].sum().nlargest(5),
+    }
+
+
+def check_grouped_kpis(paths=PARITY_FILES):
+    """The KPI cube gives the results of a direct groupby, up to rounding in the group sums."""
+    for path in paths:
+        df = run_quietly(full_preprocessing, os.path.abspath(path), tracer=PipelineTracer(log_level=None))
+        expected, result = direct_grouped_kpis(df), compute_grouped_kpis(df)
+        pd.testing.assert_series_equal(result["total_amount_stats"], expected["total_amount_stats"],
+                                       check_exact=True)
+        for name in ("region_analysis", "category_analysis", "top_5_products"):
+            check = pd.testing.assert_frame_equal if name != "top_5_products" else pd.testing.assert_series_equal
+            check(result[name], expected[name], check_exact=False, rtol=1e-12, atol=0,
+                  check_index_type=False, check_names=False, check_dtype=False)
+
+    # All-missing Float64 column: NaN statistics (no TypeError)
+    df = pd.DataFrame({
+        "order_id": [1, 2], "region": "a", "product_category": "c", "product_id": "p",
+        "total_amount": pd.array([None, None], dtype="Float64"),
+    })
+    stats = compute_grouped_kpis(df)["total_amount_stats"]
+    if not stats.isna().all():
+        raise AssertionError(f"all-missing total_amount: {stats.to_dict()}")
+
+
+def check_projected_date_variables():
+    """Saving a projection of add_date_variables(lazy=True) creates only the variables of the kept dates."""
+    df = pd.DataFrame({
+        "x": [1, 2],
+        "order_date": ["2024-01-01", "2024-02-03"],
+        "ship_date": ["2024-01-05", None],
+    })
+    projected = add_date_variables(df, lazy=True)[["x", "ship_date"]]
+    expected = ["x", "ship_date", "ship_year", "ship_month", "ship_day", "ship_weekday"]
+    if projected.date_variables.pending != expected[2:]:
+        raise AssertionError(f"pending variables: {projected.date_variables.pending}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "projected.parquet")
+        save_data(projected, path)
+        saved = load_data(path)
+    if list(saved.columns) != expected or saved.attrs:
+        raise AssertionError(f"saved projection: columns {list(saved.columns)}, attrs {saved.attrs}")
+    if list(projected.columns) != ["x", "ship_date"]:
+        raise AssertionError(f"save_data modified its input: {list(projected.columns)}")
+
+
+def check_interrupted_incremental_run(path=PARITY_FILES[0]):
+    """The rows appended by a run whose state was not saved are removed by the next run."""
+    raw = pd.read_csv(os.path.abspath(path), sep="|", dtype=str)
+    with tempfile.TemporaryDirectory() as tmp:
+        feed = os.path.join(tmp, "feed.csv")
+
+        def run(rows, output):
+            raw.iloc[:rows].to_csv(feed, sep="|", index=False)
+            run_quietly(full_preprocessing_incremental, feed, os.path.join(tmp, output),
+                        os.path.join(tmp, f"state_{output}"), tracer=PipelineTracer(log_level=None))
+
+        run(2000, "expected.csv")
+        run(4000, "expected.csv")
+
+        run(2000, "output.csv")
+        state_dir = os.path.join(tmp, "state_output.csv")
+        shutil.copytree(state_dir, state_dir + ".before")
+        run(4000, "output.csv")
+        # Interruption before state.json: output appended, state of the first run
+        shutil.rmtree(state_dir)
+        os.rename(state_dir + ".before", state_dir)
+        run(4000, "output.csv")
+
+        output, expected = (pd.read_csv(os.path.join(tmp, name)) for name in ("output.csv", "expected.csv"))
+    pd.testing.assert_frame_equal(output, expected)
+
+
+CHECKS = [
+    check_dedup_missing_values,
+    check_grouped_kpis,
+    check_projected_date_variables,
+    check_interrupted_incremental_run,
+]
+
+
+def check_regressions(checks=CHECKS):
+    for check in checks:
+        try:
+            check()
+        except AssertionError as error:
+            raise AssertionError(f"{check.__name__}: {error}") from None
+        print(f"  OK  {check.__name__}")
+
+
+if __name__ == "__main__":
+    try:
+        check_regressions()
+    except AssertionError as error:
+        print(f"FAILED: {error}")
+        sys.exit(1)
+    print("regression checks passed")
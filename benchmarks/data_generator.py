@@ -0,0 +1,173 @@
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+# -------------------------------------------------
+# Purpose of this file:
+# -------------------------------------------------
+# Build synthetic order exports of any size from data/morocco_ecommerce.csv,
+# with the same kinds of anomalies as data/morocco_ecommerce_anomalies.xlsx:
+#   - word-form quantities ("two", "twenty-one"), "free" / "1043,00" prices
+#   - mixed date formats (dd/mm/yyyy, yyyy/mm/dd, timestamps, "not a date")
+#   - dirty city / region variants (spaces, casing, "casa", missing values)
+#   - full-row duplicates and repeated order_id
+#
+#   python -m benchmarks.data_generator --rows 1000000 --output benchmarks/data/orders_1000000.csv
+
+
+SOURCE = "data/morocco_ecommerce.csv"
+
+# Share of rows affected by each anomaly (close to the anomalies workbook)
+ANOMALY_RATES = {
+    "quantity_word": 0.012,
+    "quantity_missing": 0.012,
+    "unit_price_free": 0.013,
+    "unit_price_comma": 0.006,
+    "unit_price_missing": 0.013,
+    "total_amount_missing": 0.005,
+    "date_day_first": 0.05,
+    "date_timestamp": 0.03,
+    "date_slashes": 0.006,
+    "date_invalid": 0.01,
+    "ship_date_missing": 0.075,
+    "city_missing": 0.05,
+    "city_dirty": 0.05,
+    "region_missing": 0.055,
+    "region_dirty": 0.04,
+    "category_lower": 0.05,
+    "duplicate_rows": 0.02,
+    "duplicate_order_id": 0.02,
+}
+
+QUANTITY_WORDS = np.array(["two", "three", "Two", "twenty-one", "one hundred twenty"], dtype=object)
+INVALID_DATES = np.array(["not a date", "invalid"], dtype=object)
+
+
+def _pick(rng, n, rate):
+    """Boolean mask selecting ~rate of n rows."""
+    return rng.random(n) < rate
+
+
+def _load_source(source=SOURCE):
+    return pd.read_csv(source, sep="|", dtype=str, keep_default_na=False, na_values=[""])
+
+
+def generate_orders(n_rows, seed=0, source=SOURCE, start_id=0, base=None):
+    """
+    Génère n_rows commandes à partir du fichier source répliqué, puis injecte
+    les anomalies de ANOMALY_RATES. Toutes les colonnes sont des chaînes
+    (comme un export brut). Les order_id sont uniques avant l'ajout des doublons.
+    """
+    rng = np.random.default_rng(seed)
+    base = _load_source(source) if base is None else base
+
+    n_unique = int(round(n_rows / (1 + ANOMALY_RATES["duplicate_rows"] + ANOMALY_RATES["duplicate_order_id"])))
+    idx = rng.integers(0, len(base), size=n_unique)
+    df = base.iloc[idx].reset_index(drop=True)
+    df["order_id"] = [f"ORD{i:09d}" for i in range(start_id, start_id + n_unique)]
+
+    n = len(df)
+
+    # --- Numeric columns ---
+    for col in ["quantity", "unit_price", "total_amount"]:
+        df[col] = df[col].astype(object)
+
+    mask = _pick(rng, n, ANOMALY_RATES["quantity_word"])
+    df.loc[mask, "quantity"] = rng.choice(QUANTITY_WORDS, size=mask.sum())
+    df.loc[_pick(rng, n, ANOMALY_RATES["quantity_missing"]), "quantity"] = np.nan
+
+    df.loc[_pick(rng, n, ANOMALY_RATES["unit_price_free"]), "unit_price"] = "free"
+    mask = _pick(rng, n, ANOMALY_RATES["unit_price_comma"]) & df["unit_price"].notna()
+    df.loc[mask, "unit_price"] = df.loc[mask, "unit_price"].astype(str).str.replace(".", ",", regex=False)
+    df.loc[_pick(rng, n, ANOMALY_RATES["unit_price_missing"]), "unit_price"] = np.nan
+    df.loc[_pick(rng, n, ANOMALY_RATES["total_amount_missing"]), "total_amount"] = np.nan
+
+    # --- Dates (source format is yyyy-mm-dd) ---
+    order_date = df["order_date"].astype(object)
+    parts = order_date.str.split("-", expand=True)
+
+    mask = _pick(rng, n, ANOMALY_RATES["date_day_first"])
+    order_date[mask] = parts[2][mask] + "/" + parts[1][mask] + "/" + parts[0][mask]
+    mask = _pick(rng, n, ANOMALY_RATES["date_timestamp"])
+    order_date[mask] = df.loc[mask, "order_date"] + " 00:00:00"
+    mask = _pick(rng, n, ANOMALY_RATES["date_slashes"])
+    order_date[mask] = df.loc[mask, "order_date"].str.replace("-", "/", regex=False)
+    mask = _pick(rng, n, ANOMALY_RATES["date_invalid"])
+    order_date[mask] = rng.choice(INVALID_DATES, size=mask.sum())
+    df["order_date"] = order_date
+
+    df.loc[_pick(rng, n, ANOMALY_RATES["ship_date_missing"]), "ship_date"] = np.nan
+
+    # --- City / region variants ---
+    df["city"] = df["city"].astype(object)
+    mask = _pick(rng, n, ANOMALY_RATES["city_dirty"])
+    variant = rng.integers(0, 4, size=mask.sum())
+    dirty = df.loc[mask, "city"].to_numpy(dtype=object)
+    dirty = np.where(variant == 0, " " + dirty, dirty)
+    dirty = np.where(variant == 1, np.char.upper(dirty.astype(str)).astype(object), dirty)
+    dirty = np.where(variant == 2, "casa", dirty)
+    dirty = np.where(variant == 3, " nan", dirty)
+    df.loc[mask, "city"] = dirty
+    df.loc[_pick(rng, n, ANOMALY_RATES["city_missing"]), "city"] = np.nan
+
+    df["region"] = df["region"].astype(object)
+    mask = _pick(rng, n, ANOMALY_RATES["region_dirty"])
+    df.loc[mask, "region"] = df.loc[mask, "region"].str.upper().str.replace("-", " ", regex=False)
+    df.loc[_pick(rng, n, ANOMALY_RATES["region_missing"]), "region"] = np.nan
+
+    mask = _pick(rng, n, ANOMALY_RATES["category_lower"])
+    df.loc[mask, "product_category"] = df.loc[mask, "product_category"].str.lower()
+
+    # --- Duplicates ---
+    n_dup_rows = int(n * ANOMALY_RATES["duplicate_rows"])
+    n_dup_ids = int(n * ANOMALY_RATES["duplicate_order_id"])
+
+    full_dups = df.iloc[rng.integers(0, n, size=n_dup_rows)]
+    id_dups = df.iloc[rng.integers(0, n, size=n_dup_ids)].copy()
+    id_dups["order_id"] = df["order_id"].to_numpy()[rng.integers(0, n, size=n_dup_ids)]
+
+    df = pd.concat([df, full_dups, id_dups], ignore_index=True)
+    df = df.iloc[rng.permutation(len(df))].reset_index(drop=True)
+
+    return df.iloc[:n_rows]
+
+
+def write_orders_csv(path, n_rows, seed=0, chunksize=1_000_000, source=SOURCE):
+    """
+    Écrit n_rows commandes générées dans un CSV séparé par "|" (format de
+    load_data), bloc par bloc pour les grandes tailles (10M lignes).
+    """
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+
+    base = _load_source(source)
+    written = 0
+    block = 0
+    while written < n_rows:
+        size = min(chunksize, n_rows - written)
+        df = generate_orders(size, seed=seed + block, start_id=written, base=base)
+        df.to_csv(path, sep="|", index=False, mode="w" if written == 0 else "a", header=written == 0)
+        written += len(df)
+        block += 1
+
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a scaled synthetic order export.")
+
+    parser.add_argument("--rows", type=int, required=True,
+                        help="Number of rows to generate")
+
+    parser.add_argument("--output", type=str, required=True,
+                        help="Where to write the pipe-separated CSV")
+
+    parser.add_argument("--seed", type=int, default=0,
+                        help="Random seed")
+
+    args = parser.parse_args()
+
+    print(f"Generated {write_orders_csv(args.output, args.rows, args.seed)}")
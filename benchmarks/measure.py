@@ -0,0 +1,101 @@
+import os
+import resource
+import sys
+import threading
+import time
+
+# -------------------------------------------------
+# Purpose of this file:
+# -------------------------------------------------
+# Wall time, CPU time and peak RSS of a single function call.
+#
+# Peak RSS per call:
+#   - Linux: the kernel high-water mark (VmHWM) is reset before the call
+#     by writing "5" to /proc/self/clear_refs, then read after the call
+#   - elsewhere: RSS is sampled every few ms by a background thread
+#     (psutil if installed), so very short spikes may be missed
+
+
+def _read_proc_status(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field + ":"):
+                return int(line.split()[1]) * 1024
+    return None
+
+
+def _reset_peak_rss():
+    """Reset the kernel peak RSS counter (Linux only). Returns True on success."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def current_rss():
+    """Current resident set size in bytes."""
+    if sys.platform.startswith("linux"):
+        return _read_proc_status("VmRSS")
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        # ru_maxrss: KiB on Linux, bytes on macOS
+        usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return usage if sys.platform == "darwin" else usage * 1024
+
+
+class _RssSampler(threading.Thread):
+    """Background thread keeping the highest RSS seen while a call runs."""
+
+    def __init__(self, interval=0.005):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.peak = current_rss()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.is_set():
+            self.peak = max(self.peak, current_rss())
+            time.sleep(self.interval)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        self.peak = max(self.peak, current_rss())
+        return self.peak
+
+
+def measure(func, *args, **kwargs):
+    """
+    Run func(*args, **kwargs) once.
+
+    Returns:
+        result, dict with wall_s, cpu_s, rss_before_mb, peak_rss_mb, rss_after_mb
+    """
+    rss_before = current_rss()
+
+    use_hwm = sys.platform.startswith("linux") and _reset_peak_rss()
+    sampler = None
+    if not use_hwm:
+        sampler = _RssSampler()
+        sampler.start()
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    result = func(*args, **kwargs)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    peak = _read_proc_status("VmHWM") if use_hwm else sampler.stop()
+    rss_after = current_rss()
+
+    return result, {
+        "wall_s": round(wall, 6),
+        "cpu_s": round(cpu, 6),
+        "rss_before_mb": round(rss_before / 2**20, 2),
+        "peak_rss_mb": round(peak / 2**20, 2),
+        "rss_after_mb": round(rss_after / 2**20, 2),
+    }
@@ -1,4 +1,13 @@
 #__init__.py is a special Python file that turns a folder into a Python package.
+import pandas as _pd
+
+# Copie à l'écriture (comportement par défaut de pandas 3, activé ici pour
+# pandas 2) : les sous-ensembles et copies superficielles ne recopient les
+# données qu'à la première écriture, sans effet sur le DataFrame d'origine.
+# Les étapes du pipeline reposent dessus (voir pipeline/engine.py).
+if int(_pd.__version__.split(".")[0]) < 3:
+    _pd.set_option("mode.copy_on_write", True)
+
 from .s1_loading import *
 from .s2_profiling import *
 from .s3_cleaning import *
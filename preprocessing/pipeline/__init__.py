@@ -1,2 +1,5 @@
 from .full_preprocessing import full_preprocessing
 from .bup import full_preprocessing as bup_full_preprocessing
+from .chunked_preprocessing import full_preprocessing_chunked
+from .engine import Pipeline, Stage, load_pipeline_config
+from .incremental import full_preprocessing_incremental
@@ -0,0 +1,162 @@
+import warnings
+from functools import partial
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from ..s3_cleaning import missing_values
+from ..s3_cleaning.missing_values import city_to_region, FAKE_NANS
+from ..s3_cleaning import date_cleaning
+from ..s3_cleaning.string_cleaning import transform_unique
+from ..s4_features import date_features, feature_engineering
+
+# ---------------------------------------------------------------------
+# Purpose of this file:
+# ---------------------------------------------------------------------
+# Moteur "pyarrow" du pipeline : implémentations colonnes des étapes les
+# plus lourdes, substituées aux fonctions pandas par
+# Pipeline(stages, engine="pyarrow") (même nom d'étape, mêmes arguments,
+# même DataFrame en sortie : dtypes, valeurs et NaN identiques).
+#
+#   - champs de date (année, mois, jour, jour de la semaine) : noyaux
+#     pyarrow.compute sur les timestamps, sans Series intermédiaire
+#     (materialize_date_variables)
+#   - texte et dates en texte : dictionnaire des valeurs distinctes (encodage
+#     pyarrow via pd.factorize), transformation sur le dictionnaire puis
+#     redéploiement par les indices ; les villes, régions, codes de remise
+#     et dates n'ont que quelques centaines de valeurs distinctes
+#   - mode des dates : pc.mode (même départage que Series.mode()[0])
+#
+# En test_mode (diagnostics affichés), les fonctions pandas sont appelées.
+# KERNELS associe chaque fonction pandas à son implémentation pyarrow ;
+# les autres étapes restent inchangées.
+
+WEEKDAYS = pa.array(date_features.WEEKDAYS)
+
+
+def _int_series(array, index):
+    """Int64Array pyarrow → Series Int64 (nulls → <NA>), sans passer par des objets."""
+    values = array.fill_null(0).to_numpy(zero_copy_only=False).astype("int64")
+    mask = array.is_null().to_numpy(zero_copy_only=False)
+    return pd.Series(pd.arrays.IntegerArray(values, mask), index=index)
+
+
+def _to_datetime(series):
+    """pd.to_datetime(errors="coerce") sur les valeurs distinctes (format déduit du premier non nul)."""
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return series
+    return transform_unique(series, partial(pd.to_datetime, errors="coerce"))
+
+
+def _date_mode(series):
+    """Date la plus fréquente (la plus ancienne en cas d'égalité), comme series.mode()[0]."""
+    values = series.to_numpy()
+    ticks = values.view("int64")[~np.isnat(values)]
+    mode = pc.mode(ticks)[0]["mode"].as_py()
+    return pd.Timestamp(np.int64(mode).view(values.dtype))
+
+
+# -----------------------------------------------------------
+# Kernels (mêmes signatures que les fonctions pandas)
+# -----------------------------------------------------------
+def _date_part(dates, part, weekday="category"):
+    """date_features.date_part : champ extrait par pyarrow.compute."""
+    values = pa.array(dates, from_pandas=True)
+    if part != "weekday":
+        return _int_series(getattr(pc, part)(values), dates.index)
+
+    days = pc.day_of_week(values)
+    if weekday == "name":
+        return pd.Series(pd.array(WEEKDAYS.take(days), dtype="str"), index=dates.index)
+    if weekday == "int":
+        return _int_series(days, dates.index).astype("Int8")
+    codes = days.fill_null(-1).to_numpy(zero_copy_only=False).astype("int8")
+    return pd.Series(pd.Categorical.from_codes(codes, dtype=date_features.WEEKDAY_DTYPE), index=dates.index)
+
+
+def add_date_variables(df, date_cols=["order_date", "ship_date"], lazy=False, weekday="category"):
+    """add_date_variables : dates converties sur les valeurs distinctes, champs par pyarrow.compute."""
+    df = df.copy(deep=False)
+    for date_col in date_cols:
+        df[date_col] = _to_datetime(df[date_col])
+    df = date_features.add_date_variables(df, date_cols, lazy=True, weekday=weekday)
+    return df if lazy else materialize_date_variables(df)
+
+
+def materialize_date_variables(df, names=None):
+    """materialize_date_variables : champs extraits par pyarrow.compute."""
+    return date_features.materialize_date_variables(df, names, compute=_date_part)
+
+
+def fill_missing_dates(df, date_columns, modes=None):
+    """fill_missing_dates : conversion sur les valeurs distinctes, mode par pc.mode."""
+    for col in date_columns:
+        df[col] = _to_datetime(df[col])
+
+    for col in date_columns:
+        if modes is not None and col in modes:
+            fill = modes[col]
+        elif df[col].notna().sum() == 0:
+            fill = pd.Timestamp("2000-01-01")
+        elif df[col].dt.tz is not None:
+            fill = df[col].mode()[0]
+        else:
+            fill = _date_mode(df[col])
+        df[col] = df[col].fillna(fill)
+
+    return df
+
+
+def convert_dates_with_formats(df, date_formats):
+    """convert_dates_with_formats sur les valeurs distinctes de chaque colonne."""
+    for col, fmt in date_formats.items():
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=Warning)
+            df[col] = transform_unique(df[col], partial(pd.to_datetime, format=fmt, errors="coerce"))
+    return df
+
+
+def _lower_strip(s):
+    return s.astype(str).str.lower().str.strip()
+
+
+def _region_text(s):
+    s = _lower_strip(s)
+    return s.mask(s.isin(FAKE_NANS), pd.NA)
+
+
+def fix_region_with_city(data, test_mode=False):
+    """fix_region_with_city : nettoyage et table ville → région sur les valeurs distinctes."""
+    if test_mode or isinstance(data["region"].dtype, pd.CategoricalDtype):
+        return missing_values.fix_region_with_city(data, test_mode=test_mode)
+
+    data["city"] = transform_unique(data["city"], _lower_strip)
+    data["region"] = transform_unique(data["region"], _region_text)
+
+    region_from_city = transform_unique(data["city"], lambda s: s.map(city_to_region))
+    to_fill = data["region"].isna() & region_from_city.notna()
+    data["region"] = data["region"].mask(to_fill, region_from_city)
+    return data
+
+
+def apply_discount(data, discount_mapping, tva=0.2):
+    """apply_discount : taux de remise lus dans la table sur les codes distincts."""
+    rates = transform_unique(data["discount_code"], lambda s: s.map(discount_mapping).astype(float))
+    data["discount_rate"] = rates.astype(float).fillna(0.0)
+
+    data["discount_amount"] = data["total_amount"] * data["discount_rate"]
+    data["net_amount"] = data["total_amount"] - data["discount_amount"]
+    data["tax"] = data["net_amount"] * tva
+    return data
+
+
+KERNELS = {
+    date_features.add_date_variables: add_date_variables,
+    date_features.materialize_date_variables: materialize_date_variables,
+    missing_values.fill_missing_dates: fill_missing_dates,
+    missing_values.fix_region_with_city: fix_region_with_city,
+    date_cleaning.convert_dates_with_formats: convert_dates_with_formats,
+    feature_engineering.apply_discount: apply_discount,
+}
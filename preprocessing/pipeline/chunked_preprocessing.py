@@ -0,0 +1,251 @@
+import os
+import shutil
+import tempfile
+from contextlib import nullcontext
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from .instrumentation import PipelineTracer
+from .engine import Pipeline
+from .parallel import ParallelExecutor
+from .stages import preprocessing_stages, DATE_COLUMNS
+
+# 1) Loading
+from ..s1_loading.loading import (
+    load_data_chunks,
+    ChunkedWriter,
+)
+
+# 3) Cleaning
+from ..s3_cleaning.missing_values import (
+    derive_amounts,
+    amount_fill_statistics,
+    date_value_counts,
+    mode_from_counts,
+)
+from ..s3_cleaning.date_cleaning import (
+    guess_date_format,
+    convert_dates_with_formats,
+)
+from ..s3_cleaning.dedup_index import DedupIndex
+from ..s3_cleaning.outlier_stats import OutlierStats
+
+# ---------------------------------------------------------------------
+# Purpose of this file:
+# ---------------------------------------------------------------------
+# Version "streaming" de full_preprocessing pour les exports trop gros
+# pour la mémoire. Le fichier est lu par blocs et traité en 3 passes :
+#
+#   1. statistiques fusionnables : sommes/effectifs pour les moyennes de
+#      complete_amounts, effectifs par date pour les modes de fill_missing_dates
+#   2. nettoyage + features + dédoublonnage bloc par bloc (index de hash des
+#      lignes et des order_id déjà vus, voir dedup_index.py), blocs écrits
+#      dans un spool temporaire ; les statistiques de total_amount (bornes
+#      IQR, z-score) sont fusionnées bloc par bloc (outlier_stats.py)
+#   3. marquage des outliers avec les bornes globales + écriture incrémentale
+#
+# La mémoire de pointe dépend de chunksize, à l'exception des index de
+# dédoublonnage (8 octets par ligne et par order_id distincts) et, en mode
+# exact (rank_error=None), de la colonne total_amount (un float64 par ligne)
+# pour les quantiles ; avec rank_error, le sketch garde quelques milliers de
+# valeurs quelle que soit la taille du fichier.
+
+
+def drop_seen(df, rows, ids):
+    """
+    Dédoublonnage inter-blocs, équivalent à drop_duplicates_all puis
+    drop_duplicates_order_id sur l'ensemble des blocs : retire les lignes
+    complètes (index rows) puis les order_id (index ids) déjà vus, plus haut
+    dans le bloc ou dans un bloc précédent.
+    """
+    return ids.drop_seen(rows.drop_seen(df))
+
+
+def duplicate_counts(rows, ids):
+    """Doublons retirés par bloc : lignes complètes, puis order_id."""
+    full_row = rows.stats()
+    counts = pd.DataFrame({
+        "rows": full_row["rows"],
+        "full_row": full_row["rows"] - full_row["kept"],
+    })
+    by_id = ids.stats()
+    counts["order_id"] = by_id["rows"] - by_id["kept"] if len(by_id) else 0
+    counts["kept"] = counts["rows"] - counts["full_row"] - counts["order_id"]
+    counts.index.name = "chunk"
+    return counts
+
+
+def fill_values_from_sums(sums):
+    """Moyennes de complete_amounts à partir des {colonne: [somme, effectif]} fusionnés."""
+    return {
+        "quantity": round(sums["quantity"][0] / sums["quantity"][1]) if sums["quantity"][1] else np.nan,
+        "unit_price": sums["unit_price"][0] / sums["unit_price"][1] if sums["unit_price"][1] else np.nan,
+    }
+
+
+def outlier_parameters(stats):
+    """Moments (z-score) et bornes IQR de mark_outliers_iqr d'un OutlierStats."""
+    return stats.zscore_moments(), stats.iqr_bounds()
+
+
+# ---------------------------------------------------------------------
+# Pass 1 — mergeable statistics
+# ---------------------------------------------------------------------
+def collect_global_statistics(path, chunksize=100_000, engine="pandas"):
+    """
+    Première passe : calcule les valeurs globales nécessaires aux étapes
+    qui ne sont pas ligne à ligne.
+
+    Returns:
+        dict avec fill_values (complete_amounts), modes (fill_missing_dates),
+        date_formats et rows_in
+    """
+    clean_rows = Pipeline(preprocessing_stages(), engine=engine).select(only=["type_fixing", "text_cleaning"])
+    silent = PipelineTracer(log_level=None)
+    convert_dates = convert_dates_with_formats
+    if engine == "pyarrow":
+        from .arrow_engine import convert_dates_with_formats as convert_dates
+
+    sums = {"quantity": [0.0, 0], "unit_price": [0.0, 0]}
+    date_counts = {col: pd.Series(dtype="int64") for col in DATE_COLUMNS}
+    date_formats = None
+    rows_in = 0
+
+    for chunk in load_data_chunks(path, chunksize):
+        rows_in += len(chunk)
+
+        if date_formats is None:
+            date_formats = {col: guess_date_format(chunk[col]) for col in DATE_COLUMNS}
+
+        chunk = clean_rows.run(chunk, silent)
+        chunk = derive_amounts(chunk)
+        for col, (total, count) in amount_fill_statistics(chunk).items():
+            sums[col][0] += total
+            sums[col][1] += count
+
+        chunk = convert_dates(chunk, date_formats)
+        for col in DATE_COLUMNS:
+            date_counts[col] = date_counts[col].add(date_value_counts(chunk, col), fill_value=0)
+
+    fill_values = fill_values_from_sums(sums)
+    modes = {col: mode_from_counts(counts) for col, counts in date_counts.items()}
+
+    return {
+        "fill_values": fill_values,
+        "modes": modes,
+        "date_formats": date_formats or {},
+        "rows_in": rows_in,
+    }
+
+
+# ---------------------------------------------------------------------
+# 🔥 MASTER CHUNKED PIPELINE FUNCTION
+# ---------------------------------------------------------------------
+def full_preprocessing_chunked(path, output_path, chunksize=100_000, tracer=None,
+                               workers=None, backend="thread", rank_error=None, engine="pandas"):
+    """
+    Même nettoyage que full_preprocessing, mais par blocs de `chunksize` lignes,
+    avec écriture incrémentale du fichier nettoyé dans output_path
+    (.csv, .parquet, .feather ou .arrow).
+    (Les étapes d'analyse — KPIs, séries temporelles — ne sont pas exécutées.)
+
+    tracer (PipelineTracer, optionnel) : mesures par étape et par bloc ;
+    tracer.summary(by_stage=True) agrège les blocs.
+
+    workers / backend (optionnels) : étapes de colonnes indépendantes de la
+    passe 2 exécutées en parallèle sur chaque bloc (voir pipeline/parallel.py).
+
+    rank_error (float, optionnel) : quantiles des bornes IQR approchés par un
+    sketch (erreur de rang visée, ex. 0.001) au lieu de garder toute la
+    colonne total_amount ; None : bornes exactes (s3_cleaning/outlier_stats.py).
+
+    engine ("pandas" ou "pyarrow") : implémentations des étapes de chaque
+    bloc, voir pipeline/arrow_engine.py.
+
+    Returns:
+        dict: résumé du traitement (lignes lues/écrites, doublons retirés au
+        total et par bloc, taille des index de dédoublonnage, valeurs de
+        remplissage, modes des dates, bornes IQR)
+    """
+
+    # ----------------------------
+    # PASS 1 — GLOBAL STATISTICS
+    # ----------------------------
+    if tracer is None:
+        tracer = PipelineTracer(log_level=logging.DEBUG)
+    run = tracer.run
+
+    stats = run("collect_global_statistics", collect_global_statistics, path, chunksize, engine)
+
+    # ----------------------------
+    # PASS 2 — CLEAN, FEATURES, DEDUP
+    # ----------------------------
+    spool_dir = tempfile.mkdtemp(prefix="chunked_preprocessing_")
+    executor = ParallelExecutor(workers, backend) if workers else nullcontext()
+    try:
+        rows, ids = DedupIndex(), DedupIndex(columns=["order_id"])
+        amounts = OutlierStats(rank_error)
+        spooled = []
+        duplicates_removed = 0
+
+        # Étapes de full_preprocessing avec les statistiques globales ;
+        # les doublons sont retirés par les index (tous blocs confondus) et
+        # les outliers (bornes globales) sont traités en passe 3
+        clean = Pipeline(preprocessing_stages(
+            fill_values=stats["fill_values"],
+            modes=stats["modes"],
+            date_formats=stats["date_formats"],
+        ), engine=engine).select(skip=["duplicates", "outliers", "analysis"])
+
+        with executor as pool:
+            for i, chunk in enumerate(load_data_chunks(path, chunksize)):
+                n_before = len(chunk)
+                chunk = clean.run(chunk, tracer, executor=pool)
+                chunk = run("drop_seen", drop_seen, chunk, rows, ids)
+                duplicates_removed += n_before - len(chunk)
+
+                if chunk.empty:
+                    continue
+
+                amounts.update(chunk["total_amount"])
+                spool_path = os.path.join(spool_dir, f"chunk_{i:06d}.pkl")
+                chunk.to_pickle(spool_path)
+                spooled.append(spool_path)
+
+        # ----------------------------
+        # GLOBAL OUTLIER BOUNDS
+        # ----------------------------
+        moments, bounds = outlier_parameters(amounts)
+        del amounts
+
+        # ----------------------------
+        # PASS 3 — MARK OUTLIERS + WRITE
+        # ----------------------------
+        outliers = Pipeline(preprocessing_stages(moments=moments, bounds=bounds)).select(only=["outliers"])
+
+        with ChunkedWriter(output_path) as writer:
+            for spool_path in spooled:
+                chunk = pd.read_pickle(spool_path)
+                chunk = outliers.run(chunk, tracer)
+
+                run("write_chunk", writer.write, chunk)
+                os.remove(spool_path)
+        rows_out = writer.rows
+
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
+
+    return {
+        "rows_in": stats["rows_in"],
+        "rows_out": rows_out,
+        "duplicates_removed": duplicates_removed,
+        "duplicates_per_chunk": duplicate_counts(rows, ids),
+        "dedup_index": {"full_row": rows.summary(), "order_id": ids.summary()},
+        "fill_values": stats["fill_values"],
+        "modes": stats["modes"],
+        "iqr_bounds": bounds,
+        "output_path": output_path,
+    }
@@ -0,0 +1,430 @@
+import copy
+import json
+import logging
+import time
+
+import pandas as pd
+
+from .instrumentation import PipelineTracer
+from .stage_cache import frame_key
+from ..s3_cleaning.string_cleaning import transform_text, transform_unique
+from ..s3_cleaning.type_fixing import CATEGORICAL_COLUMNS
+
+# ---------------------------------------------------------------------
+# Purpose of this file:
+# ---------------------------------------------------------------------
+# Moteur de pipeline déclaratif. Un pipeline est une liste de Stage qui
+# déclarent les colonnes qu'elles lisent (inputs) et écrivent (outputs).
+# Avant l'exécution, Pipeline.plan() :
+#   1. garde les étapes choisies (only / skip : noms d'étapes ou groupes,
+#      typiquement lus dans un fichier de config JSON)
+#   2. retire les étapes d'analyse dont le résultat n'est pas utilisé
+#   3. retire une étape idempotente répétée si aucune étape intermédiaire
+#      n'a modifié ses colonnes d'entrée
+#   4. fusionne les opérations texte consécutives (column_ops) : chaque
+#      colonne est transformée une seule fois, sur ses valeurs distinctes
+#      pour les colonnes à faible cardinalité
+#   5. avec engine="pyarrow", remplace les fonctions qui ont une
+#      implémentation pyarrow (arrow_engine.KERNELS) ; résultat identique
+#
+#   pipeline = Pipeline(preprocessing_stages()).select(skip=["analysis"])
+#   df = pipeline.run(df, tracer)
+#   pipeline.describe()   # plan : étapes exécutées, fusionnées, retirées
+#
+# Propriété des DataFrames (copie à l'écriture de pandas, voir
+# preprocessing/__init__.py) :
+#   - Pipeline.run travaille sur une copie superficielle de df : le
+#     DataFrame de l'appelant n'est jamais modifié, et rien n'est recopié
+#     tant qu'une étape n'écrit pas dans ses colonnes
+#   - une étape de transformation reçoit ce DataFrame, qui lui appartient :
+#     elle peut écrire ses colonnes en place (df[col] = ..., df.loc[...]) et
+#     le renvoyer, ou renvoyer un nouveau DataFrame (filtre de lignes) ;
+#     elle ne recopie pas le DataFrame entier (df.copy())
+#   - un report ne modifie pas df
+# PipelineTracer(track_copies=True) compte les colonnes recopiées par étape.
+
+logger = logging.getLogger("preprocessing.pipeline")
+
+ENGINES = ["pandas", "pyarrow"]
+
+
+class Stage:
+    """
+    Une étape de pipeline : func(df, *args, **kwargs).
+
+    Parameters:
+        name (str): nom unique de l'étape (utilisé par la config et le tracer)
+        func (callable): fonction appelée avec le DataFrame courant
+        args (tuple), kwargs (dict): arguments supplémentaires de func
+        inputs (list): colonnes lues (vérifiées avant l'exécution)
+        outputs (list): colonnes créées ou modifiées
+        group (str): groupe (type_fixing, text_cleaning, ..., analysis)
+        report (bool): func retourne un résultat (dict, Series, ...) et non
+            le DataFrame ; le DataFrame courant est inchangé
+        show (callable): show(result) affiche le résultat d'un report.
+            Un report sans show est retiré du plan, sauf s'il est demandé
+        when (callable): when(df) -> bool, l'étape n'est exécutée que si True
+        column_ops (dict): {colonne: fonction Series → Series valeur par valeur}
+            équivalente à l'étape ; permet la fusion avec les étapes voisines
+        idempotent (bool): l'exécuter deux fois de suite ne change rien
+    """
+
+    def __init__(self, name, func, args=(), kwargs=None, inputs=(), outputs=(),
+                 group=None, report=False, show=None, when=None,
+                 column_ops=None, idempotent=False):
+        self.name = name
+        self.func = func
+        self.args = tuple(args)
+        self.kwargs = dict(kwargs or {})
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.group = group
+        self.report = report
+        self.show = show
+        self.when = when
+        self.column_ops = column_ops
+        self.idempotent = idempotent
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, group={self.group!r})"
+
+    def key(self):
+        """Identité de l'appel (fonction + arguments), pour repérer les répétitions."""
+        return (self.func, repr(self.args), repr(sorted(self.kwargs.items())))
+
+    def __call__(self, df):
+        return self.func(df, *self.args, **self.kwargs)
+
+
+def apply_column_ops(df, column_ops, low_cardinality=CATEGORICAL_COLUMNS):
+    """
+    Applique {colonne: [op1, op2, ...]} : les opérations d'une colonne sont
+    enchaînées en une seule transformation. Les colonnes catégorielles ou à
+    faible cardinalité ne sont transformées que sur leurs valeurs distinctes.
+    """
+    for column, ops in column_ops.items():
+        def composed(s, ops=ops):
+            for op in ops:
+                s = op(s)
+            return s
+
+        if column in low_cardinality:
+            df[column] = transform_unique(df[column], composed)
+        else:
+            df[column] = transform_text(df[column], composed)
+    return df
+
+
+def fuse_stages(stages):
+    """Fusionne des étapes à column_ops consécutives en une seule étape."""
+    column_ops = {}
+    for stage in stages:
+        for column, op in stage.column_ops.items():
+            column_ops.setdefault(column, []).append(op)
+
+    inputs, outputs = [], []
+    for stage in stages:
+        inputs += [c for c in stage.inputs if c not in inputs]
+        outputs += [c for c in stage.outputs if c not in outputs]
+
+    return Stage(
+        "fused[" + "+".join(stage.name for stage in stages) + "]",
+        apply_column_ops,
+        args=(column_ops,),
+        inputs=inputs,
+        outputs=outputs,
+        group=stages[0].group,
+    )
+
+
+def load_pipeline_config(path):
+    """
+    Lit un fichier de config JSON, par exemple :
+
+        {
+          "skip": ["analysis"],
+          "reports": ["detect_outliers_iqr"],
+          "fuse": true,
+          "test_mode": false
+        }
+
+    Clés reconnues : only, skip (noms d'étapes ou de groupes), reports
+    (reports à garder même sans affichage), fuse, test_mode, categorical,
+    workers et backend (exécution parallèle, voir parallel.py), engine
+    ("pandas" ou "pyarrow", voir arrow_engine.py), cache (dossier du cache
+    des résultats d'étapes, voir stage_cache.py).
+    """
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+
+    unknown = set(config) - {
+        "only", "skip", "reports", "fuse", "test_mode", "categorical", "workers", "backend",
+        "engine", "cache",
+    }
+    if unknown:
+        raise ValueError(f"Clés de config inconnues : {sorted(unknown)}")
+    return config
+
+
+class Pipeline:
+    """
+    Pipeline déclaratif : une liste de Stage exécutée dans l'ordre après
+    optimisation (voir l'en-tête du fichier).
+
+    Parameters:
+        stages (list): étapes, dans l'ordre d'exécution
+        fuse (bool): fusionner les opérations texte consécutives
+        reports (list): reports à exécuter même s'ils n'ont pas de show
+        engine (str): "pandas" ou "pyarrow" (implémentations de
+            arrow_engine.py pour les étapes qui en ont une)
+    """
+
+    def __init__(self, stages, fuse=True, reports=None, engine="pandas"):
+        names = [stage.name for stage in stages]
+        duplicated = sorted({name for name in names if names.count(name) > 1})
+        if duplicated:
+            raise ValueError(f"Noms d'étapes en double : {duplicated}")
+        if engine not in ENGINES:
+            raise ValueError(f"Moteur inconnu : {engine} (choix : {ENGINES})")
+
+        self.stages = list(stages)
+        self.fuse = fuse
+        self.reports = set(reports or [])
+        self.engine = engine
+        self.results = {}
+        self._plan = None
+
+    @classmethod
+    def from_config(cls, stages, config):
+        """Pipeline restreint et paramétré par un dict ou un fichier de config."""
+        if isinstance(config, str):
+            config = load_pipeline_config(config)
+        config = config or {}
+
+        pipeline = cls(stages, fuse=config.get("fuse", True), reports=config.get("reports"),
+                       engine=config.get("engine", "pandas"))
+        return pipeline.select(only=config.get("only"), skip=config.get("skip"))
+
+    # -----------------------------------------------------------
+    # Selection
+    # -----------------------------------------------------------
+    def _matches(self, stage, names):
+        return stage.name in names or stage.group in names
+
+    def select(self, only=None, skip=None):
+        """
+        Nouveau Pipeline limité aux étapes de only et sans celles de skip
+        (noms d'étapes ou de groupes). L'ordre déclaré est conservé.
+        """
+        known = {stage.name for stage in self.stages} | {stage.group for stage in self.stages}
+        unknown = (set(only or []) | set(skip or [])) - known
+        if unknown:
+            raise ValueError(f"Étapes ou groupes inconnus : {sorted(unknown)}")
+
+        stages = [
+            stage for stage in self.stages
+            if (only is None or self._matches(stage, only))
+            and not (skip and self._matches(stage, skip))
+        ]
+        return Pipeline(stages, fuse=self.fuse, reports=self.reports, engine=self.engine)
+
+    # -----------------------------------------------------------
+    # Planning
+    # -----------------------------------------------------------
+    def _kernels(self):
+        """{fonction pandas: implémentation} du moteur choisi."""
+        if self.engine == "pandas":
+            return {}
+        from .arrow_engine import KERNELS
+        return KERNELS
+
+    def plan(self):
+        """
+        Étapes réellement exécutées, et pour chaque étape déclarée son statut
+        (run, run (pyarrow), fused into ..., dropped: ...). Le plan est calculé
+        une fois.
+        """
+        if self._plan is not None:
+            return self._plan
+
+        status = {}
+        kept = []
+
+        for stage in self.stages:
+            # Report sans consommateur
+            if stage.report and stage.show is None and stage.name not in self.reports:
+                status[stage.name] = "dropped: unused result"
+                continue
+
+            # Répétition d'une étape idempotente sans modification intermédiaire
+            if stage.idempotent:
+                previous = None
+                for i in range(len(kept) - 1, -1, -1):
+                    if kept[i].key() == stage.key():
+                        previous = i
+                        break
+                if previous is not None and not any(
+                    set(other.outputs) & set(stage.inputs) for other in kept[previous + 1:]
+                ):
+                    status[stage.name] = f"dropped: repeats {kept[previous].name}"
+                    continue
+
+            kept.append(stage)
+            status[stage.name] = "run"
+
+        stages = []
+        run = []
+        for stage in kept + [None]:
+            fusable = (
+                self.fuse and stage is not None and stage.column_ops
+                and stage.when is None and not stage.report
+            )
+            if fusable:
+                run.append(stage)
+                continue
+
+            if len(run) > 1:
+                fused = fuse_stages(run)
+                for member in run:
+                    status[member.name] = f"fused into {fused.name}"
+                stages.append(fused)
+            else:
+                stages.extend(run)
+            run = []
+
+            if stage is not None:
+                stages.append(stage)
+
+        # Moteur : mêmes étapes, fonctions remplacées
+        kernels = self._kernels()
+        for i, stage in enumerate(stages):
+            if stage.func in kernels:
+                stages[i] = copy.copy(stage)
+                stages[i].func = kernels[stage.func]
+                status[stage.name] = f"run ({self.engine})"
+
+        self._plan = (stages, status)
+        return self._plan
+
+    def describe(self):
+        """Tableau du plan : une ligne par étape déclarée."""
+        _, status = self.plan()
+        return pd.DataFrame([
+            {
+                "stage": stage.name,
+                "group": stage.group,
+                "inputs": ", ".join(stage.inputs),
+                "outputs": ", ".join(stage.outputs),
+                "status": status[stage.name],
+            }
+            for stage in self.stages
+        ])
+
+    # -----------------------------------------------------------
+    # Execution
+    # -----------------------------------------------------------
+    def run(self, df, tracer=None, titles=None, observer=None, executor=None, cache=None,
+            cache_key=None):
+        """
+        Exécute le plan sur df et retourne le DataFrame final (df n'est pas
+        modifié). Les résultats des reports sont gardés dans self.results
+        (clé : nom de l'étape).
+
+        titles (dict, optionnel) : {groupe ou étape: titre}, affiché à
+        l'entrée du groupe ou avant l'exécution de l'étape.
+
+        observer (optionnel) : objet avec before(stage, df) / after(stage, df),
+        appelé autour des étapes de transformation (ex. QualityReport).
+
+        executor (ParallelExecutor, optionnel) : les étapes consécutives
+        indépendantes sont exécutées en parallèle (voir parallel.py).
+
+        cache (StageCache, optionnel) : le DataFrame est enregistré à la fin
+        de chaque groupe d'étapes, et l'exécution reprend au dernier point
+        enregistré pour les mêmes entrée, étapes et arguments (voir
+        stage_cache.py). Pas de reprise avec un observer, ni après un report.
+        cache_key (str, optionnel) : clé de df (ex. empreinte du fichier
+        source) ; par défaut, empreinte de son contenu.
+        """
+        if tracer is None:
+            tracer = PipelineTracer(log_level=logging.DEBUG)
+
+        stages, _ = self.plan()
+        if executor is not None:
+            waves = executor.waves(stages)
+        else:
+            waves = [[stage] for stage in stages]
+
+        start, keys, checkpoints = 0, [], set()
+        if cache is not None:
+            keys = cache.wave_keys(cache_key or frame_key(df), waves)
+            checkpoints = cache.checkpoints(waves)
+            start = self._resume_point(waves, keys, checkpoints, cache) if observer is None else 0
+            if start:
+                resumed = waves[start - 1][-1].name
+                df = tracer.run(f"stage_cache[{resumed}]", lambda _df: cache.get(keys[start - 1]), df)
+                cache.stats["resumed_after"] = resumed
+                logger.debug("stage cache: resumed after %s", resumed)
+
+        # Copie superficielle : les étapes écrivent en place sans toucher df de l'appelant
+        df = df.copy(deep=False)
+
+        # Temps de calcul depuis le dernier point enregistré (cache.put)
+        since = time.perf_counter()
+        group = None
+        for i in range(start, len(waves)):
+            wave = waves[i]
+            for stage in wave:
+                if titles and stage.group != group and stage.group in titles:
+                    print(titles[stage.group])
+                group = stage.group
+
+                missing = [col for col in stage.inputs if col not in df.columns]
+                if missing:
+                    raise ValueError(
+                        f"Étape '{stage.name}' : colonnes manquantes {missing} "
+                        "(étape productrice retirée de la config ?)"
+                    )
+
+            if len(wave) > 1:
+                name = "parallel[" + "|".join(stage.name for stage in wave) + "]"
+                df = tracer.run(name, executor.run_wave, df, wave, observer)
+            else:
+                df = self._run_stage(wave[0], df, tracer, titles, observer)
+
+            if i in checkpoints and cache.put(keys[i], df, time.perf_counter() - since):
+                since = time.perf_counter()
+
+        return df
+
+    @staticmethod
+    def _resume_point(waves, keys, checkpoints, cache):
+        """Indice de la première vague à exécuter : après le dernier point enregistré (0 : aucun)."""
+        first_report = next((i for i, wave in enumerate(waves) if any(s.report for s in wave)), len(waves))
+        for i in sorted(checkpoints, reverse=True):
+            if i < first_report and keys[i] in cache:
+                return i + 1
+        return 0
+
+    def _run_stage(self, stage, df, tracer, titles, observer):
+        if stage.when is not None and not stage.when(df):
+            logger.debug("%s skipped (condition false)", stage.name)
+            return df
+
+        if titles and stage.name in titles:
+            print(titles[stage.name])
+
+        if observer is not None and not stage.report:
+            observer.before(stage, df)
+
+        result = tracer.run(stage.name, stage, df)
+
+        if stage.report:
+            self.results[stage.name] = result
+            if stage.show is not None:
+                stage.show(result)
+            return df
+
+        if observer is not None:
+            observer.after(stage, result)
+        return result
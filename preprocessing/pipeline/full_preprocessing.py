@@ -1,5 +1,14 @@
+import logging
+from contextlib import nullcontext
+
 import pandas as pd
 
+from .instrumentation import PipelineTracer
+from .engine import Pipeline, load_pipeline_config
+from .parallel import ParallelExecutor
+from .stage_cache import StageCache
+from .stages import preprocessing_stages, DISCOUNT_MAPPING
+
 # --- Import your preprocessing modules ---
 
 # 1) Loading
@@ -12,206 +21,98 @@ from ..s2_profiling.profiling import (
     generate_profiling_report,
 )
 
-# 3) Cleaning
-from ..s3_cleaning.missing_values import (
-    count_missing,
-    column_with_most_missing,
-    count_city_unknown,
-    drop_missing_rows,
-    fill_missing_dates,
-    fill_city_unknown,
-    count_unit_price_missing,
-    fill_unit_price_mean,
-    complete_amounts,
-    fix_region_with_city,
-)
-
 from ..s3_cleaning.type_fixing import (
-    convert_to_float,
-    convert_to_type,
-    convert_number_words_to_numeric,
-    detect_unusual_values,
-    clean_numeric_column,
+    convert_to_categorical,
 )
 
-from ..s3_cleaning.duplicates import (
-    count_duplicates,
-    drop_duplicates_all,
-    drop_duplicates_order_id,
-)
-
-from ..s3_cleaning.string_cleaning import (
-    clean_city_format,
-    replace_casa_variants,
-    replace_nan_columns_by_words,
-    standardize_case,
-    clean_city_column,
-    clean_region_column
-)
-from ..s3_cleaning.date_cleaning import (
-    normalize_date,
-)
-from ..s3_cleaning.outliers import (
-    detect_outliers_iqr, 
-    detect_outliers_zscore,
-    mark_outliers_iqr,
-)
+# The cleaning, feature and analysis stages are declared in stages.py
+# (preprocessing_stages) and run by the pipeline engine (engine.py).
 
-# 4) Features
-from ..s4_features.date_features import (
-    add_date_variables,
-    add_date_features,
-    convert_dates,
-    filter_after_date,
-)
-from ..s4_features.feature_engineering import (
-    apply_discount,
-)
-# 5) Analysis
-from ..s5_analysis.filtering import (
-    filter_quantity_gt_3,
-    filter_total_amount_gt_1000,
-    filter_region_casa_settat,
-    filter_not_cash,
-)
-
-from ..s5_analysis.descriptive_stats import (
-    summarize_total_amount,
-    region_highest_average_total,
-    product_highest_revenue,
-)
-from ..s5_analysis.grouped_kpis import (
-    average_monthly_revenue,
-    top_n_largest_orders,
-    compute_grouped_kpis,
-)
-from ..s5_analysis.time_series import (
-    analyze_time_series,
-)
 
 # ---------------------------------------------------------------------
 # 🔥 MASTER PIPELINE FUNCTION — runs all Q1–Q28 steps
 # ---------------------------------------------------------------------
-def full_preprocessing(path):
+def full_preprocessing(path, categorical=False, tracer=None, config=None, test_mode=False,
+                       quality=None, workers=None, backend="thread", engine="pandas",
+                       discount_mapping=DISCOUNT_MAPPING, cache=None):
     """
     Full preprocessing pipeline supporting:
     - Q1–Q28 steps
     - PDF project sections 1–11
-    """
-
-    # ----------------------------
-    # 1. LOAD DATA
-    # ----------------------------
-    df = load_data(path)
-
-    # ----------------------------
-    # 2. PROFILING (PDF: Section 2–5)
-    # ----------------------------
-   # generate_profiling_report(df)
-
 
-    # ----------------------------
-    # 3. TYPE FIXING (PDF 11–15)
-    # ----------------------------
-    df = clean_numeric_column(df, "quantity",True)
-    df.loc[df["order_id"]=="ORD000309"]
-    df = clean_numeric_column(df, "unit_price",True)
-    df=convert_to_type(df,["order_id","customer_id","product_category","product_id","discount_code","order_status","payment_method","total_amount"]
-                     , ["string","string","string","string","string","string","string","numerique"])
-
-    # generate_profiling_report(df)
-
-    # ----------------------------
-    # 4. TEXT CLEANING (PDF 16–20 + Q20–Q21)
-    # ----------------------------
-
-    df= clean_city_column(df, "city", test_mode=True)
-    df= clean_region_column(df, "region", test_mode=True)
-    df= standardize_case(df,["product_category","payment_method","city","region"])
+    categorical=True : les colonnes texte à faible cardinalité (region, city,
+    payment_method, ...) sont converties en pd.Categorical dès le chargement
+    (à la lecture pour un .csv) ;
+    les nettoyages de texte se font alors sur les catégories.
 
-    # ----------------------------
-    # 5. MISSING VALUES (Q5–Q9 + PDF recommendations)
-    # ----------------------------
-    df=complete_amounts(df, test_mode=True)
-    df=clean_region_column(df, "region", test_mode=True)
-    df=clean_city_column(df, "city", test_mode=True)
-    df=fix_region_with_city(df)
-    df = fill_missing_dates(df, ["order_date","ship_date"])
-    df=replace_nan_columns_by_words(df,["discount_code","region","city"],["No code","Unknown","Unknown"])
+    tracer (PipelineTracer, optionnel) : reçoit les mesures de chaque étape
+    (temps, CPU, lignes, mémoire) — voir pipeline/instrumentation.py.
 
+    config (dict ou chemin d'un fichier JSON, optionnel) : choix des étapes
+    (only / skip, noms d'étapes ou groupes), reports à garder, fusion des
+    opérations texte, test_mode et categorical — voir engine.load_pipeline_config.
 
-    # df = fill_city_unknown(df)
-    # df = fill_unit_price_mean(df)
-    # df = drop_missing_rows(df)
+    test_mode=True : les étapes de nettoyage affichent leurs diagnostics
+    (les étapes concernées ne sont alors pas fusionnées). Par défaut
+    (production), aucun diagnostic n'est calculé ni affiché.
 
-    # ----------------------------
-    # 6. DATE CLEANING (PDF 21–25 + Q22–Q25)
-    # ----------------------------
+    quality (QualityReport, optionnel) : suit un échantillon de lignes à
+    travers les étapes ; les diagnostics sont calculés à la demande
+    (quality.summary(), quality.examples(...)) — voir pipeline/quality.py.
 
-    df.loc[df["order_id"]=="ORD004306"]
-    df=normalize_date(df, "order_date", test_mode=True)
-    df=normalize_date(df, "ship_date", test_mode=True)
-    df.loc[df["order_id"]=="ORD004306"]
+    workers (int, optionnel) : exécute les étapes de colonnes indépendantes
+    en parallèle sur `workers` threads (backend="thread") ou processus
+    (backend="process") — voir pipeline/parallel.py. Résultat identique.
 
-    # ----------------------------
-    # FEATURE ENGINEERING 
-    # ----------------------------
-    df=add_date_variables(df)
-    discount_mapping = {
-    "SALE20": 0.2,       # 20% de remise
-    "FREESHIP": 0.0,     # gratuité livraison → pas de remise sur le prix
-    "WELCOME": 0.1,      # 10% de remise
-    "No code": 0.0,      # pas de remise
-    "AYD10": 0.1,        # 10% de remise
-    "RAMADAN10": 0.1     # 10% de remise
-    }
-    df = apply_discount(df, discount_mapping)
+    engine="pyarrow" : les étapes lourdes de nettoyage et de features
+    (dates, ville/région, remises) utilisent les implémentations colonnes de
+    pipeline/arrow_engine.py. Résultat identique.
 
+    discount_mapping (dict) : taux de remise par code (apply_discount).
 
-    # ----------------------------
-    # 7. DUPLICATES (Q10–Q12 + PDF 26–30)
-    # ----------------------------
-    df = drop_duplicates_all(df)
-    df = drop_duplicates_order_id(df)
+    cache (StageCache ou dossier, optionnel) : résultats intermédiaires
+    enregistrés à la fin de chaque groupe d'étapes ; une nouvelle exécution
+    sur le même fichier reprend au dernier groupe inchangé (ex. après un
+    changement de discount_mapping, le nettoyage n'est pas réexécuté) —
+    voir pipeline/stage_cache.py.
+    """
+    if isinstance(config, str):
+        config = load_pipeline_config(config)
+    config = config or {}
+    categorical = config.get("categorical", categorical)
+    test_mode = config.get("test_mode", test_mode)
+    workers = config.get("workers", workers)
+    backend = config.get("backend", backend)
+    cache = config.get("cache", cache)
+    if isinstance(cache, str):
+        cache = StageCache(cache)
+    config = {**config, "engine": config.get("engine", engine)}
+
+    if tracer is None:
+        tracer = PipelineTracer(log_level=logging.DEBUG)
+    run = tracer.run
 
     # ----------------------------
-    # 8. OUTLIERS (PDF 31–35 + Q26–Q28)
-    # ----------------------------
-    detect_outliers_iqr(df,'total_amount')
-    detect_outliers_zscore(df,'total_amount',3)
-    df=mark_outliers_iqr(df,'total_amount', test_mode=True)
-    # ----------------------------
-    # STATISTICAL ANALYSIS 
+    # 1. LOAD DATA
     # ----------------------------
-    stats = summarize_total_amount(df)
-
-    print("\n📊 Total Amount Statistics:")
-    print(f"- Mean   : {stats['mean']:.2f}")
-    print(f"- Median : {stats['median']:.2f}")
-    print(f"- Min    : {stats['min']:.2f}")
-    print(f"- Max    : {stats['max']:.2f}")
-
+    df = run("load_data", load_data, path, categorical=categorical)
+    if categorical:
+        df = run("convert_to_categorical", convert_to_categorical, df)
 
     # ----------------------------
-    # 10. GROUPED KPIs (PDF 41–45)
+    # 2. PROFILING (PDF: Section 2–5)
     # ----------------------------
-    results = compute_grouped_kpis(df)
-
-    print("Total Amount Statistics:\n", results["total_amount_stats"])
-    print("\nRegional Analysis:\n", results["region_analysis"])
-    print("\nCategory Analysis:\n", results["category_analysis"])
-    print("\nTop 5 Products:\n", results["top_5_products"])
-
+   # generate_profiling_report(df)
 
     # ----------------------------
-    # 11. TIME SERIES (PDF 46–50)
+    # 3–11. CLEANING, FEATURES, DUPLICATES, OUTLIERS, ANALYSIS
     # ----------------------------
-    results = analyze_time_series(df)
-
-    print(results["monthly_revenue"].head())
-    print(results["monthly_aov"].head())
-    print("Best month:", results["best_month"])
-    print("Revenue:", results["best_month_revenue"])
-
+    stages = preprocessing_stages(test_mode=test_mode, discount_mapping=discount_mapping)
+    pipeline = Pipeline.from_config(stages, config)
+    # Clé du DataFrame chargé : empreinte du fichier (pas de hash des lignes)
+    cache_key = StageCache.file_key(path, categorical) if cache is not None else None
+    with ParallelExecutor(workers, backend) if workers else nullcontext() as executor:
+        df = pipeline.run(df, tracer, observer=quality, executor=executor, cache=cache,
+                          cache_key=cache_key)
 
     return df
@@ -0,0 +1,405 @@
+import glob
+import json
+import logging
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from .instrumentation import PipelineTracer
+from .engine import Pipeline
+from .stages import preprocessing_stages, DATE_COLUMNS
+from .chunked_preprocessing import drop_seen, fill_values_from_sums, outlier_parameters
+
+# 1) Loading
+from ..s1_loading.loading import (
+    load_data_tail,
+    load_data_chunks,
+    append_data,
+    truncate_data,
+)
+
+# 3) Cleaning
+from ..s3_cleaning.missing_values import (
+    derive_amounts,
+    amount_fill_statistics,
+    date_value_counts,
+    mode_from_counts,
+)
+from ..s3_cleaning.date_cleaning import (
+    guess_date_format,
+    convert_dates_with_formats,
+)
+from ..s3_cleaning.dedup_index import DedupIndex
+from ..s3_cleaning.outlier_stats import OutlierStats
+
+# 5) Analysis
+from ..s5_analysis.mergeable_kpis import (
+    kpi_aggregates,
+    merge_kpi_aggregates,
+    kpis_from_aggregates,
+)
+
+# ---------------------------------------------------------------------
+# Purpose of this file:
+# ---------------------------------------------------------------------
+# Mode incrémental (append-only) : le flux de commandes ne fait qu'ajouter
+# des lignes, on ne retraite donc que les nouvelles. L'état du pipeline est
+# gardé dans un dossier (state_dir) entre deux passages :
+#
+#   state.json          sommes / effectifs des moyennes de complete_amounts,
+#                       effectifs par date (modes de fill_missing_dates),
+#                       formats de date figés, lignes déjà lues et taille
+#                       par fichier d'entrée, lignes et taille validées par
+#                       fichier de sortie, fichiers ci-dessous de l'état,
+#                       agrégats des KPIs (région, catégorie, produit, mois)
+#   seen_rows.<n>.npy   hash des lignes déjà vues (drop_duplicates_all)
+#   seen_order_ids.<n>.npy
+#                       hash des order_id déjà vus (drop_duplicates_order_id)
+#   total_amount.<n>.npz
+#                       statistiques de total_amount (OutlierStats : bornes
+#                       IQR, z-score, médiane), toutes les valeurs en mode
+#                       exact ou un sketch de quantiles avec rank_error
+#
+# Un passage est validé par le remplacement atomique de state.json, écrit
+# en dernier : les autres fichiers de l'état sont écrits sous un nouveau
+# numéro <n> (ceux du passage précédent restent ceux de state.json jusque-
+# là), et la sortie est ramenée au début d'un passage à sa taille validée
+# (lignes ajoutées par un passage interrompu avant state.json retirées).
+#
+#   summary = full_preprocessing_incremental("data/orders.csv", "results/clean.csv",
+#                                            state_dir="results/state")
+#   summary["kpis"], summary["time_series"]
+#
+# Les lignes nouvelles sont complétées avec les statistiques de tout
+# l'historique ; les lignes déjà écrites ne sont pas réécrites.
+
+STATE_FILE = "state.json"
+SEEN_ROWS_FILE = "seen_rows.npy"
+SEEN_IDS_FILE = "seen_order_ids.npy"
+AMOUNTS_FILE = "total_amount.npz"
+STATE_VERSION = 4
+
+
+def _numbered(name, number):
+    """seen_rows.npy → seen_rows.<number>.npy"""
+    root, ext = os.path.splitext(name)
+    return f"{root}.{number}{ext}"
+
+
+def _frame_to_json(frame):
+    index = [key.isoformat() if isinstance(key, pd.Timestamp) else key for key in frame.index]
+    return {"index": index, "columns": {col: frame[col].tolist() for col in frame.columns}}
+
+
+def _frame_from_json(data, dates=False):
+    index = pd.to_datetime(data["index"]) if dates else pd.Index(data["index"], dtype=object)
+    return pd.DataFrame(data["columns"], index=index)
+
+
+def _counts_to_json(counts):
+    return {key.isoformat(): int(value) for key, value in counts.items()}
+
+
+def _counts_from_json(data):
+    return pd.Series(list(data.values()), index=pd.to_datetime(list(data)), dtype="int64")
+
+
+class PipelineState:
+    """
+    État persisté du mode incrémental (voir l'en-tête du fichier).
+    PipelineState.load(state_dir) retourne un état vide si le dossier
+    n'existe pas encore.
+    """
+
+    def __init__(self, state_dir, rank_error=None):
+        self.state_dir = state_dir
+        self.offsets = {}
+        self.sizes = {}
+        self.outputs = {}
+        self.files = {"seen_rows": SEEN_ROWS_FILE, "seen_ids": SEEN_IDS_FILE, "amounts": AMOUNTS_FILE}
+        self.number = 0
+        self.date_formats = None
+        self.sums = {"quantity": [0.0, 0], "unit_price": [0.0, 0]}
+        self.date_counts = {col: pd.Series(dtype="int64") for col in DATE_COLUMNS}
+        self.aggregates = None
+        self.runs = []
+        self.seen_rows = DedupIndex()
+        self.seen_ids = DedupIndex(columns=["order_id"])
+        self.amounts = OutlierStats(rank_error)
+
+    @classmethod
+    def load(cls, state_dir, rank_error=None):
+        """rank_error : précision des quantiles d'un nouvel état (voir OutlierStats)."""
+        state = cls(state_dir, rank_error)
+        path = os.path.join(state_dir, STATE_FILE)
+        if not os.path.exists(path):
+            return state
+
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != STATE_VERSION:
+            raise ValueError(f"Version d'état non supportée : {data.get('version')}")
+
+        state.offsets = data["offsets"]
+        # Absents des états écrits avant le suivi des tailles et des sorties
+        state.sizes = data.get("sizes", {})
+        state.outputs = data.get("outputs", {})
+        state.files = data.get("files", state.files)
+        state.number = data.get("number", 0)
+        state.date_formats = data["date_formats"]
+        state.sums = data["sums"]
+        state.date_counts = {col: _counts_from_json(counts) for col, counts in data["date_counts"].items()}
+        state.runs = data["runs"]
+        if data["aggregates"] is not None:
+            aggregates = data["aggregates"]
+            state.aggregates = {
+                name: _frame_from_json(aggregates[name], dates=name == "monthly")
+                for name in ("region", "category", "product", "monthly")
+            }
+            state.aggregates["total"] = aggregates["total"]
+
+        state.seen_rows = DedupIndex(path=os.path.join(state_dir, state.files["seen_rows"]))
+        state.seen_ids = DedupIndex(columns=["order_id"], path=os.path.join(state_dir, state.files["seen_ids"]))
+        state.amounts = OutlierStats.load(os.path.join(state_dir, state.files["amounts"]))
+        return state
+
+    def save(self):
+        """
+        Écrit l'état. Les index et statistiques vont dans de nouveaux
+        fichiers (numéro suivant) ; le remplacement atomique de state.json,
+        qui les désigne, valide le tout. Les fichiers de l'état précédent
+        (ou d'une sauvegarde interrompue) sont supprimés ensuite.
+        """
+        os.makedirs(self.state_dir, exist_ok=True)
+
+        number = self.number + 1
+        files = {
+            "seen_rows": _numbered(SEEN_ROWS_FILE, number),
+            "seen_ids": _numbered(SEEN_IDS_FILE, number),
+            "amounts": _numbered(AMOUNTS_FILE, number),
+        }
+        self.seen_rows.save(os.path.join(self.state_dir, files["seen_rows"]))
+        self.seen_ids.save(os.path.join(self.state_dir, files["seen_ids"]))
+        self.amounts.save(os.path.join(self.state_dir, files["amounts"]))
+
+        aggregates = None
+        if self.aggregates is not None:
+            aggregates = {
+                name: _frame_to_json(self.aggregates[name])
+                for name in ("region", "category", "product", "monthly")
+            }
+            aggregates["total"] = self.aggregates["total"]
+
+        data = {
+            "version": STATE_VERSION,
+            "offsets": self.offsets,
+            "sizes": self.sizes,
+            "outputs": self.outputs,
+            "files": files,
+            "number": number,
+            "date_formats": self.date_formats,
+            "sums": self.sums,
+            "date_counts": {col: _counts_to_json(counts) for col, counts in self.date_counts.items()},
+            "aggregates": aggregates,
+            "runs": self.runs,
+        }
+        path = os.path.join(self.state_dir, STATE_FILE)
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+        self.files, self.number = files, number
+
+        for name in (SEEN_ROWS_FILE, SEEN_IDS_FILE, AMOUNTS_FILE):
+            root, ext = os.path.splitext(name)
+            pattern = os.path.join(glob.escape(self.state_dir), f"{root}.*{ext}")
+            for old in glob.glob(pattern) + [os.path.join(self.state_dir, name)]:
+                if os.path.basename(old) not in files.values() and os.path.exists(old):
+                    os.remove(old)
+
+    # -----------------------------------------------------------
+    # Output
+    # -----------------------------------------------------------
+    def restore_output(self, output_path):
+        """
+        Ramène output_path à sa taille validée par le dernier state.json : les
+        lignes ajoutées par un passage interrompu avant la sauvegarde de l'état
+        sont retirées (sinon elles seraient écrites deux fois). Une sortie pas
+        encore suivie est enregistrée telle quelle.
+        """
+        key = os.path.abspath(output_path)
+        size = os.path.getsize(output_path) if os.path.exists(output_path) else 0
+        committed = self.outputs.get(key)
+        if committed is not None and size == committed["bytes"]:
+            return
+        if committed is None:
+            rows = sum(len(chunk) for chunk in load_data_chunks(output_path)) if size else 0
+            self.outputs[key] = {"rows": rows, "bytes": size}
+        elif size < committed["bytes"]:
+            raise ValueError(
+                f"{output_path} est plus petit que la sortie validée ({committed['rows']} lignes) : "
+                "la sortie a été modifiée hors du pipeline (utiliser un nouveau state_dir)"
+            )
+        else:
+            truncate_data(output_path, committed["rows"], committed["bytes"])
+            committed["bytes"] = os.path.getsize(output_path) if committed["bytes"] else 0
+        self.save()
+
+    def commit_output(self, output_path, rows):
+        """rows lignes ajoutées à output_path (validées par le prochain save())."""
+        key = os.path.abspath(output_path)
+        self.outputs[key] = {
+            "rows": self.outputs[key]["rows"] + rows,
+            "bytes": os.path.getsize(output_path) if os.path.exists(output_path) else 0,
+        }
+
+    # -----------------------------------------------------------
+    # Statistics
+    # -----------------------------------------------------------
+    def update_statistics(self, df):
+        """Ajoute les sommes / effectifs et effectifs par date des nouvelles lignes (df nettoyé)."""
+        if self.date_formats is None:
+            self.date_formats = {col: guess_date_format(df[col]) for col in DATE_COLUMNS}
+
+        stats = derive_amounts(df.copy(deep=False))
+        for col, (total, count) in amount_fill_statistics(stats).items():
+            self.sums[col][0] += total
+            self.sums[col][1] += count
+
+        stats = convert_dates_with_formats(stats, self.date_formats)
+        for col in DATE_COLUMNS:
+            counts = self.date_counts[col].add(date_value_counts(stats, col), fill_value=0)
+            self.date_counts[col] = counts.astype("int64")
+
+    def fill_values(self):
+        return fill_values_from_sums(self.sums)
+
+    def modes(self):
+        return {col: mode_from_counts(counts) for col, counts in self.date_counts.items()}
+
+    def add_rows(self, df):
+        """Lignes écrites : agrégats des KPIs."""
+        self.aggregates = merge_kpi_aggregates(self.aggregates, kpi_aggregates(df))
+
+    def kpis(self):
+        """(kpis, time_series) de toutes les lignes écrites."""
+        if self.aggregates is None:
+            return None, None
+        return kpis_from_aggregates(self.aggregates, self.amounts.median())
+
+
+# ---------------------------------------------------------------------
+# 🔥 INCREMENTAL PIPELINE FUNCTION
+# ---------------------------------------------------------------------
+def full_preprocessing_incremental(path, output_path, state_dir, tracer=None, rank_error=None):
+    """
+    Même nettoyage que full_preprocessing, limité aux lignes nouvelles depuis
+    le dernier passage, ajoutées à output_path (.csv, .parquet, .feather,
+    .arrow).
+
+    Lignes nouvelles :
+    - un fichier déjà traité (même chemin) est supposé allongé en fin de
+      fichier : les lignes déjà lues sont sautées à la lecture (non
+      converties pour un .csv, voir load_data_tail) ; un fichier plus petit
+      qu'au passage précédent est refusé
+    - les lignes et order_id déjà vus (dans le fichier ou lors d'un passage
+      précédent) sont retirés
+
+    Un passage interrompu (avant la sauvegarde de l'état) ne compte pas : le
+    suivant retire de output_path les lignes qu'il avait ajoutées et reprend
+    avec l'état précédent.
+
+    Les moyennes, modes des dates et bornes des outliers sont ceux de tout
+    l'historique (état persisté dans state_dir) ; les KPIs et séries
+    mensuelles sont fusionnés avec ceux des passages précédents.
+
+    rank_error (float, optionnel) : à la création de l'état, quantiles de
+    total_amount approchés par un sketch de taille fixe au lieu de garder
+    toutes les valeurs (voir s3_cleaning/outlier_stats.py).
+
+    Returns:
+        dict: résumé du passage, avec kpis (compute_grouped_kpis) et
+        time_series (analyze_time_series) de toutes les lignes écrites
+    """
+    if tracer is None:
+        tracer = PipelineTracer(log_level=logging.DEBUG)
+    run = tracer.run
+
+    state = PipelineState.load(state_dir, rank_error)
+    run("restore_output", state.restore_output, output_path)
+
+    key = os.path.abspath(path)
+    offset = state.offsets.get(key, 0)
+    size = os.path.getsize(path)
+    if size < state.sizes.get(key, 0):
+        raise ValueError(
+            f"{path} est plus petit qu'au dernier passage ({offset} lignes déjà traitées) : "
+            "le fichier n'est pas en ajout seul (utiliser un nouveau state_dir)"
+        )
+    try:
+        df = run("load_data", load_data_tail, path, offset)
+    except ValueError as error:
+        raise ValueError(f"{error} Le fichier n'est pas en ajout seul (utiliser un nouveau state_dir)") from None
+    rows_in = len(df)
+
+    # ----------------------------
+    # 1. CLEANING + HISTORY STATISTICS
+    # ----------------------------
+    stages = preprocessing_stages()
+    df = Pipeline(stages).select(only=["type_fixing", "text_cleaning"]).run(df, tracer)
+    run("update_statistics", state.update_statistics, df)
+
+    # ----------------------------
+    # 2. MISSING VALUES, DATES, FEATURES (with history values), DEDUP (indexes)
+    # ----------------------------
+    clean = Pipeline(preprocessing_stages(
+        fill_values=state.fill_values(),
+        modes=state.modes(),
+        date_formats=state.date_formats,
+    )).select(skip=["type_fixing", "text_cleaning", "duplicates", "outliers", "analysis"])
+    df = clean.run(df, tracer)
+    df = run("drop_seen", drop_seen, df, state.seen_rows, state.seen_ids)
+
+    # ----------------------------
+    # 3. OUTLIERS (bounds of the whole history)
+    # ----------------------------
+    run("update_outlier_stats", state.amounts.update, df["total_amount"])
+    moments, bounds = outlier_parameters(state.amounts)
+    outliers = Pipeline(preprocessing_stages(moments=moments, bounds=bounds)).select(only=["outliers"])
+    df = outliers.run(df, tracer)
+
+    # ----------------------------
+    # 4. APPEND OUTPUT, MERGE KPIs, SAVE STATE
+    # ----------------------------
+    if len(df):
+        run("append_output", append_data, df, output_path)
+        run("merge_kpis", state.add_rows, df)
+    state.commit_output(output_path, len(df))
+
+    # Lignes déjà vues lors d'un passage précédent (hors doublons internes au fichier)
+    already_seen = sum(int(index.stats()["seen_before"].sum()) for index in (state.seen_rows, state.seen_ids))
+    state.offsets[key] = offset + rows_in
+    state.sizes[key] = size
+    state.runs.append({
+        "input": key,
+        "at": datetime.now().isoformat(timespec="seconds"),
+        "rows_in": rows_in,
+        "rows_out": len(df),
+    })
+    state.save()
+
+    kpis, time_series = state.kpis()
+    return {
+        "rows_in": rows_in,
+        "rows_out": len(df),
+        "rows_skipped": offset,
+        "duplicates_removed": rows_in - len(df),
+        "already_seen": already_seen,
+        "rows_total": sum(r["rows_out"] for r in state.runs),
+        "fill_values": state.fill_values(),
+        "modes": state.modes(),
+        "iqr_bounds": bounds,
+        "kpis": kpis,
+        "time_series": time_series,
+        "output_path": output_path,
+    }
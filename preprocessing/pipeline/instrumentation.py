@@ -0,0 +1,243 @@
+import json
+import logging
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------------------------
+# Purpose of this file:
+# ---------------------------------------------------------------------
+# Instrumentation des étapes du pipeline : pour chaque étape on mesure
+# le temps réel, le temps CPU, les lignes en entrée / sortie et la
+# variation de mémoire du DataFrame. Les mesures sont :
+#   - envoyées aux callbacks (ex. barre de progression) et au logger
+#     "preprocessing.pipeline"
+#   - consultables sous forme de tableau (summary)
+#   - exportables en JSON ou en trace Chrome (chrome://tracing, Perfetto)
+#
+# track_copies=True : compte aussi, par étape, les colonnes dont les données
+# ont été recopiées (aucun tampon mémoire commun avec l'entrée). Avec la
+# copie à l'écriture, une étape qui ne modifie que ses colonnes ne recopie
+# rien d'autre ; une étape qui garde les lignes et recopie aussi toutes les
+# colonnes qu'elle ne déclare pas écrire (hors colonnes pyarrow, immuables
+# et partagées même par df.copy()) a fait une copie complète du DataFrame
+# (full_copies()).
+
+logger = logging.getLogger("preprocessing.pipeline")
+
+
+def column_buffers(series):
+    """
+    Adresses des tampons de données d'une colonne (deux colonnes sans adresse
+    commune ne partagent pas leurs données). Tableaux numpy, datetime,
+    catégories (codes), masqués (Int64, Float64, boolean) et pyarrow.
+    """
+    values = series.array
+    if isinstance(values, pd.Categorical):
+        values = values.codes
+    elif isinstance(values, pd.arrays.ArrowExtensionArray):
+        # __arrow_array__ : le ChunkedArray pyarrow de la colonne, sans copie
+        return {
+            buffer.address
+            for chunk in values.__arrow_array__().chunks
+            for buffer in chunk.buffers() if buffer is not None and buffer.size
+        }
+    elif hasattr(values, "_mask"):
+        # Tableaux masqués : valeurs numpy dans _data (pas d'accès public sans copie)
+        values = values._data
+
+    values = np.asarray(values)
+    return {values.__array_interface__["data"][0]} if values.size else set()
+
+
+def copied_columns(before, after):
+    """Colonnes de after dont les données ne partagent rien avec before (adresses de column_buffers)."""
+    return [
+        col for col in after.columns
+        if before.get(col) and not (column_buffers(after[col]) & before[col])
+    ]
+
+
+def frame_memory(df, deep=False):
+    """Mémoire du DataFrame en octets (None si ce n'est pas un DataFrame)."""
+    if not isinstance(df, pd.DataFrame):
+        return None
+    return int(df.memory_usage(index=True, deep=deep).sum())
+
+
+class PipelineTracer:
+    """
+    Mesure les étapes d'un pipeline.
+
+        tracer = PipelineTracer(callbacks=[print_record])
+        df = tracer.run("clean_city_column", clean_city_column, df, "city")
+        tracer.summary()
+        tracer.to_chrome_trace("results/trace.json")
+
+    Parameters:
+        callbacks (list): fonctions callback(event, record) appelées avec
+            event="start" (record = {"stage": ...}) puis event="end"
+            (record complet)
+        deep_memory (bool): mémoire "deep" (compte les chaînes Python,
+            coûteux sur de gros DataFrames object) ; par défaut shallow
+        log_level (int): niveau des messages du logger (None = pas de log)
+        track_copies (bool): compte les colonnes recopiées par chaque étape
+            (copied_columns, full_copy) — voir full_copies()
+    """
+
+    def __init__(self, callbacks=None, deep_memory=False, log_level=logging.INFO,
+                 track_copies=False):
+        self.callbacks = list(callbacks or [])
+        self.deep_memory = deep_memory
+        self.track_copies = track_copies
+        self.log_level = log_level
+        self.records = []
+        self._origin = time.perf_counter()
+
+    def _emit(self, event, record):
+        for callback in self.callbacks:
+            callback(event, record)
+
+    def run(self, stage, func, df, *args, **kwargs):
+        """
+        Exécute func(df, *args, **kwargs) en la mesurant et retourne son résultat.
+        Si le résultat n'est pas un DataFrame (analyse), rows_out / mémoire
+        de sortie sont ceux de df.
+        """
+        self._emit("start", {"stage": stage})
+
+        rows_in = len(df) if isinstance(df, pd.DataFrame) else None
+        mem_before = frame_memory(df, self.deep_memory)
+        buffers = None
+        if self.track_copies and isinstance(df, pd.DataFrame):
+            buffers = {col: column_buffers(df[col]) for col in df.columns}
+
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        result = func(df, *args, **kwargs)
+        cpu = time.process_time() - cpu_start
+        end = time.perf_counter()
+
+        out = result if isinstance(result, pd.DataFrame) else df
+        mem_after = frame_memory(out, self.deep_memory)
+
+        record = {
+            "stage": stage,
+            "start_s": start - self._origin,
+            "wall_s": end - start,
+            "cpu_s": cpu,
+            "rows_in": rows_in,
+            "rows_out": len(out) if isinstance(out, pd.DataFrame) else None,
+            "mem_before_bytes": mem_before,
+            "mem_after_bytes": mem_after,
+            "mem_delta_bytes": (
+                mem_after - mem_before
+                if mem_before is not None and mem_after is not None else None
+            ),
+        }
+        if buffers is not None:
+            copied = copied_columns(buffers, out)
+            # Colonnes que l'étape ne déclare pas écrire (Stage.outputs), hors
+            # colonnes pyarrow : immuables, jamais recopiées par df.copy()
+            outputs = set(getattr(func, "outputs", ()))
+            kept = [col for col in out.columns if buffers.get(col) and col not in outputs
+                    and not isinstance(out[col].array, pd.arrays.ArrowExtensionArray)]
+            record["copied_columns"] = len(copied)
+            record["full_copy"] = bool(kept) and set(kept) <= set(copied) and len(out) == rows_in
+        self.records.append(record)
+
+        if self.log_level is not None:
+            logger.log(
+                self.log_level,
+                "%-36s %8.3fs wall %8.3fs cpu  rows %s → %s",
+                stage, record["wall_s"], record["cpu_s"], record["rows_in"], record["rows_out"],
+            )
+        self._emit("end", record)
+
+        return result
+
+    # -----------------------------------------------------------
+    # Reports
+    # -----------------------------------------------------------
+    def summary(self, by_stage=False):
+        """
+        Tableau des étapes (une ligne par exécution). by_stage=True agrège
+        les exécutions répétées d'une même étape (ex. traitement par blocs).
+        """
+        columns = ["stage", "wall_s", "cpu_s", "rows_in", "rows_out",
+                   "mem_before_mb", "mem_after_mb", "mem_delta_mb"]
+        if self.track_copies:
+            columns += ["copied_columns", "full_copy"]
+        if not self.records:
+            return pd.DataFrame(columns=columns)
+
+        table = pd.DataFrame(self.records)
+        if self.track_copies:
+            # Exécutions sans DataFrame en entrée : pas de mesure de copie
+            table = table.reindex(columns=table.columns.union(["copied_columns", "full_copy"], sort=False))
+        for col in ["mem_before", "mem_after", "mem_delta"]:
+            table[f"{col}_mb"] = table[f"{col}_bytes"].astype("Float64") / 2**20
+        types = {"rows_in": "Int64", "rows_out": "Int64"}
+        if self.track_copies:
+            types.update(copied_columns="Int64", full_copy="boolean")
+        table = table[columns].astype(types)
+
+        if by_stage:
+            table = table.groupby("stage", sort=False).agg(
+                calls=("wall_s", "size"),
+                wall_s=("wall_s", "sum"),
+                cpu_s=("cpu_s", "sum"),
+                rows_in=("rows_in", lambda rows: rows.sum(min_count=1)),
+                rows_out=("rows_out", lambda rows: rows.sum(min_count=1)),
+                mem_delta_mb=("mem_delta_mb", "sum"),
+                **({"copied_columns": ("copied_columns", "sum"), "full_copy": ("full_copy", "sum")}
+                   if self.track_copies else {}),
+            ).reset_index()
+
+        total = table["wall_s"].sum()
+        table["pct_wall"] = (100 * table["wall_s"] / total).round(1) if total else 0.0
+        return table
+
+    def full_copies(self):
+        """Étapes qui ont recopié tout le DataFrame (track_copies=True)."""
+        if not self.track_copies:
+            raise ValueError("Copies non suivies : PipelineTracer(track_copies=True).")
+        return [r["stage"] for r in self.records if r.get("full_copy")]
+
+    def to_json(self, path):
+        """Exporte les mesures brutes en JSON."""
+        _ensure_folder(path)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"stages": self.records}, f, indent=2)
+        return path
+
+    def to_chrome_trace(self, path):
+        """
+        Exporte une trace au format Chrome Trace Event (événements "X"),
+        lisible dans chrome://tracing ou https://ui.perfetto.dev.
+        """
+        events = [
+            {
+                "name": r["stage"],
+                "cat": "stage",
+                "ph": "X",
+                "ts": r["start_s"] * 1e6,
+                "dur": r["wall_s"] * 1e6,
+                "pid": os.getpid(),
+                "tid": 0,
+                "args": {k: v for k, v in r.items() if k not in ("stage", "start_s", "wall_s")},
+            }
+            for r in self.records
+        ]
+        _ensure_folder(path)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return path
+
+
+def _ensure_folder(path):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
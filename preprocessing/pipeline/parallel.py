@@ -0,0 +1,134 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# ---------------------------------------------------------------------
+# Purpose of this file:
+# ---------------------------------------------------------------------
+# Exécution parallèle des étapes indépendantes d'un Pipeline (engine.py).
+#
+# Les étapes consécutives qui ne se gênent pas (aucune n'écrit une colonne
+# lue ou écrite par une autre, d'après leurs inputs / outputs déclarés) sont
+# regroupées en "vagues". Dans une vague, chaque worker ne reçoit que les
+# colonnes de son étape (pas le DataFrame entier), et ne renvoie que les
+# colonnes écrites, qui sont ensuite réassignées au DataFrame dans l'ordre
+# déclaré : le résultat est identique à l'exécution séquentielle.
+#
+#   backend="thread"  : pas de copie ni de sérialisation (copy-on-write) ;
+#                       utile pour le travail qui relâche le GIL (chaînes
+#                       pyarrow, to_datetime, calculs numpy)
+#   backend="process" : contourne le GIL (apply Python, mapping ligne à
+#                       ligne) au prix de la sérialisation des colonnes
+#
+# Les étapes qui changent les lignes (doublons, filtres), les reports et les
+# étapes conditionnelles restent exécutées seules.
+
+BACKENDS = {
+    "thread": ThreadPoolExecutor,
+    "process": ProcessPoolExecutor,
+}
+
+
+def is_parallel_safe(stage):
+    """Étape de colonnes : lit ses inputs, écrit ses outputs, garde les lignes."""
+    return not stage.report and stage.when is None and bool(stage.outputs)
+
+
+def _conflicts(stage, wave):
+    reads, writes = set(stage.inputs), set(stage.outputs)
+    for other in wave:
+        if writes & (set(other.inputs) | set(other.outputs)) or reads & set(other.outputs):
+            return True
+    return False
+
+
+def plan_waves(stages):
+    """
+    Découpe une liste d'étapes en vagues d'étapes consécutives indépendantes
+    (une vague d'une seule étape est exécutée normalement).
+    """
+    waves = []
+    current = []
+
+    for stage in stages:
+        if is_parallel_safe(stage) and not _conflicts(stage, current):
+            current.append(stage)
+            continue
+
+        if current:
+            waves.append(current)
+        if is_parallel_safe(stage):
+            current = [stage]
+        else:
+            current = []
+            waves.append([stage])
+
+    if current:
+        waves.append(current)
+    return waves
+
+
+def _run_columns(func, args, kwargs, frame, outputs):
+    """Exécute une étape sur ses seules colonnes (dans le worker) et renvoie ses outputs."""
+    result = func(frame, *args, **kwargs)
+    return result[[col for col in outputs if col in result.columns]]
+
+
+class ParallelExecutor:
+    """
+    Pool de workers pour Pipeline.run(..., executor=...).
+
+        with ParallelExecutor(workers=8, backend="process") as executor:
+            df = pipeline.run(df, tracer, executor=executor)
+
+    Parameters:
+        workers (int): nombre de workers (par défaut : nombre de cœurs)
+        backend (str): "thread" ou "process"
+    """
+
+    def __init__(self, workers=None, backend="thread"):
+        if backend not in BACKENDS:
+            raise ValueError(f"Backend inconnu : {backend} (choix : {sorted(BACKENDS)})")
+        self.workers = workers or os.cpu_count()
+        self.backend = backend
+        self._pool = None
+
+    def __enter__(self):
+        self._pool = BACKENDS[self.backend](max_workers=self.workers)
+        return self
+
+    def __exit__(self, *exc):
+        self._pool.shutdown()
+        self._pool = None
+
+    def waves(self, stages):
+        return plan_waves(stages)
+
+    def run_wave(self, df, wave, observer=None):
+        """Exécute une vague en parallèle puis fusionne les colonnes écrites dans df."""
+        if self._pool is None:
+            raise RuntimeError("ParallelExecutor doit être utilisé dans un bloc with.")
+
+        futures = []
+        for stage in wave:
+            columns = [col for col in df.columns if col in stage.inputs or col in stage.outputs]
+            futures.append(self._pool.submit(
+                _run_columns, stage.func, stage.args, stage.kwargs, df[columns], stage.outputs
+            ))
+
+        # Fusion dans l'ordre déclaré (même ordre de colonnes qu'en séquentiel)
+        for stage, future in zip(wave, futures):
+            part = future.result()
+            if len(part) != len(df) or not part.index.equals(df.index):
+                raise ValueError(
+                    f"Étape '{stage.name}' : les lignes ont changé, elle ne peut pas "
+                    "être exécutée en parallèle (outputs à vider ?)"
+                )
+
+            if observer is not None:
+                observer.before(stage, df)
+            for col in part.columns:
+                df[col] = part[col]
+            if observer is not None:
+                observer.after(stage, df)
+
+        return df
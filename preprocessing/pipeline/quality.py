@@ -0,0 +1,200 @@
+import json
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------------------------
+# Purpose of this file:
+# ---------------------------------------------------------------------
+# Rapport qualité du pipeline, sans coût en mode production :
+#   - pendant l'exécution, on ne garde que les mêmes lignes échantillonnées
+#     (sample_size lignes) des colonnes écrites par chaque étape, avant et
+#     après l'étape, plus le nombre total de lignes
+#   - les diagnostics (valeurs modifiées, devenues manquantes, complétées,
+#     exemples avant → après, estimations sur tout le fichier avec marge
+#     d'erreur) ne sont calculés que lorsqu'on les demande
+#
+#   report = QualityReport(sample_size=2000)
+#   df = full_preprocessing(path, quality=report)
+#   report.summary()
+#   report.examples("clean_numeric_column[quantity]", "quantity")
+#   report.to_json("results/quality.json")
+#
+# Sans QualityReport, le pipeline ne fait aucun de ces calculs.
+
+# Quantile de la loi normale pour un intervalle de confiance à 95 %
+Z_95 = 1.96
+
+
+def _same(before, after):
+    """
+    Même valeur avant / après une étape (NA == NA). Une simple conversion de
+    type ("12.5" → 12.5, "2023-01-05" → Timestamp) n'est pas une modification.
+    """
+    if pd.isna(before) and pd.isna(after):
+        return True
+    if pd.isna(before) or pd.isna(after):
+        return False
+    try:
+        if isinstance(after, pd.Timestamp):
+            return pd.Timestamp(before) == after
+        if isinstance(after, (int, float, np.number)) and not isinstance(after, bool):
+            return float(before) == float(after)
+        return bool(before == after)
+    except (TypeError, ValueError):
+        return False
+
+
+class QualityReport:
+    """
+    Observateur du moteur de pipeline (Pipeline.run(..., observer=report)).
+
+    Parameters:
+        sample_size (int): nombre de lignes suivies (tirées au hasard au
+            premier appel, puis suivies par leur label d'index)
+        seed (int): graine du tirage
+        max_examples (int): exemples avant → après gardés par colonne
+    """
+
+    def __init__(self, sample_size=1000, seed=0, max_examples=5):
+        self.sample_size = sample_size
+        self.seed = seed
+        self.max_examples = max_examples
+        self.snapshots = []
+        self._labels = None
+        self._index = None
+        self._positions = None
+        self._before = None
+
+    # -----------------------------------------------------------
+    # Collection (called by the engine, O(sample_size) per stage)
+    # -----------------------------------------------------------
+    def _sample(self, df, columns):
+        if self._labels is None:
+            rng = np.random.default_rng(self.seed)
+            n_sample = min(self.sample_size, len(df))
+            self._positions = np.sort(rng.choice(len(df), size=n_sample, replace=False))
+            self._labels = df.index[self._positions]
+            self._index = df.index
+
+        # Nouvel index (lignes retirées) : on retrouve les lignes suivies
+        if df.index is not self._index:
+            positions = df.index.get_indexer_for(self._labels)
+            self._positions = positions[positions >= 0]
+            self._index = df.index
+
+        columns = [col for col in columns if col in df.columns]
+        return df[columns].iloc[self._positions]
+
+    def before(self, stage, df):
+        self._before = (len(df), self._sample(df, stage.outputs))
+
+    def after(self, stage, df):
+        rows_before, sample_before = self._before
+        self.snapshots.append({
+            "stage": stage.name,
+            "rows_before": rows_before,
+            "rows_after": len(df),
+            "before": sample_before,
+            "after": self._sample(df, stage.outputs),
+        })
+        self._before = None
+
+    # -----------------------------------------------------------
+    # Diagnostics (computed on request)
+    # -----------------------------------------------------------
+    def _compare(self, snapshot, column):
+        before = snapshot["before"][column]
+        after = snapshot["after"][column] if column in snapshot["after"] else None
+        before = before[~before.index.duplicated()]
+        if after is None:
+            return before, None, None
+        after = after[~after.index.duplicated()]
+
+        common = before.index.intersection(after.index)
+        before = before.loc[common].astype(object)
+        after = after.loc[common].astype(object)
+        changed = np.array([not _same(b, a) for b, a in zip(before, after)], dtype=bool)
+        return before, after, changed
+
+    def summary(self):
+        """
+        Une ligne par (étape, colonne écrite) : lignes totales, lignes
+        échantillonnées, part modifiée (± marge à 95 %), estimation du nombre
+        de lignes modifiées sur tout le fichier, valeurs devenues manquantes
+        ou complétées dans l'échantillon, dtypes avant / après.
+        """
+        rows = []
+        for snapshot in self.snapshots:
+            columns = list(snapshot["after"].columns) or [None]
+            for column in columns:
+                row = {
+                    "stage": snapshot["stage"],
+                    "column": column,
+                    "rows_before": snapshot["rows_before"],
+                    "rows_after": snapshot["rows_after"],
+                }
+                if column is not None and column in snapshot["before"]:
+                    before, after, changed = self._compare(snapshot, column)
+                    n = len(changed)
+                    share = changed.mean() if n else np.nan
+                    margin = Z_95 * math.sqrt(share * (1 - share) / n) if n else np.nan
+                    row.update({
+                        "sampled": n,
+                        "changed_pct": round(100 * share, 2),
+                        "margin_pct": round(100 * margin, 2),
+                        "est_changed_rows": round(share * snapshot["rows_after"]) if n else None,
+                        "became_missing": int((before.notna() & after.isna()).sum()),
+                        "filled": int((before.isna() & after.notna()).sum()),
+                        "dtype_before": str(snapshot["before"][column].dtype),
+                        "dtype_after": str(snapshot["after"][column].dtype),
+                    })
+                elif column is not None:
+                    # colonne créée par l'étape
+                    values = snapshot["after"][column]
+                    row.update({
+                        "sampled": len(values),
+                        "became_missing": int(values.isna().sum()),
+                        "dtype_after": str(values.dtype),
+                    })
+                rows.append(row)
+
+        return pd.DataFrame(rows)
+
+    def examples(self, stage, column, n=None):
+        """Lignes échantillonnées modifiées par stage sur column (avant / après)."""
+        n = n or self.max_examples
+        for snapshot in self.snapshots:
+            if snapshot["stage"] == stage and column in snapshot["before"]:
+                before, after, changed = self._compare(snapshot, column)
+                return pd.DataFrame({
+                    "before": before[changed],
+                    "after": after[changed],
+                }).head(n)
+        raise ValueError(f"Pas d'observation pour l'étape '{stage}' et la colonne '{column}'.")
+
+    def to_dict(self):
+        """Résumé + exemples, sérialisables en JSON."""
+        summary = self.summary()
+        examples = {}
+        for row in summary.itertuples():
+            if getattr(row, "changed_pct", 0) and row.changed_pct > 0:
+                table = self.examples(row.stage, row.column)
+                examples.setdefault(row.stage, {})[row.column] = [
+                    {"before": str(b), "after": str(a)} for b, a in zip(table["before"], table["after"])
+                ]
+        return {
+            "sample_size": self.sample_size,
+            "stages": json.loads(summary.to_json(orient="records")),
+            "examples": examples,
+        }
+
+    def to_json(self, path):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+        return path
@@ -0,0 +1,371 @@
+import functools
+import hashlib
+import logging
+import os
+import re
+import time
+import types
+
+import numpy as np
+import pandas as pd
+
+from ..s1_loading.loading import file_digest
+from ..s3_cleaning.dedup_index import hash_column, hash_rows
+from .instrumentation import frame_memory
+
+# ---------------------------------------------------------------------
+# Purpose of this file:
+# ---------------------------------------------------------------------
+# Cache des résultats d'étapes du pipeline (Pipeline.run(df, cache=...)),
+# sur disque, adressé par le contenu :
+#   - clé d'entrée : empreinte du DataFrame d'entrée (hash_rows, index,
+#     types, attrs) ou clé fournie par l'appelant (ex. empreinte du fichier)
+#   - clé après une étape = hash(clé précédente, identité de l'étape) ;
+#     l'identité d'une étape est sa fonction (module, nom et bytecode), ses
+#     arguments et sa condition when (fonctions, partial, dict, listes... :
+#     stage_token). Le code des fonctions, classes et constantes du paquet
+#     que la fonction utilise est suivi récursivement (_function_token) :
+#     modifier un utilitaire appelé par une étape change sa clé. Les
+#     reports ne changent pas la clé.
+#
+# Le DataFrame est écrit en Parquet (<clé>.parquet) à la fin de chaque
+# groupe d'étapes (type_fixing, text_cleaning, ..., features), sauf si les
+# étapes depuis le dernier point enregistré ont été plus rapides que
+# l'écriture ne le serait (write_rate). Une nouvelle exécution reprend au
+# dernier point enregistré : après un changement de
+# discount_mapping (apply_discount, groupe features), les étapes de
+# nettoyage ne sont pas réexécutées.
+#
+# Taille limitée à max_bytes : les fichiers les moins récemment utilisés
+# (date de modification, remise à jour à chaque lecture) sont supprimés.
+#
+# Non suivis par les clés : les fichiers de données lus par les étapes
+# (table d'alias morocco_places.json) et le code des bibliothèques externes
+# (pandas, numpy...). Après une modification de ce type : cache.clear().
+
+logger = logging.getLogger("preprocessing.pipeline")
+
+CACHE_VERSION = 1
+
+# Paquet dont les fonctions sont suivies dans les clés (code des fonctions appelées)
+PACKAGE = __name__.split(".")[0]
+
+# Variables globales suivies par leur valeur (constantes de module)
+CONSTANT_TYPES = (type(None), bool, int, float, complex, str, bytes, np.generic,
+                  list, tuple, dict, set, frozenset, re.Pattern)
+
+
+class UncacheableStage(ValueError):
+    """Argument d'étape sans représentation stable (objet identifié par son adresse)."""
+
+
+def _digest(*parts, size=16):
+    digest = hashlib.blake2b(digest_size=size)
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+def _const_token(const):
+    """Constante du bytecode ; frozenset trié (l'ordre d'itération dépend de PYTHONHASHSEED)."""
+    if isinstance(const, types.CodeType):
+        return _code_token(const)
+    if isinstance(const, frozenset):
+        return "frozenset(" + ",".join(sorted(map(_const_token, const))) + ")"
+    if isinstance(const, tuple):
+        return "(" + ",".join(map(_const_token, const)) + ")"
+    return repr(const)
+
+
+def _code_token(code):
+    """Empreinte du bytecode d'une fonction (et des fonctions imbriquées)."""
+    return _digest(code.co_code, *map(_const_token, code.co_consts), *code.co_names, size=8)
+
+
+def _global_names(code):
+    """Noms lus par le code (variables globales, attributs), fonctions imbriquées comprises."""
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names |= _global_names(const)
+    return names
+
+
+def _in_package(value):
+    module = value.__name__ if isinstance(value, types.ModuleType) else getattr(value, "__module__", None)
+    return isinstance(module, str) and module.split(".")[0] == PACKAGE
+
+
+def _function_token(func, seen):
+    """
+    Empreinte d'une fonction du paquet : son bytecode et tout ce qu'elle lit
+    dans ses variables globales (fonctions, classes et modules du paquet,
+    récursivement ; constantes). Une modification d'une fonction appelée
+    change donc l'empreinte de l'étape.
+    """
+    code = func.__code__
+    if code in seen:
+        # Appel récursif en cours : le nom suffit
+        return seen[code] or f"{func.__module__}.{func.__qualname__}"
+    seen[code] = None
+
+    names = _global_names(code)
+    parts = [f"{func.__module__}.{func.__qualname__}", _code_token(code)]
+    for name in sorted(names & set(func.__globals__)):
+        value = func.__globals__[name]
+        if name.startswith("_") and isinstance(value, (dict, list, set)):
+            # Caches de module (_CACHE...) : contenu variable d'un appel à l'autre
+            continue
+        parts.append(f"{name}={_global_token(value, names, seen)}")
+    seen[code] = _digest(*parts, size=8)
+    return seen[code]
+
+
+def _global_token(value, names, seen):
+    """Empreinte d'une variable globale lue par une fonction du paquet (names : noms lus)."""
+    if isinstance(value, types.ModuleType):
+        if not _in_package(value):
+            return value.__name__
+        attributes = sorted(name for name in names if hasattr(value, name))
+        return value.__name__ + "(" + ",".join(
+            f"{name}={_global_token(getattr(value, name), names, seen)}" for name in attributes) + ")"
+    if isinstance(value, type):
+        if not _in_package(value):
+            return f"{value.__module__}.{value.__qualname__}"
+        members = []
+        for name, member in sorted(vars(value).items()):
+            member = getattr(member, "__func__", getattr(member, "fget", member))
+            if isinstance(member, types.FunctionType):
+                members.append(f"{name}={_function_token(member, seen)}")
+        return f"{value.__module__}.{value.__qualname__}(" + ",".join(members) + ")"
+    if isinstance(value, CONSTANT_TYPES) or callable(value):
+        try:
+            return stage_token(value, seen=seen)
+        except UncacheableStage:
+            return type(value).__qualname__
+    # Objets d'exécution (logger, verrous...) : pas de contenu à suivre
+    return type(value).__qualname__
+
+
+def stage_token(value, depth=0, seen=None):
+    """
+    Représentation texte stable d'une fonction ou d'un argument d'étape :
+    identique d'une exécution à l'autre tant que la valeur (ou le code de la
+    fonction et des fonctions du paquet qu'elle appelle) ne change pas.
+    UncacheableStage si ce n'est pas possible.
+    """
+    if depth > 20:
+        raise UncacheableStage("Argument trop imbriqué")
+    seen = {} if seen is None else seen
+    token = functools.partial(stage_token, depth=depth + 1, seen=seen)
+
+    if value is None or isinstance(value, (bool, int, float, complex, str, bytes, np.generic)):
+        return repr(value)
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}({','.join(map(token, value))})"
+    if isinstance(value, dict):
+        items = sorted(f"{token(k)}:{token(v)}" for k, v in value.items())
+        return "dict(" + ",".join(items) + ")"
+    if isinstance(value, (set, frozenset)):
+        return "set(" + ",".join(sorted(map(token, value))) + ")"
+    if isinstance(value, functools.partial):
+        return f"partial({token(value.func)},{token(value.args)},{token(value.keywords)})"
+    if isinstance(value, types.FunctionType):
+        closure = [cell.cell_contents for cell in value.__closure__ or ()]
+        code = _function_token(value, seen) if _in_package(value) else _code_token(value.__code__)
+        return (f"{value.__module__}.{value.__qualname__}:{code}"
+                f"({token(value.__defaults__)},{token(value.__kwdefaults__)},{token(closure)})")
+    if isinstance(value, types.MethodType):
+        return f"method({token(value.__func__)},{token(value.__self__)})"
+    if isinstance(value, (type, types.BuiltinFunctionType, types.ModuleType)):
+        return f"{getattr(value, '__module__', '')}.{getattr(value, '__qualname__', value.__name__)}"
+    if hasattr(value, "__wrapped__"):
+        # functools.lru_cache, functools.wraps
+        return f"wrapped({token(value.__wrapped__)})"
+    if isinstance(value, re.Pattern):
+        return f"re.compile({value.pattern!r},{value.flags})"
+    if isinstance(value, (pd.Series, pd.Index, np.ndarray)):
+        values = pd.Series(np.asarray(value).ravel()) if isinstance(value, np.ndarray) else pd.Series(value)
+        return f"{type(value).__name__}({values.dtype},{len(values)},{_digest(hash_column(values, na_types=True).tobytes())})"
+    if isinstance(value, pd.DataFrame):
+        return f"DataFrame({frame_key(value)})"
+
+    text = repr(value)
+    if " at 0x" in text:
+        raise UncacheableStage(f"Pas de représentation stable : {text}")
+    return f"{type(value).__module__}.{type(value).__qualname__}:{text}"
+
+
+def frame_key(df):
+    """Empreinte du contenu d'un DataFrame (valeurs, index, colonnes, types, attrs)."""
+    if isinstance(df.index, pd.RangeIndex):
+        index = repr(df.index)
+    else:
+        index = _digest(hash_column(df.index.to_series(), na_types=True).tobytes())
+    return _digest(
+        CACHE_VERSION,
+        hash_rows(df, na_types=True).tobytes() if len(df.columns) else len(df),
+        index,
+        repr(list(df.columns)),
+        repr([str(dtype) for dtype in df.dtypes]),
+        repr(sorted(df.attrs.items())),
+    )
+
+
+def stage_key(previous, stage):
+    """Clé du DataFrame produit par stage à partir du DataFrame de clé previous."""
+    return _digest(previous, stage_token((stage.func, stage.args, stage.kwargs, stage.when)))
+
+
+class StageCache:
+    """
+    Cache disque des DataFrames intermédiaires du pipeline (voir l'en-tête
+    du fichier).
+
+        cache = StageCache("results/stage_cache", max_bytes=2 * 2**30)
+        df = pipeline.run(df, tracer, cache=cache)
+        cache.summary()   # points enregistrés, reprise, taille
+
+    Parameters:
+        folder (str): dossier des fichiers <clé>.parquet
+        max_bytes (int): taille maximale du dossier (éviction LRU)
+        write_rate (float): débit d'écriture estimé (octets de DataFrame par
+            seconde), mis à jour à chaque écriture ; un résultat plus rapide
+            à recalculer qu'à écrire n'est pas enregistré
+    """
+
+    def __init__(self, folder="results/stage_cache", max_bytes=2 * 2**30, write_rate=200 * 2**20):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.write_rate = write_rate
+        self.stats = {"resumed_after": None, "hits": 0, "stored": 0, "skipped": 0, "evicted": 0}
+
+    def path(self, key):
+        return os.path.join(self.folder, f"{key}.parquet")
+
+    def __contains__(self, key):
+        return key is not None and os.path.exists(self.path(key))
+
+    def entries(self):
+        """Fichiers du cache, du moins récemment utilisé au plus récent : (chemin, taille, date)."""
+        if not os.path.isdir(self.folder):
+            return []
+        entries = []
+        for name in os.listdir(self.folder):
+            if name.endswith(".parquet"):
+                stat = os.stat(os.path.join(self.folder, name))
+                entries.append((os.path.join(self.folder, name), stat.st_size, stat.st_mtime))
+        return sorted(entries, key=lambda entry: entry[2])
+
+    def size_bytes(self):
+        return sum(size for _, size, _ in self.entries())
+
+    # -----------------------------------------------------------
+    # Clés
+    # -----------------------------------------------------------
+    @staticmethod
+    def file_key(path, *params):
+        """Clé d'un DataFrame lu depuis path (empreinte du fichier et paramètres de lecture)."""
+        return _digest(CACHE_VERSION, "file", file_digest(path), *map(repr, params))
+
+    def wave_keys(self, input_key, waves):
+        """
+        Clé du DataFrame après chaque vague d'étapes (reports : clé inchangée).
+        None à partir de la première étape sans représentation stable.
+        """
+        keys = []
+        key = input_key
+        for wave in waves:
+            for stage in wave:
+                if key is None or stage.report:
+                    continue
+                try:
+                    key = stage_key(key, stage)
+                except UncacheableStage as error:
+                    logger.debug("stage cache disabled from %s: %s", stage.name, error)
+                    key = None
+            keys.append(key)
+        return keys
+
+    @staticmethod
+    def checkpoints(waves):
+        """Vagues après lesquelles le DataFrame est enregistré : fin de chaque groupe d'étapes."""
+        transforms = [i for i, wave in enumerate(waves) if not all(stage.report for stage in wave)]
+        points = set()
+        for i, following in zip(transforms, transforms[1:] + [None]):
+            if following is None or waves[i][-1].group != waves[following][0].group:
+                points.add(i)
+        return points
+
+    # -----------------------------------------------------------
+    # Lecture / écriture
+    # -----------------------------------------------------------
+    def get(self, key):
+        """DataFrame enregistré sous key (marqué comme récemment utilisé)."""
+        path = self.path(key)
+        df = pd.read_parquet(path)
+        os.utime(path)
+        self.stats["hits"] += 1
+        return df
+
+    def put(self, key, df, compute_s=None):
+        """
+        Enregistre df sous key puis applique la limite de taille. Retourne
+        True si df est dans le cache après l'appel.
+
+        compute_s : temps de calcul de df depuis le dernier point enregistré ;
+        df n'est pas écrit si l'écriture estimée (taille / write_rate) est
+        plus longue que ce calcul. Pas d'écriture non plus si df ne se relit
+        pas à l'identique en Parquet (colonnes object : types non conservés).
+        """
+        if key is None:
+            return False
+        if key in self:
+            return True
+        if compute_s is not None and compute_s < frame_memory(df) / self.write_rate:
+            self.stats["skipped"] += 1
+            return False
+        if any(dtype == object for dtype in df.dtypes):
+            logger.debug("stage cache: %s not stored (object columns)", key)
+            return False
+
+        os.makedirs(self.folder, exist_ok=True)
+        tmp_path = f"{self.path(key)}.{os.getpid()}.tmp"
+        start = time.perf_counter()
+        try:
+            df.to_parquet(tmp_path)
+        except (ImportError, ValueError, TypeError) as error:
+            logger.debug("stage cache: %s not stored (%s)", key, error)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        elapsed = time.perf_counter() - start
+        if elapsed > 0:
+            self.write_rate = max(frame_memory(df), 1) / elapsed
+        if os.path.getsize(tmp_path) > self.max_bytes:
+            os.remove(tmp_path)
+            return False
+        os.replace(tmp_path, self.path(key))
+        self.stats["stored"] += 1
+        self.evict()
+        return True
+
+    def evict(self):
+        """Supprime les fichiers les moins récemment utilisés au-delà de max_bytes."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+            self.stats["evicted"] += 1
+
+    def clear(self):
+        """Vide le cache."""
+        for path, _, _ in self.entries():
+            os.remove(path)
+
+    def summary(self):
+        return {**self.stats, "entries": len(self.entries()), "size_mb": self.size_bytes() / 2**20}
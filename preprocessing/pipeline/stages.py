@@ -0,0 +1,442 @@
+from functools import partial
+
+from .engine import Stage
+
+# 3) Cleaning
+from ..s3_cleaning.missing_values import (
+    count_missing,
+    column_with_most_missing,
+    count_city_unknown,
+    drop_missing_rows,
+    fill_missing_dates,
+    fill_city_unknown,
+    count_unit_price_missing,
+    fill_unit_price_mean,
+    complete_amounts,
+    fix_region_with_city,
+)
+from ..s3_cleaning.type_fixing import (
+    convert_to_type,
+    clean_numeric_column,
+)
+from ..s3_cleaning.duplicates import (
+    count_duplicates,
+    drop_duplicates_all,
+    drop_duplicates_order_id,
+)
+from ..s3_cleaning.string_cleaning import (
+    clean_city_format,
+    replace_casa_variants,
+    replace_nan_columns_by_words,
+    standardize_case,
+    clean_city_column,
+    clean_region_column,
+    strip_text,
+    title_text,
+    normalize_city,
+    normalize_region,
+    replace_casa_text,
+    fill_text_na,
+)
+from ..s3_cleaning.date_cleaning import (
+    normalize_date,
+    convert_dates_with_formats,
+)
+from ..s3_cleaning.outliers import (
+    detect_outliers_iqr,
+    detect_outliers_zscore,
+    mark_outliers_iqr,
+)
+
+# 4) Features
+from ..s4_features.date_features import (
+    add_date_variables,
+    add_date_features,
+    materialize_date_variables,
+    has_pending_date_variables,
+    convert_dates,
+    filter_after_date,
+)
+from ..s4_features.feature_engineering import (
+    apply_discount,
+)
+
+# 5) Analysis
+from ..s5_analysis.filtering import (
+    filter_quantity_gt_3,
+    filter_total_amount_gt_1000,
+    filter_region_casa_settat,
+    filter_not_cash,
+)
+from ..s5_analysis.descriptive_stats import (
+    summarize_total_amount,
+    region_highest_average_total,
+    product_highest_revenue,
+)
+from ..s5_analysis.grouped_kpis import (
+    average_monthly_revenue,
+    top_n_largest_orders,
+    compute_grouped_kpis,
+)
+from ..s5_analysis.time_series import (
+    analyze_time_series,
+    plot_time_series,
+)
+
+# ---------------------------------------------------------------------
+# Purpose of this file:
+# ---------------------------------------------------------------------
+# Déclaration des étapes des pipelines (voir engine.py) :
+#   - preprocessing_stages() : full_preprocessing et le mode par blocs
+#   - basic_stages()         : pipeline Q1–Q28 de bup.py
+#
+# Groupes de preprocessing_stages (utilisables dans only / skip) :
+#   type_fixing, text_cleaning, missing_values, dates, features,
+#   duplicates, outliers, analysis
+
+# Mapping des codes de remise vers un taux de remise
+DISCOUNT_MAPPING = {
+    "SALE20": 0.2,       # 20% de remise
+    "FREESHIP": 0.0,     # gratuité livraison → pas de remise sur le prix
+    "WELCOME": 0.1,      # 10% de remise
+    "No code": 0.0,      # pas de remise
+    "AYD10": 0.1,        # 10% de remise
+    "RAMADAN10": 0.1     # 10% de remise
+}
+
+DATE_COLUMNS = ["order_date", "ship_date"]
+
+STRING_COLUMNS = ["order_id", "customer_id", "product_category", "product_id",
+                  "discount_code", "order_status", "payment_method"]
+
+NAN_WORDS = {"discount_code": "No code", "region": "Unknown", "city": "Unknown"}
+
+DATE_VARIABLES = [
+    f"{prefix}_{part}"
+    for prefix in ("order", "ship")
+    for part in ("year", "month", "day", "weekday")
+]
+
+
+def add_zscore(df, column="total_amount", threshold=3, moments=None):
+    """detect_outliers_zscore ne garde que sa colonne zscore_<column> : retourne df."""
+    detect_outliers_zscore(df, column, threshold, moments=moments)
+    return df
+
+
+def drop_duplicate_orders(df):
+    """drop_duplicates_all puis drop_duplicates_order_id."""
+    return drop_duplicates_order_id(drop_duplicates_all(df))
+
+
+# -----------------------------------------------------------
+# Printing of the analysis results
+# -----------------------------------------------------------
+def show_total_amount_stats(stats):
+    print("\n📊 Total Amount Statistics:")
+    print(f"- Mean   : {stats['mean']:.2f}")
+    print(f"- Median : {stats['median']:.2f}")
+    print(f"- Min    : {stats['min']:.2f}")
+    print(f"- Max    : {stats['max']:.2f}")
+
+
+def show_grouped_kpis(results):
+    print("Total Amount Statistics:\n", results["total_amount_stats"])
+    print("\nRegional Analysis:\n", results["region_analysis"])
+    print("\nCategory Analysis:\n", results["category_analysis"])
+    print("\nTop 5 Products:\n", results["top_5_products"])
+
+
+def show_time_series(results):
+    print(results["monthly_revenue"].head())
+    print(results["monthly_aov"].head())
+    print("Best month:", results["best_month"])
+    print("Revenue:", results["best_month_revenue"])
+
+
+# ---------------------------------------------------------------------
+# full_preprocessing
+# ---------------------------------------------------------------------
+def preprocessing_stages(test_mode=False, fill_values=None, modes=None, date_formats=None,
+                         moments=None, bounds=None, discount_mapping=DISCOUNT_MAPPING):
+    """
+    Étapes de full_preprocessing, dans l'ordre.
+
+    Les paramètres globaux optionnels servent au traitement par blocs
+    (calculés sur tout le fichier) :
+        fill_values (dict): moyennes de complete_amounts
+        modes (dict): modes de fill_missing_dates
+        date_formats (dict): formats de date figés ; ajoute l'étape convert_dates
+        moments (tuple), bounds (dict): z-score et bornes IQR
+
+    Remarque : clean_city_column / clean_region_column ne sont déclarées
+    qu'une fois et standardize_case ne touche pas city / region. L'ancien
+    enchaînement (Title Case puis second nettoyage en minuscules) donnait
+    exactement le même résultat.
+    """
+    # Les étapes qui affichent en test_mode ne sont pas fusionnables
+    def ops(column_ops):
+        return None if test_mode else column_ops
+
+    stages = [
+        # ----------------------------
+        # TYPE FIXING (PDF 11–15)
+        # ----------------------------
+        Stage("clean_numeric_column[quantity]", clean_numeric_column,
+              args=("quantity",), kwargs={"test_mode": test_mode},
+              inputs=["quantity"], outputs=["quantity"], group="type_fixing"),
+        Stage("clean_numeric_column[unit_price]", clean_numeric_column,
+              args=("unit_price",), kwargs={"test_mode": test_mode},
+              inputs=["unit_price"], outputs=["unit_price"], group="type_fixing"),
+        Stage("convert_to_type[numeric]", convert_to_type,
+              args=(["total_amount"], ["numerique"]),
+              inputs=["total_amount"], outputs=["total_amount"], group="type_fixing"),
+        Stage("convert_to_type[string]", convert_to_type,
+              args=(STRING_COLUMNS, ["string"] * len(STRING_COLUMNS)),
+              inputs=STRING_COLUMNS, outputs=STRING_COLUMNS, group="type_fixing",
+              column_ops={col: strip_text for col in STRING_COLUMNS}, idempotent=True),
+
+        # ----------------------------
+        # TEXT CLEANING (PDF 16–20 + Q20–Q21)
+        # ----------------------------
+        Stage("clean_city_column", clean_city_column,
+              args=("city",), kwargs={"test_mode": test_mode},
+              inputs=["city"], outputs=["city"], group="text_cleaning",
+              column_ops=ops({"city": normalize_city}), idempotent=True),
+        Stage("clean_region_column", clean_region_column,
+              args=("region",), kwargs={"test_mode": test_mode},
+              inputs=["region"], outputs=["region"], group="text_cleaning",
+              column_ops=ops({"region": normalize_region}), idempotent=True),
+        Stage("standardize_case", standardize_case,
+              args=(["product_category", "payment_method"],),
+              inputs=["product_category", "payment_method"],
+              outputs=["product_category", "payment_method"], group="text_cleaning",
+              column_ops={"product_category": title_text, "payment_method": title_text},
+              idempotent=True),
+
+        # ----------------------------
+        # MISSING VALUES (Q5–Q9 + PDF recommendations)
+        # ----------------------------
+        Stage("complete_amounts", complete_amounts,
+              kwargs={"test_mode": test_mode, "fill_values": fill_values},
+              inputs=["quantity", "unit_price", "total_amount"],
+              outputs=["quantity", "unit_price", "total_amount"], group="missing_values"),
+        Stage("fix_region_with_city", fix_region_with_city,
+              inputs=["city", "region"], outputs=["city", "region"], group="missing_values"),
+    ]
+
+    if date_formats:
+        stages.append(
+            Stage("convert_dates", convert_dates_with_formats, args=(date_formats,),
+                  inputs=list(date_formats), outputs=list(date_formats), group="missing_values")
+        )
+
+    stages += [
+        Stage("fill_missing_dates", fill_missing_dates,
+              args=(DATE_COLUMNS,), kwargs={"modes": modes},
+              inputs=DATE_COLUMNS, outputs=DATE_COLUMNS, group="missing_values"),
+        Stage("replace_nan_columns_by_words", replace_nan_columns_by_words,
+              args=(list(NAN_WORDS), list(NAN_WORDS.values())),
+              inputs=list(NAN_WORDS), outputs=list(NAN_WORDS), group="missing_values",
+              column_ops={col: partial(fill_text_na, word=word) for col, word in NAN_WORDS.items()}),
+
+        # ----------------------------
+        # DATE CLEANING (PDF 21–25 + Q22–Q25)
+        # ----------------------------
+        Stage("normalize_date[order_date]", normalize_date,
+              args=("order_date",), kwargs={"test_mode": test_mode},
+              inputs=["order_date"], outputs=["order_date"], group="dates"),
+        Stage("normalize_date[ship_date]", normalize_date,
+              args=("ship_date",), kwargs={"test_mode": test_mode},
+              inputs=["ship_date"], outputs=["ship_date"], group="dates"),
+
+        # ----------------------------
+        # FEATURE ENGINEERING
+        # ----------------------------
+        # Variables de date seulement déclarées (df.attrs, dates déjà converties
+        # par normalize_date) : pas d'outputs, l'étape voit tout le DataFrame
+        # (jamais en parallèle). Créées par materialize_date_variables, après
+        # dédoublonnage et outliers, à leur place dans les colonnes.
+        Stage("add_date_variables", add_date_variables, kwargs={"lazy": True},
+              inputs=DATE_COLUMNS, group="features"),
+        Stage("apply_discount", apply_discount, args=(discount_mapping,),
+              inputs=["discount_code", "total_amount"],
+              outputs=["discount_rate", "discount_amount", "net_amount", "tax"], group="features"),
+
+        # ----------------------------
+        # DUPLICATES (Q10–Q12 + PDF 26–30)
+        # ----------------------------
+        Stage("drop_duplicates_all", drop_duplicates_all, group="duplicates"),
+        Stage("drop_duplicates_order_id", drop_duplicates_order_id,
+              inputs=["order_id"], group="duplicates"),
+
+        # ----------------------------
+        # OUTLIERS (PDF 31–35 + Q26–Q28)
+        # ----------------------------
+        # Bornes seules : déjà calculées par mark_outliers_iqr, gardé sur demande (config "reports")
+        Stage("detect_outliers_iqr", detect_outliers_iqr, args=("total_amount",),
+              inputs=["total_amount"], group="outliers", report=True),
+        Stage("detect_outliers_zscore", add_zscore, args=("total_amount", 3),
+              kwargs={"moments": moments},
+              inputs=["total_amount"], outputs=["zscore_total_amount"], group="outliers"),
+        Stage("mark_outliers_iqr", mark_outliers_iqr, args=("total_amount",),
+              kwargs={"test_mode": test_mode, "bounds": bounds},
+              inputs=["total_amount"], outputs=["is_outlier_total_amount_iqr"], group="outliers"),
+
+        Stage("materialize_date_variables", materialize_date_variables,
+              inputs=DATE_COLUMNS, outputs=DATE_VARIABLES, group="features",
+              when=has_pending_date_variables),
+
+        # ----------------------------
+        # STATISTICAL ANALYSIS, GROUPED KPIs (PDF 41–45), TIME SERIES (PDF 46–50)
+        # ----------------------------
+        # cache=True : un seul cube des KPIs (kpi_cube) et un seul rollup journalier
+        # (daily_rollup) pour les reports d'analyse
+        Stage("summarize_total_amount", summarize_total_amount, kwargs={"cache": True},
+              inputs=["total_amount"], group="analysis",
+              report=True, show=show_total_amount_stats),
+        Stage("compute_grouped_kpis", compute_grouped_kpis, kwargs={"cache": True},
+              inputs=["total_amount", "region", "product_category", "product_id", "order_id"],
+              group="analysis", report=True, show=show_grouped_kpis),
+        Stage("analyze_time_series", analyze_time_series, kwargs={"cache": True},
+              inputs=["order_date", "total_amount"], group="analysis",
+              report=True, show=show_time_series),
+        # Graphique (matplotlib) : seulement si demandé dans config["reports"]
+        Stage("plot_time_series", plot_time_series, kwargs={"cache": True},
+              inputs=["order_date", "total_amount"], group="analysis", report=True),
+    ]
+
+    return stages
+
+
+# ---------------------------------------------------------------------
+# bup.py — Q1–Q28 walkthrough
+# ---------------------------------------------------------------------
+BASIC_TITLES = {
+    "missing_values": "\n--- Handling Missing Values (Q5–Q9) ---",
+    "drop_missing_rows": "Dropping rows with ANY missing values",
+    "duplicates": "\n--- Handling Duplicates (Q10–Q12) ---",
+    "drop_duplicates": "Dropping all duplicate rows",
+    "filtering": "\n--- Filtering Examples (Q13–Q16) ---",
+    "descriptive_stats": "\n--- Descriptive Statistics (Q17–Q19) ---",
+    "text_cleaning": "\n--- Cleaning String Columns (Q20–Q21) ---\n"
+                     "Cleaning city format and replacing Casa variants",
+    "dates": "\n--- Handling Dates (Q22–Q25) ---",
+    "add_date_features": "Adding date features: year, month, weekday",
+    "filter_after_date": "filtering orders after 2022-01-01",
+    "outliers": "\n--- Detecting Outliers (Q26–Q28) ---",
+    "detect_outliers_zscore": "Outliers detected by Z-score method:",
+}
+
+
+def _show_fill_message(column, how):
+    def show(count):
+        if count > 0:
+            print(f"Filling missing {column} values with {how}")
+        else:
+            print(f"No missing {column} values to fill")
+    return show
+
+
+def _print_with(label):
+    return lambda result: print(label, result)
+
+
+def _print_label(label):
+    # Libellé seul (le résultat n'est pas affiché, comme dans bup.py d'origine)
+    return lambda result: print(label)
+
+
+def _print_block(label):
+    def show(result):
+        print(label)
+        print(result)
+    return show
+
+
+def basic_stages(after_date="2022-01-01"):
+    """Étapes du pipeline Q1–Q28 (bup.py), dans l'ordre, avec leurs affichages."""
+    return [
+        # Missing Values (Q5–Q9)
+        Stage("count_missing", count_missing, group="missing_values",
+              report=True, show=print),
+        Stage("column_with_most_missing", column_with_most_missing, group="missing_values",
+              report=True, show=_print_with("Column with most missing:")),
+        Stage("count_city_unknown", count_city_unknown, inputs=["city"], group="missing_values",
+              report=True, show=_show_fill_message("city", "'Unknown'")),
+        Stage("fill_city_unknown", fill_city_unknown,
+              inputs=["city"], outputs=["city"], group="missing_values"),
+        Stage("count_unit_price_missing", count_unit_price_missing, inputs=["unit_price"],
+              group="missing_values", report=True, show=_show_fill_message("unit_price", "mean")),
+        Stage("fill_unit_price_mean", fill_unit_price_mean,
+              inputs=["unit_price"], outputs=["unit_price"], group="missing_values"),
+        # do NOT drop rows in pipeline unless required
+        Stage("drop_missing_rows", drop_missing_rows, group="missing_values"),
+        Stage("missing_after_cleaning", lambda df: (count_missing(df), df.shape),
+              group="missing_values", report=True,
+              show=lambda result: print("Missing values after cleaning:\n", *result)),
+
+        # Duplicates (Q10–Q12)
+        Stage("count_duplicates", count_duplicates, group="duplicates",
+              report=True, show=_print_with("Duplicate count:")),
+        Stage("drop_duplicates", drop_duplicate_orders, inputs=["order_id"], group="duplicates",
+              when=lambda df: count_duplicates(df) > 0),
+
+        # Filtering (Q13–Q16)
+        Stage("filter_quantity_gt_3", filter_quantity_gt_3, inputs=["quantity"],
+              group="filtering", report=True, show=_print_with("Filtering quantity > 3")),
+        Stage("filter_total_amount_gt_1000", filter_total_amount_gt_1000, inputs=["total_amount"],
+              group="filtering", report=True, show=_print_with("Filtering total_amount > 1000")),
+        Stage("filter_region_casa_settat", filter_region_casa_settat, inputs=["region"],
+              group="filtering", report=True, show=_print_with("Filtering region Casablanca-Settat")),
+        Stage("filter_not_cash", filter_not_cash, inputs=["payment_method"],
+              group="filtering", report=True, show=_print_with("Filtering payment_method not Cash")),
+
+        # Descriptive Statistics (Q17–Q19)
+        Stage("summarize_total_amount", summarize_total_amount, kwargs={"cache": True},
+              inputs=["total_amount"], group="descriptive_stats", report=True, show=_print_with("Total amount summary:")),
+        Stage("region_highest_average_total", region_highest_average_total, kwargs={"cache": True},
+              inputs=["region", "total_amount"], group="descriptive_stats", report=True,
+              show=_print_with("Region with highest average total_amount:")),
+        Stage("product_highest_revenue", product_highest_revenue, kwargs={"cache": True},
+              inputs=["product_id", "total_amount"], group="descriptive_stats", report=True,
+              show=_print_with("Product with highest revenue:")),
+
+        # String Cleaning (Q20–Q21)
+        Stage("city_before_cleaning", lambda df: df["city"].unique(), inputs=["city"],
+              group="text_cleaning", report=True, show=_print_with("checking city before cleaning:")),
+        Stage("clean_city_format", clean_city_format, inputs=["city"], outputs=["city"],
+              group="text_cleaning", column_ops={"city": title_text}),
+        Stage("replace_casa_variants", replace_casa_variants, inputs=["city"], outputs=["city"],
+              group="text_cleaning", column_ops={"city": replace_casa_text}),
+        Stage("city_after_cleaning", lambda df: df["city"].unique(), inputs=["city"],
+              group="text_cleaning", report=True, show=_print_with("checking city after cleaning:")),
+
+        # Datetime (Q22–Q25)
+        Stage("order_date_dtype_before", lambda df: df["order_date"].dtype, inputs=["order_date"],
+              group="dates", report=True,
+              show=_print_with("checking order_date dtype before conversion:")),
+        Stage("convert_dates", convert_dates, inputs=DATE_COLUMNS, outputs=DATE_COLUMNS, group="dates"),
+        Stage("order_date_dtype_after", lambda df: df["order_date"].dtype, inputs=["order_date"],
+              group="dates", report=True,
+              show=_print_with("checking order_date dtype after conversion:")),
+        Stage("add_date_features", add_date_features, inputs=["order_date"],
+              outputs=["year", "month", "weekday"], group="dates"),
+        Stage("date_features_head", lambda df: df[["order_date", "year", "month", "weekday"]].head(),
+              inputs=["order_date", "year", "month", "weekday"], group="dates", report=True,
+              show=_print_block("displaying first 5 rows with new date features:")),
+        Stage("filter_after_date", filter_after_date, args=(after_date,),
+              inputs=["order_date"], group="dates"),
+        Stage("average_monthly_revenue", average_monthly_revenue, kwargs={"cache": True},
+              inputs=["order_date", "total_amount"], group="dates", report=True,
+              show=_print_block("Average monthly revenue:")),
+
+        # Outliers (Q26–Q28)
+        Stage("detect_outliers_iqr", detect_outliers_iqr, inputs=["total_amount"],
+              group="outliers", report=True, show=_print_label("Outliers detected by IQR method:")),
+        Stage("detect_outliers_zscore", add_zscore, inputs=["total_amount"],
+              outputs=["zscore_total_amount"], group="outliers"),
+        Stage("top_n_largest_orders", top_n_largest_orders, args=("order_id", "total_amount", 5),
+              inputs=["order_id", "total_amount"], group="outliers", report=True,
+              show=_print_block("Top 5 largest orders by total_amount:")),
+    ]
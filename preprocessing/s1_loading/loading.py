@@ -1,17 +1,653 @@
+import hashlib
+import json
+import os
+import re
+
 import pandas as pd
+
+from ..s4_features.date_features import PENDING_KEY, materialize_date_variables
+from ..s3_cleaning.type_fixing import CATEGORICAL_COLUMNS
 #(Q1–Q4)
 
 
-def load_data(file_path):
+# Schéma des exports de commandes (CSV "|") : type de chaque colonne à la
+# lecture. "str" : texte (dates comprises, elles sont normalisées plus tard :
+# plusieurs formats). None : type déduit à la lecture comme read_csv (les
+# colonnes numériques peuvent contenir des mots, ex. "twenty", convertis
+# par clean_numeric_column).
+ORDER_SCHEMA = {
+    "order_id": "str",
+    "customer_id": "str",
+    "order_date": "str",
+    "ship_date": "str",
+    "region": "str",
+    "city": "str",
+    "payment_method": "str",
+    "product_category": "str",
+    "product_id": "str",
+    "quantity": None,
+    "unit_price": None,
+    "total_amount": None,
+    "discount_code": "str",
+    "order_status": "str",
+}
+
+
+# Formats colonnaires (pyarrow) : types conservés (Int64, datetime, category…),
+# projection de colonnes et filtres appliqués à la lecture.
+COLUMNAR_FORMATS = {
+    ".parquet": "parquet",
+    ".feather": "ipc",
+    ".arrow": "ipc",
+}
+
+
+def _columnar_format(file_path):
+    for ext, fmt in COLUMNAR_FORMATS.items():
+        if file_path.endswith(ext):
+            return fmt
+    return None
+
+
+def _filter_columns(filters):
+    """Colonnes utilisées par des filtres au format pyarrow (liste de tuples ou DNF)."""
+    if not filters:
+        return []
+    groups = filters if isinstance(filters[0], list) else [filters]
+    return [col for group in groups for col, _, _ in group]
+
+
+def _with_date_variables(df):
+    """df avec ses variables de date déclarées créées (sans modifier df)."""
+    if PENDING_KEY in df.attrs:
+        return materialize_date_variables(df.copy(deep=False))
+    return df
+
+
+def apply_filters(df, filters):
+    """
+    Applique en mémoire des filtres au format pyarrow/read_parquet :
+    - [(col, op, val), ...]            → ET logique
+    - [[(col, op, val), ...], [...]]   → OU de groupes ET (forme DNF)
+    op parmi ==, =, !=, <, <=, >, >=, in, not in.
+    """
+    if not filters:
+        return df
+
+    ops = {
+        "==": lambda s, v: s == v,
+        "=": lambda s, v: s == v,
+        "!=": lambda s, v: s != v,
+        "<": lambda s, v: s < v,
+        "<=": lambda s, v: s <= v,
+        ">": lambda s, v: s > v,
+        ">=": lambda s, v: s >= v,
+        "in": lambda s, v: s.isin(v),
+        "not in": lambda s, v: ~s.isin(v),
+    }
+
+    groups = filters if isinstance(filters[0], list) else [filters]
+    keep = pd.Series(False, index=df.index)
+    for group in groups:
+        mask = pd.Series(True, index=df.index)
+        for col, op, val in group:
+            if op not in ops:
+                raise ValueError(f"Unsupported filter operator: {op}")
+            mask &= ops[op](df[col], val).fillna(False).astype(bool)
+        keep |= mask
+
+    return df[keep]
+
+
+def _load_columnar(file_path, fmt, columns=None, filters=None):
+    """Lecture Parquet / Arrow IPC (Feather v2) avec projection et filtres poussés à pyarrow."""
+    if fmt == "parquet":
+        return pd.read_parquet(file_path, columns=columns, filters=filters)
+
+    if not filters:
+        return pd.read_feather(file_path, columns=columns)
+
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+
+    table = ds.dataset(file_path, format="ipc").to_table(
+        columns=columns,
+        filter=pq.filters_to_expression(filters),
+    )
+    return table.to_pandas()
+
+
+def order_dtypes(usecols=None, categorical=False, schema=ORDER_SCHEMA):
+    """
+    Types de lecture (argument dtype de read_csv) des colonnes de schema
+    (toutes, ou seulement usecols). categorical=True : les colonnes de
+    CATEGORICAL_COLUMNS sont lues directement en "category".
+    """
+    dtypes = {
+        col: "category" if categorical and col in CATEGORICAL_COLUMNS else dtype
+        for col, dtype in schema.items()
+        if dtype is not None or (categorical and col in CATEGORICAL_COLUMNS)
+    }
+    if usecols is not None:
+        dtypes = {col: dtype for col, dtype in dtypes.items() if col in usecols}
+    return dtypes
+
+
+def _read_csv_arrow(file_path, usecols, dtypes, skip_rows=0):
+    """
+    Lecture pyarrow.csv (multithread) : types de dtypes imposés au parseur
+    ("str" → texte, "category" → dictionnaire), les autres déduits. Mêmes
+    valeurs manquantes et mêmes conversions que read_csv. skip_rows : lignes
+    de données sautées après l'en-tête (non converties).
+    """
+    import pyarrow as pa
+    import pyarrow.csv as pv
+
+    arrow_types = {"str": pa.string(), "category": pa.dictionary(pa.int32(), pa.string())}
+    # Valeurs manquantes de read_csv : celles de pyarrow + "None" et "<NA>"
+    null_values = sorted(set(pv.ConvertOptions().null_values) | {"None", "<NA>"})
+
+    table = pv.read_csv(
+        file_path,
+        read_options=pv.ReadOptions(skip_rows_after_names=skip_rows),
+        parse_options=pv.ParseOptions(delimiter="|"),
+        convert_options=pv.ConvertOptions(
+            column_types={col: arrow_types[dtype] for col, dtype in dtypes.items()},
+            include_columns=list(usecols) if usecols is not None else None,
+            null_values=null_values,
+            strings_can_be_null=True,
+        ),
+    )
+    # Colonnes entièrement vides : float64, comme read_csv
+    for i, field in enumerate(table.schema):
+        if pa.types.is_null(field.type):
+            table = table.set_column(i, field.with_type(pa.float64()), table.column(i).cast(pa.float64()))
+
+    df = table.to_pandas()
+    # Catégories triées, comme astype("category") (ordre d'apparition dans pyarrow)
+    for col, dtype in dtypes.items():
+        if dtype == "category" and col in df.columns:
+            df[col] = df[col].cat.reorder_categories(df[col].cat.categories.sort_values())
+    return df
+
+
+def read_orders_csv(file_path, usecols=None, categorical=False, schema=ORDER_SCHEMA, engine="pyarrow",
+                    skip_rows=0):
+    """
+    Lit un export de commandes CSV (séparateur "|") avec les types de schema
+    appliqués à la lecture (voir ORDER_SCHEMA).
+
+    engine="pyarrow" : lecteur CSV multithread de pyarrow (repli sur le
+    lecteur C de pandas si pyarrow n'est pas installé). Le résultat est le
+    même qu'avec read_csv sans types (mêmes valeurs manquantes, texte en
+    "str"), sauf les colonnes lues en "category" avec categorical=True.
+
+    Parameters:
+        usecols (list, optionnel): colonnes à lire (les autres ne sont pas
+            analysées)
+        categorical (bool): colonnes à faible cardinalité en "category" dès
+            la lecture (pas de colonne texte intermédiaire)
+        skip_rows (int): lignes de données sautées par le lecteur après
+            l'en-tête (index à partir de skip_rows, comme df.iloc[skip_rows:])
+    """
+    dtypes = order_dtypes(usecols, categorical, schema)
+    df = None
+    if engine == "pyarrow":
+        try:
+            df = _read_csv_arrow(file_path, usecols, dtypes, skip_rows)
+        except ImportError:
+            pass
+    if df is None:
+        df = pd.read_csv(file_path, sep="|", usecols=usecols, dtype=dtypes,
+                         skiprows=range(1, skip_rows + 1) if skip_rows else None)
+    if skip_rows:
+        df.index = pd.RangeIndex(skip_rows, skip_rows + len(df))
+    return df
+
+
+# Classeurs Excel : copie Parquet ("sidecar") dans EXCEL_CACHE_FOLDER, à côté
+# du classeur, nommée d'après l'empreinte de son contenu (un classeur modifié
+# a une autre empreinte : l'ancienne copie est ignorée puis supprimée).
+EXCEL_CACHE_FOLDER = ".excel_cache"
+EXCEL_CACHE_VERSION = 1
+
+
+def excel_engine():
+    """Lecteur Excel : calamine (Rust, python-calamine) s'il est installé, sinon openpyxl."""
+    try:
+        import python_calamine  # noqa: F401
+    except ImportError:
+        return "openpyxl"
+    return "calamine"
+
+
+def file_digest(file_path, block_size=1 << 20):
+    """Empreinte (blake2b) du contenu du fichier."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def excel_cache_path(file_path, engine=None):
+    """
+    Chemin de la copie Parquet du classeur : empreinte du contenu, du lecteur
+    et de la version de pandas (les types lus en dépendent).
+    """
+    engine = engine or excel_engine()
+    key = f"{file_digest(file_path)}|{engine}|{pd.__version__}|{EXCEL_CACHE_VERSION}"
+    name = hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+    folder = os.path.join(os.path.dirname(os.path.abspath(file_path)), EXCEL_CACHE_FOLDER)
+    return os.path.join(folder, f"{os.path.basename(file_path)}.{name}.parquet")
+
+
+def read_excel_cached(file_path, usecols=None, engine=None, cache=True):
+    """
+    Lit la première feuille d'un classeur .xlsx (lecteur excel_engine()).
+
+    cache=True : le premier chargement écrit une copie Parquet du classeur
+    (excel_cache_path) ; les suivants relisent cette copie tant que le
+    contenu du classeur ne change pas (mêmes types et mêmes valeurs que
+    read_excel). Sans pyarrow, ou si le dossier n'est pas accessible en
+    écriture, le classeur est lu sans cache.
+
+    Parameters:
+        usecols (list, optionnel): noms des colonnes à charger
+    """
+    engine = engine or excel_engine()
+    columns = list(usecols) if usecols is not None else None
+    if not cache:
+        return pd.read_excel(file_path, usecols=columns, engine=engine)
+
+    sidecar = excel_cache_path(file_path, engine)
+    if os.path.exists(sidecar):
+        return pd.read_parquet(sidecar, columns=columns)
+
+    # Feuille complète : la copie sert pour toutes les projections
+    df = pd.read_excel(file_path, engine=engine)
+    try:
+        folder = os.path.dirname(sidecar)
+        os.makedirs(folder, exist_ok=True)
+        tmp_path = f"{sidecar}.{os.getpid()}.tmp"
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, sidecar)
+        # Copies des versions précédentes du classeur
+        previous = re.compile(re.escape(os.path.basename(file_path)) + r"\.[0-9a-f]{16}\.parquet")
+        for name in os.listdir(folder):
+            if previous.fullmatch(name) and os.path.join(folder, name) != sidecar:
+                os.remove(os.path.join(folder, name))
+    except (ImportError, OSError, ValueError, TypeError):
+        # Pas de pyarrow, dossier en lecture seule, colonne non convertible :
+        # résultat de read_excel sans copie
+        pass
+    return df[columns] if columns is not None else df
+
+
+# JSON Lines : un enregistrement par ligne
+JSON_LINES_EXTENSIONS = (".jsonl", ".ndjson")
+
+
+def iter_json_records(file_path, block_size=1 << 20):
+    """
+    Enregistrements (dict) d'un fichier JSON, un par un, sans charger le
+    fichier : tableau d'objets ([{...}, {...}]) ou JSON Lines (.jsonl,
+    .ndjson). Le texte est lu par blocs de block_size caractères et chaque
+    objet est décodé dès qu'il est complet ; la mémoire ne dépend que du bloc
+    et de la taille d'un enregistrement.
+    """
+    if file_path.endswith(JSON_LINES_EXTENSIONS):
+        with open(file_path, encoding="utf-8") as f:
+            for number, line in enumerate(f, 1):
+                if line.strip():
+                    record = json.loads(line)
+                    if not isinstance(record, dict):
+                        raise ValueError(f"{file_path}, ligne {number} : un objet JSON est attendu.")
+                    yield record
+        return
+
+    decoder = json.JSONDecoder()
+    with open(file_path, encoding="utf-8") as f:
+        buffer, pos, eof = "", 0, False
+
+        def fill():
+            # Ajoute un bloc au texte restant (déjà décodé : supprimé)
+            nonlocal buffer, pos, eof
+            block = f.read(block_size)
+            eof = not block
+            buffer, pos = buffer[pos:] + block, 0
+
+        def next_char():
+            # Premier caractère non blanc (None en fin de fichier)
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos].isspace():
+                    pos += 1
+                if pos < len(buffer):
+                    return buffer[pos]
+                if eof:
+                    return None
+                fill()
+
+        fill()
+        if next_char() != "[":
+            raise ValueError(f"{file_path} : un tableau JSON d'objets est attendu (ou .jsonl).")
+        pos += 1
+        first = True
+        while True:
+            char = next_char()
+            if char == "]":
+                return
+            if not first:
+                if char != ",":
+                    raise ValueError(f"{file_path} : ',' ou ']' attendu, trouvé {char!r}.")
+                pos += 1
+                next_char()
+            while True:
+                try:
+                    record, pos = decoder.raw_decode(buffer, pos)
+                    break
+                except json.JSONDecodeError:
+                    # Objet coupé par la fin du bloc : lire la suite
+                    if eof:
+                        raise
+                    fill()
+            if not isinstance(record, dict):
+                raise ValueError(f"{file_path} : le tableau doit contenir des objets JSON.")
+            first = False
+            yield record
+
+
+def read_json_batches(file_path, batch_size=100_000):
+    """
+    Lit un fichier JSON (tableau d'objets ou JSON Lines) par blocs de
+    batch_size enregistrements (générateur de DataFrames), sans charger le
+    fichier (voir iter_json_records). Index continu d'un bloc à l'autre et
+    types texte de ORDER_SCHEMA, comme les blocs CSV.
+    """
+    dtypes = order_dtypes()
+    start = 0
+    batch = []
+    for record in iter_json_records(file_path):
+        batch.append(record)
+        if len(batch) == batch_size:
+            yield _records_frame(batch, start, dtypes)
+            start += len(batch)
+            batch = []
+    if batch:
+        yield _records_frame(batch, start, dtypes)
+
+
+def _records_frame(records, start, dtypes):
+    df = pd.DataFrame.from_records(records)
+    df.index = pd.RangeIndex(start, start + len(df))
+    return df.astype({col: dtype for col, dtype in dtypes.items() if col in df.columns})
+
+
+def load_data(file_path, columns=None, filters=None, categorical=False):
+    """
+    Charge un fichier .csv (séparateur "|"), .json, .jsonl / .ndjson
+    (JSON Lines), .xlsx, .parquet, .feather ou .arrow.
+
+    Les .csv sont lus par read_orders_csv (types de ORDER_SCHEMA appliqués
+    à la lecture, lecteur pyarrow).
+    Les .xlsx par read_excel_cached (copie Parquet réutilisée tant que le
+    classeur ne change pas).
+
+    Parameters:
+        columns (list, optionnel): colonnes à charger (projection)
+        filters (list, optionnel): filtres au format read_parquet,
+            ex. [("region", "==", "oriental"), ("total_amount", ">", 1000)].
+            Poussés à la lecture pour Parquet/Arrow, appliqués après
+            chargement pour les autres formats.
+        categorical (bool): .csv seulement, colonnes de CATEGORICAL_COLUMNS
+            lues en "category" (voir read_orders_csv)
+    """
+    fmt = _columnar_format(file_path)
+    if fmt is not None:
+        return _load_columnar(file_path, fmt, columns, filters)
+
+    # Colonnes à lire : projection + colonnes nécessaires aux filtres
+    usecols = None
+    if columns is not None:
+        usecols = list(dict.fromkeys(list(columns) + _filter_columns(filters)))
+
     if file_path.endswith('.xlsx'):
-        return pd.read_excel(file_path)
+        df = read_excel_cached(file_path, usecols=usecols)
     elif file_path.endswith('.json'):
-        return pd.read_json(file_path)
+        df = pd.read_json(file_path)
+    elif file_path.endswith(JSON_LINES_EXTENSIONS):
+        df = pd.read_json(file_path, lines=True)
     elif file_path.endswith('.csv'):
-        return pd.read_csv(file_path, sep="|")
+        df = read_orders_csv(file_path, usecols=usecols, categorical=categorical)
     else:
         raise ValueError("Unsupported file format")
-    
+
+    df = apply_filters(df, filters)
+    if columns is not None:
+        df = df[list(columns)]
+    return df
+
+
+def load_data_chunks(file_path, chunksize=100_000):
+    """
+    Lit le fichier par blocs de `chunksize` lignes (générateur de DataFrames).
+
+    - .csv  : lecture réellement incrémentale (read_csv(chunksize=...)),
+              la mémoire dépend de la taille du bloc, pas du fichier
+    - .parquet / .feather / .arrow : lecture par lots pyarrow (au plus
+              `chunksize` lignes par bloc)
+    - .json / .jsonl / .ndjson : enregistrements décodés un par un
+              (read_json_batches), la mémoire dépend aussi du bloc
+    - .xlsx : pandas ne sait pas le lire par morceaux, le fichier est
+              chargé une fois puis découpé en blocs
+    """
+    fmt = _columnar_format(file_path)
+    if file_path.endswith('.csv'):
+        # Types de ORDER_SCHEMA : mêmes types d'un bloc à l'autre
+        with pd.read_csv(file_path, sep="|", chunksize=chunksize, dtype=order_dtypes()) as reader:
+            yield from reader
+    elif fmt is not None:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        dataset = ds.dataset(file_path, format=fmt)
+        for batch in dataset.to_batches(batch_size=chunksize):
+            table = pa.Table.from_batches([batch], schema=dataset.schema)
+            yield table.to_pandas()
+    elif file_path.endswith(('.json',) + JSON_LINES_EXTENSIONS):
+        yield from read_json_batches(file_path, chunksize)
+    else:
+        df = load_data(file_path)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+
+
+def load_data_tail(file_path, skip_rows=0, chunksize=100_000):
+    """
+    Charge les lignes qui suivent les skip_rows premières lignes de données
+    (fichier allongé en fin : lignes déjà traitées). Index à partir de
+    skip_rows, comme load_data(file_path).iloc[skip_rows:].
+
+    - .csv : lignes sautées par le lecteur (read_orders_csv(skip_rows=...)),
+             sans conversion ni DataFrame
+    - autres formats : lecture par blocs (load_data_chunks), les blocs déjà
+             traités sont ignorés
+
+    ValueError si le fichier a moins de skip_rows lignes (lecture par blocs ;
+    pour un .csv, l'appelant vérifie par exemple la taille du fichier).
+    """
+    if file_path.endswith('.csv'):
+        return read_orders_csv(file_path, skip_rows=skip_rows)
+
+    rows = 0
+    last = None
+    kept = []
+    for chunk in load_data_chunks(file_path, chunksize):
+        if rows + len(chunk) > skip_rows:
+            kept.append(chunk.iloc[max(skip_rows - rows, 0):])
+        rows += len(chunk)
+        last = chunk
+    if rows < skip_rows:
+        raise ValueError(f"{file_path} a {rows} lignes, {skip_rows} déjà traitées.")
+
+    if not kept:
+        return last.iloc[:0] if last is not None else load_data(file_path)
+    df = pd.concat(kept) if len(kept) > 1 else kept[0]
+    df.index = pd.RangeIndex(skip_rows, skip_rows + len(df))
+    return df
+
+
+def save_data(df, file_path):
+    """
+    Sauvegarde le DataFrame selon l'extension du fichier :
+    .csv (séparateur ","), .json, .xlsx, .parquet, .feather / .arrow.
+    Les formats colonnaires conservent les types (Int64, datetime, category).
+    Les variables de date encore déclarées (add_date_variables(lazy=True))
+    sont créées avant l'écriture.
+    """
+    df = _with_date_variables(df)
+    if file_path.endswith('.csv'):
+        df.to_csv(file_path, index=False)
+    elif file_path.endswith('.parquet'):
+        df.to_parquet(file_path, index=False)
+    elif file_path.endswith(('.feather', '.arrow')):
+        df.reset_index(drop=True).to_feather(file_path)
+    elif file_path.endswith('.xlsx'):
+        df.to_excel(file_path, index=False)
+    elif file_path.endswith('.json'):
+        df.to_json(file_path, orient="records", date_format="iso", indent=2, force_ascii=False)
+    else:
+        raise ValueError("Unsupported file format")
+    return file_path
+
+
+class ChunkedWriter:
+    """
+    Écriture incrémentale d'un DataFrame bloc par bloc (.csv, .parquet,
+    .feather / .arrow). Le schéma du premier bloc est imposé aux suivants.
+
+        with ChunkedWriter("results/clean.parquet") as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.format = "csv" if file_path.endswith('.csv') else _columnar_format(file_path)
+        if self.format is None:
+            raise ValueError("Chunked output supports .csv, .parquet, .feather and .arrow only")
+        self.rows = 0
+        self._writer = None
+        self._schema = None
+
+    def write(self, df):
+        df = _with_date_variables(df)
+        if self.format == "csv":
+            df.to_csv(self.file_path, mode="w" if self.rows == 0 else "a",
+                      header=self.rows == 0, index=False)
+        else:
+            import pyarrow as pa
+
+            table = pa.Table.from_pandas(df, schema=self._schema, preserve_index=False)
+            if self._writer is None:
+                self._schema = table.schema
+                if self.format == "parquet":
+                    import pyarrow.parquet as pq
+                    self._writer = pq.ParquetWriter(self.file_path, self._schema)
+                else:
+                    self._writer = pa.ipc.new_file(self.file_path, self._schema)
+            self._writer.write_table(table)
+        self.rows += len(df)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def append_data(df, file_path):
+    """
+    Ajoute les lignes de df à un fichier de sortie existant (créé sinon).
+
+    - .csv : ajout en fin de fichier, colonnes dans l'ordre de l'en-tête existant
+    - .parquet / .feather / .arrow : ces formats ne s'allongent pas sur place ;
+      le fichier est réécrit bloc par bloc (ancien contenu puis df) dans un
+      fichier temporaire qui remplace l'original
+
+    Returns:
+        int: nombre de lignes ajoutées
+    """
+    df = _with_date_variables(df)
+    if not os.path.exists(file_path):
+        with ChunkedWriter(file_path) as writer:
+            writer.write(df)
+        return len(df)
+
+    if file_path.endswith('.csv'):
+        header = pd.read_csv(file_path, nrows=0).columns
+        missing = [col for col in header if col not in df.columns]
+        extra = [col for col in df.columns if col not in header]
+        if missing or extra:
+            raise ValueError(f"Colonnes différentes du fichier existant : manquantes {missing}, en plus {extra}")
+        df[list(header)].to_csv(file_path, mode="a", header=False, index=False)
+        return len(df)
+
+    if _columnar_format(file_path) is None:
+        raise ValueError("Append supports .csv, .parquet, .feather and .arrow only")
+
+    root, ext = os.path.splitext(file_path)
+    tmp_path = root + ".tmp" + ext
+    columns = None
+    with ChunkedWriter(tmp_path) as writer:
+        for chunk in load_data_chunks(file_path):
+            columns = list(chunk.columns)
+            writer.write(chunk)
+        writer.write(df if columns is None else df[columns])
+    os.replace(tmp_path, file_path)
+    return len(df)
+
+
+def truncate_data(file_path, rows, size):
+    """
+    Ramène un fichier de sortie allongé par append_data à un état antérieur
+    (rows lignes, size octets) : annule des ajouts non validés.
+
+    - .csv : fichier coupé à size octets (y compris une ligne écrite à moitié)
+    - .parquet / .feather / .arrow : les rows premières lignes sont réécrites
+      dans un fichier temporaire qui remplace l'original
+    - size == 0 : le fichier n'existait pas, il est supprimé
+    """
+    if size == 0:
+        os.remove(file_path)
+        return
+    if file_path.endswith('.csv'):
+        os.truncate(file_path, size)
+        return
+
+    if _columnar_format(file_path) is None:
+        raise ValueError("Truncate supports .csv, .parquet, .feather and .arrow only")
+
+    root, ext = os.path.splitext(file_path)
+    tmp_path = root + ".tmp" + ext
+    kept = 0
+    with ChunkedWriter(tmp_path) as writer:
+        for chunk in load_data_chunks(file_path):
+            if kept >= rows:
+                break
+            chunk = chunk.iloc[:rows - kept]
+            writer.write(chunk)
+            kept += len(chunk)
+    os.replace(tmp_path, file_path)
+
+
 def inspect_data(df):
     """Display basic information about the DataFrame."""
     print("\nDataFrame Shape:", df.shape)
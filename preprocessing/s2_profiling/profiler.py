@@ -0,0 +1,424 @@
+import html
+import json
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from ..s1_loading.loading import load_data_chunks
+from ..s3_cleaning.date_cleaning import parse_date_series
+
+# ---------------------------------------------------------------------
+# Purpose of this file:
+# ---------------------------------------------------------------------
+# Profilage qualité en une passe par colonne. Chaque colonne est lue une
+# seule fois (pd.factorize : valeurs distinctes + nombre de lignes par
+# valeur) ; tout le reste est calculé sur les valeurs distinctes :
+#   - valeurs manquantes (NaN et textes "", "null", "n/a", ...)
+#   - nombre de valeurs distinctes, variantes de casse / d'espaces
+#   - valeurs invalides par type (numérique, date avec les formats du
+#     nettoyage), type déduit
+#   - min / max / moyenne / écart-type, valeurs négatives ou extrêmes
+#   - plage de dates, dates suspectes (avant 1900, dans le futur)
+#
+#   profile = profile_data(df)                       # exact
+#   profile = profile_data(df, sample_size=100_000)  # échantillon ± marge 95 %
+#   profile = profile_file("big.csv", sample_size=100_000)  # sans tout charger
+#   profile.summary()            # une ligne par colonne
+#   profile.to_json("results/profile.json")
+#   profile.to_html("results/profile.html")
+
+# Quantile de la loi normale pour un intervalle de confiance à 95 %
+Z_95 = 1.96
+
+# Textes qui représentent une valeur manquante
+MISSING_TOKENS = {"", "nan", "none", "null", "n/a", "na", "unknown", "?"}
+
+# Types attendus des colonnes du jeu de données (colonnes absentes ignorées)
+EXPECTED_TYPES = {
+    "order_id": "string",
+    "order_date": "datetime",
+    "ship_date": "datetime",
+    "quantity": "numeric",
+    "unit_price": "numeric",
+    "total_amount": "numeric",
+}
+
+DATE_PATTERN = r"\d{4}[-/]\d{2}[-/]\d{2}|\d{2}[-/]\d{2}[-/]\d{4}"
+EARLIEST_DATE = pd.Timestamp("1900-01-01")
+EXTREME_STD = 4
+TOP_VALUES = 10
+
+# Comptages estimés (avec marge d'erreur) en mode échantillon
+COUNT_FIELDS = [
+    "nulls", "missing_like", "invalid_numeric", "invalid_datetime",
+    "negative", "extreme", "early_dates", "future_dates",
+]
+
+
+def _weighted_numeric_stats(values, counts):
+    """Statistiques numériques à partir des valeurs distinctes et de leurs effectifs."""
+    keep = ~np.isnan(values)
+    values, counts = values[keep], counts[keep]
+    total = counts.sum()
+    if total == 0:
+        return {}, {}
+
+    mean = float((values * counts).sum() / total)
+    var = float((counts * (values - mean) ** 2).sum() / (total - 1)) if total > 1 else float("nan")
+    std = math.sqrt(var) if not math.isnan(var) else float("nan")
+
+    stats = {
+        "min": float(values.min()),
+        "max": float(values.max()),
+        "mean": mean,
+        "std": std,
+    }
+    found = {
+        "negative": int(counts[values < 0].sum()),
+        "extreme": int(counts[values > mean + EXTREME_STD * std].sum()) if std == std else 0,
+    }
+    return stats, found
+
+
+def _date_stats(dates, counts):
+    """Plage de dates et dates suspectes (valeurs distinctes déjà parsées)."""
+    keep = ~pd.isna(dates)
+    dates, counts = pd.DatetimeIndex(dates[keep]), counts[keep]
+    if len(dates) == 0:
+        return {}, {"early_dates": 0, "future_dates": 0}
+
+    stats = {"min": str(dates.min()), "max": str(dates.max())}
+    found = {
+        "early_dates": int(counts[dates < EARLIEST_DATE].sum()),
+        "future_dates": int(counts[dates > pd.Timestamp.now()].sum()),
+    }
+    return stats, found
+
+
+def _looks_like_dates(text):
+    """Même règle que looks_like_date_series : > 40 % des 20 premières valeurs."""
+    sample = text.head(20)
+    return not sample.empty and sample.str.contains(DATE_PATTERN, regex=True).mean() > 0.4
+
+
+def profile_column(series, expected=None, factorized=None):
+    """
+    Profil d'une colonne en une passe (factorize), le reste sur les valeurs
+    distinctes.
+
+    Parameters:
+        series (pd.Series)
+        expected (str, optionnel): "numeric", "datetime" ou "string"
+        factorized (tuple, optionnel): (codes, uniques) déjà calculés
+
+    Returns:
+        dict: dtype, inferred_type, counts (comptages en lignes), distinct,
+        variants, stats, top_values
+    """
+    codes, uniques = factorized or pd.factorize(series, use_na_sentinel=True)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+    present = int(counts.sum())
+
+    profile = {
+        "dtype": str(series.dtype),
+        "expected_type": expected,
+        "distinct": len(uniques),
+        "counts": {"nulls": len(series) - present},
+        "stats": {},
+    }
+    found = profile["counts"]
+
+    if pd.api.types.is_bool_dtype(series.dtype):
+        profile["inferred_type"] = "boolean"
+
+    elif pd.api.types.is_numeric_dtype(series.dtype):
+        profile["inferred_type"] = "numeric"
+        values = np.asarray(uniques, dtype="float64")
+        profile["stats"], extra = _weighted_numeric_stats(values, counts)
+        found.update(extra)
+
+    elif pd.api.types.is_datetime64_any_dtype(series.dtype):
+        profile["inferred_type"] = "datetime"
+        profile["stats"], extra = _date_stats(np.asarray(uniques), counts)
+        found.update(extra)
+
+    else:
+        raw = pd.Series(np.asarray(uniques, dtype=object))
+        text = raw.map(str)
+        key = text.str.strip().str.lower()
+
+        missing_like = key.isin(MISSING_TOKENS).to_numpy()
+        found["missing_like"] = int(counts[missing_like].sum())
+        profile["variants"] = int(len(key) - key.nunique())
+
+        numbers = pd.to_numeric(raw, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        is_number = ~np.isnan(numbers)
+        found["invalid_numeric"] = int(counts[~is_number].sum())
+
+        is_date = np.zeros(len(uniques), dtype=bool)
+        if expected == "datetime" or _looks_like_dates(text):
+            dates, _ = parse_date_series(raw)
+            is_date = dates.notna().to_numpy()
+            found["invalid_datetime"] = int(counts[~is_date].sum())
+
+        # type déduit : majorité des lignes renseignées
+        def share(mask):
+            return counts[mask].sum() / present if present else 0.0
+
+        if share(is_date) >= 0.5:
+            profile["inferred_type"] = "datetime"
+            profile["stats"], extra = _date_stats(dates.to_numpy(), counts)
+            found.update(extra)
+        elif share(is_number) >= 0.5:
+            profile["inferred_type"] = "numeric"
+            profile["stats"], extra = _weighted_numeric_stats(numbers, counts)
+            found.update(extra)
+        else:
+            profile["inferred_type"] = "text"
+
+        # valeurs non numériques : seulement pertinent pour une colonne numérique
+        if "numeric" not in (expected, profile["inferred_type"]):
+            del found["invalid_numeric"]
+
+    order = np.argsort(-counts, kind="stable")[:TOP_VALUES]
+    profile["top_values"] = [[str(uniques[i]), int(counts[i])] for i in order]
+    profile["anomalies"] = _anomalies(profile)
+    return profile
+
+
+def _anomalies(profile):
+    """Liste des problèmes repérés dans le profil d'une colonne."""
+    found = profile["counts"]
+    expected = profile["expected_type"] or profile["inferred_type"]
+    issues = []
+
+    if found.get("missing_like"):
+        issues.append("missing_like_text")
+    if expected == "numeric" and found.get("invalid_numeric"):
+        issues.append("invalid_numeric")
+    if expected == "datetime" and found.get("invalid_datetime"):
+        issues.append("invalid_datetime")
+    if found.get("negative"):
+        issues.append("negative_values")
+    if found.get("extreme"):
+        issues.append("extreme_values")
+    if profile["stats"].get("std") == 0:
+        issues.append("constant")
+    if found.get("early_dates"):
+        issues.append("early_dates")
+    if found.get("future_dates"):
+        issues.append("future_dates")
+    if profile.get("variants"):
+        issues.append("case_or_space_variants")
+    return issues
+
+
+class DataProfile:
+    """
+    Rapport de profilage structuré (voir profile_data / profile_file).
+
+    En mode échantillon (sampled_rows < rows), les comptages sont estimés sur
+    toutes les lignes avec une marge d'erreur à 95 % (margins) ; distinct,
+    min / max et top_values sont ceux observés dans l'échantillon.
+    """
+
+    def __init__(self, columns, rows, sampled_rows, duplicated_rows=None):
+        self.columns = columns
+        self.rows = rows
+        self.sampled_rows = sampled_rows
+        self.duplicated_rows = duplicated_rows
+
+        if self.sampled:
+            for profile in self.columns.values():
+                profile["counts"], profile["margins"] = self._estimate(profile["counts"])
+
+    @property
+    def sampled(self):
+        return self.sampled_rows < self.rows
+
+    def _estimate(self, counts):
+        """Comptages de l'échantillon → estimation sur toutes les lignes ± marge 95 %."""
+        n, total = self.sampled_rows, self.rows
+        fpc = math.sqrt((total - n) / (total - 1)) if total > 1 else 0.0
+        estimates, margins = {}, {}
+        for field, count in counts.items():
+            share = count / n if n else 0.0
+            estimates[field] = round(share * total)
+            margins[field] = round(Z_95 * math.sqrt(share * (1 - share) / n) * fpc * total) if n else 0
+        return estimates, margins
+
+    def summary(self):
+        """Une ligne par colonne (comptages, type, plage, anomalies)."""
+        rows = []
+        for name, profile in self.columns.items():
+            row = {
+                "column": name,
+                "dtype": profile["dtype"],
+                "inferred_type": profile["inferred_type"],
+                "distinct": profile["distinct"],
+            }
+            for field in COUNT_FIELDS:
+                if field in profile["counts"]:
+                    row[field] = profile["counts"][field]
+                    if "margins" in profile:
+                        row[field + "_margin"] = profile["margins"][field]
+            row["min"] = profile["stats"].get("min")
+            row["max"] = profile["stats"].get("max")
+            row["anomalies"] = ", ".join(profile["anomalies"])
+            rows.append(row)
+
+        table = pd.DataFrame(rows)
+        head = ["column", "dtype", "inferred_type", "distinct"]
+        counts = [col for field in COUNT_FIELDS for col in (field, field + "_margin") if col in table]
+        return table[head + counts + ["min", "max", "anomalies"]]
+
+    def to_dict(self):
+        return {
+            "rows": self.rows,
+            "sampled_rows": self.sampled_rows,
+            "confidence": 0.95 if self.sampled else None,
+            "duplicated_rows": self.duplicated_rows,
+            "columns": self.columns,
+        }
+
+    def to_json(self, path=None):
+        """Rapport JSON (retourne le texte, et l'écrit dans path si fourni)."""
+        text = json.dumps(self.to_dict(), indent=2, ensure_ascii=False, default=str)
+        if path:
+            _write(path, text)
+        return text
+
+    def to_html(self, path=None):
+        """Rapport HTML autonome (tableau récapitulatif + valeurs fréquentes)."""
+        mode = (f"sample of {self.sampled_rows:,} rows (counts estimated, ± 95% margin)"
+                if self.sampled else "all rows")
+        parts = [
+            "<html><head><meta charset='utf-8'><title>Data profile</title></head><body>",
+            "<h1>Data profile</h1>",
+            f"<p>{self.rows:,} rows · {len(self.columns)} columns · {html.escape(mode)}"
+            + (f" · {self.duplicated_rows:,} duplicated rows" if self.duplicated_rows is not None else "")
+            + "</p>",
+            self.summary().to_html(index=False, na_rep=""),
+        ]
+        for name, profile in self.columns.items():
+            parts.append(f"<h3>{html.escape(str(name))}</h3>")
+            top = pd.DataFrame(profile["top_values"], columns=["value", "rows"])
+            parts.append(top.to_html(index=False))
+        parts.append("</body></html>")
+
+        text = "\n".join(parts)
+        if path:
+            _write(path, text)
+        return text
+
+    def to_text(self):
+        """Rendu texte (generate_profiling_report)."""
+        mode = f" (sample of {self.sampled_rows} rows, ± 95% margin)" if self.sampled else ""
+        lines = [f"- Rows: {self.rows}{mode}", f"- Columns: {len(self.columns)}"]
+        if self.duplicated_rows is not None:
+            lines.append(f"- Duplicated rows: {self.duplicated_rows}")
+        lines.append("")
+        lines.append(self.summary().to_string(index=False))
+        return "\n".join(lines)
+
+
+def _write(path, text):
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def _count_duplicates(hashes):
+    """Lignes en double d'après leur hash 64 bits (collision ~ 2^-64)."""
+    return int(len(hashes) - len(np.unique(hashes)))
+
+
+def _count_duplicated_codes(factorized):
+    """
+    Lignes en double à partir des codes de factorize de chaque colonne (déjà
+    calculés pour le profil) : les codes sont combinés en une clé entière par
+    ligne, recompressée avant de dépasser int64. Les NaN sont égaux entre eux,
+    comme pour df.duplicated().
+    """
+    key, size = None, 1
+    for codes, uniques in factorized:
+        width = len(uniques) + 1
+        if key is None:
+            key, size = codes.astype("int64") + 1, width
+            continue
+        if size * width >= 2 ** 62:
+            key, distinct = pd.factorize(key)
+            size = len(distinct)
+        key = key * width + (codes + 1)
+        size *= width
+
+    if key is None:
+        return 0
+    return int(len(key) - len(pd.unique(key)))
+
+
+def profile_data(df, sample_size=None, seed=0, expected_types=EXPECTED_TYPES):
+    """
+    Profil de df, une passe par colonne.
+
+    Parameters:
+        df (pd.DataFrame)
+        sample_size (int, optionnel): profiler un échantillon aléatoire de
+            sample_size lignes ; les comptages sont estimés avec une marge
+            d'erreur à 95 %. Les lignes dupliquées ne sont alors pas comptées
+            (un échantillon ne permet pas de les estimer ; voir profile_file).
+        seed (int): graine de l'échantillon
+        expected_types (dict): {colonne: "numeric" | "datetime" | "string"}
+
+    Returns:
+        DataProfile
+    """
+    sample = df
+    if sample_size is not None and sample_size < len(df):
+        sample = df.sample(n=sample_size, random_state=seed)
+
+    factorized = [pd.factorize(sample[col], use_na_sentinel=True) for col in df.columns]
+    columns = {
+        col: profile_column(sample[col], expected_types.get(col), pair)
+        for col, pair in zip(df.columns, factorized)
+    }
+    duplicated = _count_duplicated_codes(factorized) if sample is df else None
+    return DataProfile(columns, rows=len(df), sampled_rows=len(sample), duplicated_rows=duplicated)
+
+
+def profile_file(path, sample_size=100_000, chunksize=500_000, seed=0,
+                 expected_types=EXPECTED_TYPES):
+    """
+    Profil d'un fichier trop gros pour la mémoire : lecture par blocs, tirage
+    uniforme de sample_size lignes sur tout le fichier (on garde les lignes de
+    plus petite clé aléatoire) et comptage exact des lignes et des doublons
+    (hash 64 bits par ligne, 8 octets par ligne).
+    """
+    rng = np.random.default_rng(seed)
+    kept, keys, hashes = None, None, []
+    rows = 0
+
+    for chunk in load_data_chunks(path, chunksize):
+        rows += len(chunk)
+        hashes.append(pd.util.hash_pandas_object(chunk, index=False).to_numpy())
+
+        chunk_keys = rng.random(len(chunk))
+        if kept is not None:
+            chunk = pd.concat([kept, chunk], ignore_index=True)
+            chunk_keys = np.concatenate([keys, chunk_keys])
+        order = np.argsort(chunk_keys, kind="stable")[:sample_size]
+        kept, keys = chunk.iloc[order].reset_index(drop=True), chunk_keys[order]
+
+    if kept is None:
+        raise ValueError(f"Fichier vide : {path}")
+
+    duplicated = _count_duplicates(np.concatenate(hashes))
+    columns = {
+        col: profile_column(kept[col], expected_types.get(col))
+        for col in kept.columns
+    }
+    return DataProfile(columns, rows=rows, sampled_rows=len(kept), duplicated_rows=duplicated)
@@ -3,6 +3,8 @@ import numpy as np
 import warnings
 from datetime import datetime
 
+from .profiler import DataProfile, profile_data, profile_file
+
 
 # -----------------------------------------------------------
 # Helper: Detect if a column resembles dates
@@ -205,17 +207,30 @@ def number_duplicated_rows(data, test_mode=False):
 # -----------------------------------------------------------
 # MASTER FUNCTION
 # -----------------------------------------------------------
-def generate_profiling_report(df, n=15):
-    print("\n================= FULL DATA PROFILING REPORT =================")
+def generate_profiling_report(df, n=15, sample_size=None, verbose=True):
+    """
+    Profil complet du DataFrame en une passe par colonne (voir profiler.py) :
+    valeurs manquantes, valeurs distinctes, valeurs invalides par type,
+    min / max, anomalies numériques, plages de dates, lignes dupliquées.
+
+    Parameters:
+        df (pd.DataFrame)
+        n (int): nombre de lignes affichées en aperçu
+        sample_size (int, optionnel): profiler un échantillon (comptages
+            estimés avec une marge d'erreur à 95 %)
+        verbose (bool): affiche l'aperçu et le rapport
+
+    Returns:
+        DataProfile : summary(), to_json(path), to_html(path)
+    """
+    profile = profile_data(df, sample_size=sample_size)
 
-    profile_basic_structure(df, n)
-    find_invalid_values(df, "order_date", dtype="datetime", test_mode=True)
-    find_invalid_values(df, "unit_price", dtype="numeric", test_mode=True)
-    find_invalid_values(df, "order_id", dtype="string", test_mode=True)
-    find_invalid_values(df, "quantity", dtype="numeric",test_mode=True)
-    number_duplicated_rows(df, test_mode=True)
-    profile_unusual_numeric_stats(df)
-    profile_text_inconsistencies(df)
-    profile_date_issues(df)
+    if verbose:
+        print("\n================= FULL DATA PROFILING REPORT =================")
+        print(f"\n🔎 First {n} rows:")
+        print(df.head(n))
+        print()
+        print(profile.to_text())
+        print("\n================= END OF PROFILING REPORT =================")
 
-    print("\n================= END OF PROFILING REPORT =================")
+    return profile
@@ -1,6 +1,9 @@
+from .dedup_index import *
 from .duplicates import *
 from .missing_values import *
 from .outliers import *
+from .outlier_stats import *
+from .place_normalizer import *
 from .string_cleaning import *
 from .type_fixing import *
 from .date_cleaning import *
@@ -1,5 +1,94 @@
+import warnings
+
+import numpy as np
 import pandas as pd
 from datetime import datetime
+from pandas.tseries.api import guess_datetime_format
+
+
+# Allowed formats (tried in this order, separators normalized to "-")
+DATE_FORMATS = [
+    "%Y-%m-%d",
+    "%d-%m-%Y",
+    "%d-%m-%Y %H:%M:%S",
+    "%Y-%m-%d %H:%M:%S",
+]
+
+
+def parse_date(val):
+    """
+    Parse une valeur unique (ancien parseur ligne à ligne, conservé comme
+    référence) : strptime sur chaque format de DATE_FORMATS, NaT sinon.
+    """
+    if pd.isna(val):
+        return pd.NaT
+
+    val = str(val).strip()
+
+    # Normalize separators
+    val = val.replace('/', '-').replace('\\', '-')
+
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(val, fmt)
+        except ValueError:
+            continue
+
+    return pd.NaT  # nothing matched
+
+
+def parse_date_series(series, formats=DATE_FORMATS):
+    """
+    Version vectorisée de parse_date, avec le même résultat :
+
+    1. cache par valeur brute unique (pd.factorize) : les dates de commande
+       se répètent énormément, on ne parse que les valeurs distinctes
+    2. chaque format est essayé UNE fois par colonne avec
+       pd.to_datetime(format=..., errors="coerce"), uniquement sur les
+       valeurs pas encore reconnues (même ordre de priorité que parse_date,
+       donc "%d-%m-%Y" reste jour-en-premier)
+    3. le résultat est redéployé sur toutes les lignes en une seule opération
+
+    Returns:
+        parsed (Series datetime64, même index que series)
+        hits (dict): nombre de lignes reconnues par format
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+
+    # str() valeur par valeur, comme parse_date (Timestamp, datetime, nombres…)
+    raw = pd.Series([str(v) for v in uniques], dtype=object)
+    cleaned = (
+        raw.str.strip()
+        .str.replace("/", "-", regex=False)
+        .str.replace("\\", "-", regex=False)
+    )
+
+    parsed_uniques = pd.Series(pd.NaT, index=cleaned.index, dtype="datetime64[us]")
+    remaining = pd.Series(True, index=cleaned.index)
+    hits = {}
+
+    for fmt in formats:
+        if not remaining.any():
+            hits[fmt] = 0
+            continue
+
+        attempt = pd.to_datetime(cleaned[remaining], format=fmt, errors="coerce")
+        matched = attempt.notna()
+        matched_index = attempt.index[matched]
+
+        parsed_uniques[matched_index] = attempt[matched]
+        remaining[matched_index] = False
+        hits[fmt] = int(counts[matched_index].sum())
+
+    # Redéploiement sur toutes les lignes (codes == -1 → valeur manquante)
+    values = np.full(len(codes), np.datetime64("NaT"), dtype="datetime64[us]")
+    present = codes >= 0
+    values[present] = parsed_uniques.to_numpy()[codes[present]]
+
+    parsed = pd.Series(values, index=series.index, name=series.name)
+
+    return parsed, hits
 
 
 def normalize_date(data, column, test_mode=False):
@@ -10,7 +99,7 @@ def normalize_date(data, column, test_mode=False):
     test_mode=True :
         - affiche les valeurs avant/après
         - montre les dates non reconnues
-        - affiche un résumé des comptes
+        - affiche un résumé des comptes (dont le nombre de lignes par format)
     """
 
     if column not in data.columns:
@@ -24,34 +113,8 @@ def normalize_date(data, column, test_mode=False):
         print("\nUnique sample values BEFORE:")
         print(data[column].dropna().astype(str).unique()[:15])
 
-    # --- Internal parser ---
-    def parse_date(val):
-        if pd.isna(val):
-            return pd.NaT
-
-        val = str(val).strip()
-
-        # Normalize separators
-        val = val.replace('/', '-').replace('\\', '-')
-
-        # Allowed formats
-        formats = [
-            "%Y-%m-%d", 
-            "%d-%m-%Y", 
-            "%d-%m-%Y %H:%M:%S",
-            "%Y-%m-%d %H:%M:%S",
-        ]
-
-        for fmt in formats:
-            try:
-                return datetime.strptime(val, fmt)
-            except:
-                continue
-
-        return pd.NaT  # nothing matched
-
-    # --- Apply parsing ---
-    parsed = data[column].apply(parse_date)
+    # --- Vectorized parsing (one pass per format, cached per unique value) ---
+    parsed, hits = parse_date_series(data[column])
 
     # Test mode: show invalid dates
     if test_mode:
@@ -60,6 +123,10 @@ def normalize_date(data, column, test_mode=False):
 
         print(f"\nInvalid date values detected: {num_invalid}")
 
+        print("\nRows matched per format:")
+        for fmt, n in hits.items():
+            print(f"  {fmt:<20} {n}")
+
         if num_invalid > 0:
             print("\nSample of invalid values:")
             print(data.loc[invalid_mask, column].head(10))
@@ -72,4 +139,30 @@ def normalize_date(data, column, test_mode=False):
     # Assign parsed values back to df
     data[column] = parsed
 
-    return data
\ No newline at end of file
+    return data
+
+
+def guess_date_format(series):
+    """
+    Format déduit du premier élément non nul, comme le fait pd.to_datetime
+    sur le fichier entier. On le fige pour que tous les blocs d'un fichier
+    soient parsés de la même façon ("mixed" si aucun format n'est reconnu).
+    """
+    non_null = series.dropna()
+    if non_null.empty or not isinstance(non_null.iloc[0], str):
+        return None
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=Warning)
+        fmt = guess_datetime_format(non_null.iloc[0])
+
+    return fmt if fmt is not None else "mixed"
+
+
+def convert_dates_with_formats(df, date_formats):
+    """Convertit les colonnes date avec les formats figés {colonne: format} (cf. guess_date_format)."""
+    for col, fmt in date_formats.items():
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=Warning)
+            df[col] = pd.to_datetime(df[col], format=fmt, errors="coerce")
+    return df
@@ -0,0 +1,291 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------------------------
+# Purpose of this file:
+# ---------------------------------------------------------------------
+# Dédoublonnage par hash 64 bits, utilisable bloc par bloc et d'un passage
+# à l'autre :
+#   - hash_rows(df, columns) : un uint64 par ligne (stable d'un bloc et d'une
+#     exécution à l'autre). Chaque colonne est factorisée puis seules ses
+#     valeurs distinctes sont hachées (plus rapide que de comparer ou de
+#     hacher chaque cellule texte) ; le texte est haché directement sur les
+#     octets UTF-8 (tampons pyarrow), sans objets Python
+#   - DedupIndex : ensemble compact des hash déjà vus (tableaux uint64 triés,
+#     8 octets par clé), sauvegardé dans un fichier .npy
+#
+#   rows, ids = DedupIndex(), DedupIndex(columns=["order_id"])
+#   for chunk in chunks:
+#       chunk = ids.drop_seen(rows.drop_seen(chunk))
+#   ids.save("results/state/order_ids.npy")
+#   ids.stats()     # doublons retirés par bloc, mémoire par million de clés
+#
+# Deux valeurs différentes n'ont le même hash qu'avec une probabilité ~2^-64
+# (≈ 3e-4 de risque d'au moins une collision sur 100 millions de clés).
+
+# Hash des valeurs manquantes (NaN, None, NaT, <NA>). df.duplicated() sur
+# plusieurs colonnes les confond ; sur une seule colonne object il distingue
+# None, NaN, pd.NA et NaT : hash_column(..., na_types=True) sale alors le
+# hash par le type de la valeur manquante (_type_salts).
+NA_HASH = np.uint64(0x9E3779B97F4A7C15)
+
+
+def _mix(x):
+    """splitmix64 vectorisé (uint64 → uint64)."""
+    x = x + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+def _type_salts(values):
+    """Sel uint64 par valeur, dérivé du nom de son type (1 et "1" ont des sels différents)."""
+    types = np.frompyfunc(type, 1, 1)(values)
+    codes, uniques = pd.factorize(types)
+    names = np.array([f"{t.__module__}.{t.__qualname__}" for t in uniques], dtype=object)
+    return _mix(pd.util.hash_array(names))[codes] if len(values) else np.zeros(0, dtype="uint64")
+
+
+def _hash_padded(data, offsets):
+    """Hash des chaînes data[offsets[i]:offsets[i + 1]] (mots de 8 octets complétés par des zéros)."""
+    lengths = np.diff(offsets)
+    width = -(-int(lengths.max(initial=0)) // 8) * 8
+    if width == 0:
+        return _mix(np.zeros(len(lengths), dtype="uint64") ^ _mix(lengths.astype("uint64")))
+
+    # Ligne i : octets de la chaîne i puis des zéros
+    padded = np.zeros((len(lengths), width), dtype="uint8")
+    padded[np.arange(width) < lengths[:, None]] = data[offsets[0]:offsets[-1]]
+    words = padded.view("<u8")
+
+    # Seuls les mots de la chaîne comptent (pas le remplissage jusqu'à width) :
+    # le hash ne dépend pas de la plus longue chaîne du bloc
+    positions = np.arange(width // 8)
+    salts = _mix(positions.astype("uint64"))
+    used = positions < -(-lengths[:, None] // 8)
+    sums = np.where(used, _mix(words ^ salts), np.uint64(0)).sum(axis=1, dtype="uint64")
+    return _mix(sums ^ _mix(lengths.astype("uint64")))
+
+
+def _hash_strings(values):
+    """
+    Hash des chaînes (sans NA) à partir de leurs octets UTF-8 : chaque chaîne
+    est complétée par des zéros en mots de 8 octets, chaque mot est mélangé
+    avec sa position, puis la somme est mélangée avec la longueur. Le hash
+    d'une chaîne ne dépend que de ses octets, pas des autres valeurs du bloc
+    (les chaînes très longues sont hachées à part, sans agrandir la matrice
+    des autres). None si les
+    valeurs ne sont pas toutes du texte, ou sans pyarrow.
+    """
+    try:
+        import pyarrow as pa
+        array = pa.array(values, type=pa.large_string())
+    except (ImportError, TypeError, ValueError):
+        return None
+    if array.null_count:
+        return None
+
+    _, offsets, data = array.buffers()
+    offsets = np.frombuffer(offsets, dtype="int64")[array.offset:array.offset + len(array) + 1]
+    data = np.frombuffer(data, dtype="uint8") if data is not None else np.array([], dtype="uint8")
+    lengths = np.diff(offsets)
+
+    # Chaînes beaucoup plus longues que la moyenne : une par une
+    limit = max(64, 4 * int(lengths.mean())) if len(lengths) else 0
+    long = np.flatnonzero(lengths > limit)
+    if len(long) == 0:
+        return _hash_padded(data, offsets)
+
+    hashed = np.empty(len(lengths), dtype="uint64")
+    short = np.flatnonzero(lengths <= limit)
+    if len(short):
+        # Octets des chaînes courtes, dans l'ordre
+        owner = np.repeat(lengths <= limit, lengths)
+        hashed[short] = _hash_padded(data[offsets[0]:offsets[-1]][owner], np.r_[0, np.cumsum(lengths[short])])
+    for i in long:
+        hashed[i] = _hash_padded(data, offsets[i:i + 2])[0]
+    return hashed
+
+
+def _hash_numbers(series):
+    kind = series.dtype.kind
+    if kind == "f":
+        values = series.to_numpy(dtype="float64", na_value=np.nan) + 0.0
+        missing = np.isnan(values)
+    else:
+        dtype = "uint64" if kind == "u" else "int64"
+        values = series.to_numpy(dtype=dtype, na_value=0)
+        missing = series.isna().to_numpy()
+
+    hashed = pd.util.hash_array(values)
+    hashed[missing] = NA_HASH
+    return hashed
+
+
+def hash_column(series, na_types=False):
+    """
+    Hash uint64 de chaque valeur de la colonne (NA → NA_HASH, -0.0 == 0.0).
+    Mêmes égalités que df.duplicated() : dans une colonne object, 1 et "1"
+    ont des hash différents. na_types=True : None, NaN, pd.NA et NaT aussi
+    (colonne object, comme df.duplicated() sur une seule colonne).
+    """
+    if series.dtype.kind in "iufb":
+        # Nombres (numpy ou nullables) : hash direct des valeurs
+        return _hash_numbers(series)
+
+    # Texte, catégories, dates : seules les valeurs distinctes sont hachées
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    values = uniques.to_numpy()
+    hashed = None
+    if values.dtype.kind == "f":
+        values = values + 0.0
+    elif values.dtype.kind not in "iubmM":
+        values = values.astype(object)
+        hashed = _hash_strings(values)
+        if hashed is None:
+            # Types mélangés : texte haché comme ci-dessus, autres valeurs
+            # par leur forme texte salée par leur type
+            is_text = np.frompyfunc(lambda value: type(value) is str, 1, 1)(values).astype(bool)
+            hashed = pd.util.hash_array(values) ^ _type_salts(values)
+            text = _hash_strings(values[is_text]) if is_text.any() else None
+            if text is not None:
+                hashed[is_text] = text
+
+    if hashed is None:
+        hashed = pd.util.hash_array(values)
+    hashed = np.append(hashed, NA_HASH)[codes]
+
+    if na_types and series.dtype == object and (codes == -1).any():
+        missing = np.flatnonzero(codes == -1)
+        hashed[missing] = NA_HASH ^ _type_salts(series.to_numpy()[missing])
+    return hashed
+
+
+def hash_rows(df, columns=None, na_types=None):
+    """
+    Hash 64 bits de chaque ligne sur columns (toutes les colonnes par défaut),
+    en combinant les hash des colonnes comme pandas (combine_hash_arrays).
+    na_types (voir hash_column) : par défaut comme df.duplicated(), vrai
+    seulement pour une clé d'une seule colonne.
+    """
+    columns = list(df.columns) if columns is None else list(columns)
+    if na_types is None:
+        na_types = len(columns) == 1
+    result = np.full(len(df), 0x345678, dtype="uint64")
+    mult = np.uint64(1000003)
+    for i, col in enumerate(columns):
+        result = (result ^ hash_column(df[col], na_types)) * mult
+        mult += np.uint64(82520 + 2 * (len(columns) - i - 1))
+    return result + np.uint64(97531)
+
+
+def first_occurrence(keys):
+    """Masque des premières occurrences de chaque clé (comme ~duplicated(keep="first"))."""
+    return ~pd.Series(keys, copy=False).duplicated().to_numpy()
+
+
+class DedupIndex:
+    """
+    Ensemble persistant de hash 64 bits des lignes déjà vues.
+
+    Les clés sont gardées dans quelques tableaux uint64 triés et uniques
+    (fusionnés deux à deux quand ils ont une taille proche) : ajout en
+    O(n log n) amorti, recherche par dichotomie, 8 octets par clé.
+
+    Parameters:
+        columns (list, optionnel): colonnes de la clé (None : ligne complète)
+        path (str, optionnel): fichier .npy (chargé s'il existe, utilisé par save())
+    """
+
+    def __init__(self, columns=None, path=None):
+        self.columns = columns
+        self.path = path
+        self._runs = []
+        self._history = []
+        if path is not None and os.path.exists(path):
+            self._runs = [np.load(path)]
+
+    def __len__(self):
+        return sum(len(run) for run in self._runs)
+
+    def keys(self, df):
+        return hash_rows(df, self.columns)
+
+    def contains(self, keys):
+        """Masque des clés déjà présentes dans l'index."""
+        found = np.zeros(len(keys), dtype=bool)
+        for run in self._runs:
+            if len(run) == 0:
+                continue
+            position = np.searchsorted(run, keys)
+            position[position == len(run)] = 0
+            found |= run[position] == keys
+        return found
+
+    def add(self, keys):
+        """Ajoute des clés (doublons ignorés)."""
+        keys = np.unique(keys[~self.contains(keys)])
+        if len(keys) == 0:
+            return
+        self._runs.append(keys)
+        while len(self._runs) > 1 and len(self._runs[-2]) <= 2 * len(self._runs[-1]):
+            last = self._runs.pop()
+            self._runs[-1] = np.union1d(self._runs[-1], last)
+
+    def drop_seen(self, df):
+        """
+        Retire de df les lignes dont la clé a déjà été vue (dans un bloc ou
+        un passage précédent, ou plus haut dans df) et ajoute les clés de df.
+        """
+        if self.columns is not None and not set(self.columns) <= set(df.columns):
+            return df
+
+        keys = self.keys(df)
+        first = first_occurrence(keys)
+        new = first & ~self.contains(keys)
+        self.add(keys[new])
+
+        self._history.append({
+            "rows": len(df),
+            "duplicates_in_chunk": int((~first).sum()),
+            "seen_before": int((first & ~new).sum()),
+            "kept": int(new.sum()),
+        })
+        return df[new]
+
+    @property
+    def memory_bytes(self):
+        return sum(run.nbytes for run in self._runs)
+
+    def stats(self):
+        """Doublons retirés par bloc (une ligne par appel de drop_seen)."""
+        return pd.DataFrame(self._history, columns=["rows", "duplicates_in_chunk", "seen_before", "kept"])
+
+    def summary(self):
+        keys = len(self)
+        return {
+            "keys": keys,
+            "duplicates_removed": sum(h["rows"] - h["kept"] for h in self._history),
+            "memory_bytes": self.memory_bytes,
+            "bytes_per_million_keys": round(self.memory_bytes / keys * 1_000_000) if keys else 0,
+        }
+
+    def save(self, path=None):
+        """Fusionne les tableaux et écrit l'index en .npy."""
+        path = path or self.path
+        if path is None:
+            raise ValueError("Pas de chemin pour sauvegarder l'index")
+        if len(self._runs) > 1:
+            self._runs = [np.unique(np.concatenate(self._runs))]
+        keys = self._runs[0] if self._runs else np.array([], dtype="uint64")
+
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        root, ext = os.path.splitext(path)
+        tmp_path = root + ".tmp" + ext
+        np.save(tmp_path, keys)
+        os.replace(tmp_path, path)
+        return path
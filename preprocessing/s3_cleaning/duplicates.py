@@ -1,12 +1,17 @@
+from .dedup_index import hash_rows, first_occurrence
+
+
 #(Q10–Q12)
+# Full-row duplicates are found through a 64-bit row hash (dedup_index.py):
+# faster than df.duplicated(), which compares every text cell.
 def count_duplicates(df):
     """Count fully duplicated rows."""
-    return df.duplicated().sum()
+    return int((~first_occurrence(hash_rows(df))).sum())
 
 
 def drop_duplicates_all(df):
     """Drop all fully duplicated rows."""
-    return df.drop_duplicates()
+    return df[first_occurrence(hash_rows(df))]
 
 
 
@@ -1,5 +1,7 @@
 import pandas as pd
 import numpy as np
+from . import string_cleaning
+from .string_cleaning import transform_text
 #(Q5–Q9)
 
 def count_missing(df):
@@ -77,22 +79,12 @@ def fill_unit_price_mean(df):
         df["unit_price"] = df["unit_price"].fillna(df["unit_price"].mean())
     return df
 
-def complete_amounts(df, test_mode=False):
+def derive_amounts(df, test_mode=False):
     """
-    Complète les colonnes quantity, unit_price et total_amount lorsque possible.
-
-    test_mode = True affiche :
-      - valeurs manquantes au début
-      - tailles des masques appliqués
-      - exemples de lignes complétées
-      - aperçu final
+    Étapes 1️⃣–4️⃣ de complete_amounts : déduit quantity, unit_price et
+    total_amount les uns des autres, ligne par ligne (aucune statistique globale).
     """
 
-    if test_mode:
-        print("\n========== [TEST MODE] complete_amounts() ==========")
-        print("\nMissing BEFORE:")
-        print(df[["quantity", "unit_price", "total_amount"]].isna().sum())
-
     # Ensure numeric
     df['quantity'] = pd.to_numeric(df['quantity'], errors='coerce')
     df['unit_price'] = pd.to_numeric(df['unit_price'], errors='coerce')
@@ -130,15 +122,58 @@ def complete_amounts(df, test_mode=False):
     df['quantity'] = df['quantity'].round()
     df['quantity'] = df['quantity'].astype('Int64')
 
+    return df
+
+
+def amount_fill_statistics(df):
+    """
+    Sommes et effectifs (non-NaN) de quantity et unit_price après derive_amounts.
+    Ces statistiques sont fusionnables : on les additionne bloc par bloc puis
+    on en déduit les moyennes à passer à complete_amounts(fill_values=...).
+    """
+    return {
+        col: (float(df[col].sum(skipna=True)), int(df[col].count()))
+        for col in ("quantity", "unit_price")
+    }
+
+
+def complete_amounts(df, test_mode=False, fill_values=None):
+    """
+    Complète les colonnes quantity, unit_price et total_amount lorsque possible.
+
+    fill_values (dict, optionnel) : {"quantity": ..., "unit_price": ...}
+        valeurs de remplissage précalculées (ex. moyennes globales d'un fichier
+        traité par blocs). Par défaut, les moyennes du DataFrame courant.
+
+    test_mode = True affiche :
+      - valeurs manquantes au début
+      - tailles des masques appliqués
+      - exemples de lignes complétées
+      - aperçu final
+    """
+
+    if test_mode:
+        print("\n========== [TEST MODE] complete_amounts() ==========")
+        print("\nMissing BEFORE:")
+        print(df[["quantity", "unit_price", "total_amount"]].isna().sum())
+
+    df = derive_amounts(df, test_mode=test_mode)
+
     # 5️⃣ Fill remaining quantity NaN with mean
-    moy_quantity = round(df['quantity'].mean(skipna=True))
+    if fill_values is None:
+        moy_quantity = round(df['quantity'].mean(skipna=True))
+    else:
+        moy_quantity = fill_values["quantity"]
     if test_mode:
         print(f"\nReplacing remaining quantity NaN with mean = {moy_quantity}")
 
     df['quantity'] = df['quantity'].fillna(moy_quantity)
 
     # 6️⃣ Fill remaining unit_price NaN with mean
-    mean_unit_price = df['unit_price'].mean(skipna=True)
+    if fill_values is None:
+        mean_unit_price = df['unit_price'].mean(skipna=True)
+    else:
+        mean_unit_price = fill_values["unit_price"]
     if test_mode:
         print(f"Replacing remaining unit_price NaN with mean = {mean_unit_price:.2f}")
 
@@ -192,9 +227,25 @@ city_to_region = {
     "guelmim": "guelmim-oued noun",
 }
 
+# Placeholders texte considérés comme une région manquante
+FAKE_NANS = ["nan", "<na>", "none", "na", "n/a", ""]
+
+
+def _prepare_city_region(data):
+    """Nettoyage commun : minuscules/espaces sur city et region, faux NaN → NA."""
+    data["city"] = transform_text(data["city"], lambda s: s.astype(str).str.lower().str.strip())
+    data["region"] = transform_text(data["region"], lambda s: s.astype(str).str.lower().str.strip())
+    data["region"] = transform_text(data["region"], lambda s: s.mask(s.isin(FAKE_NANS), pd.NA))
+    return data
+
+
 def fix_region_with_city(data, test_mode=False):
     """
     Fix missing or incorrect region values using city information.
+
+    Version vectorisée : city_to_region est appliqué avec Series.map (sur les
+    catégories si la colonne est catégorielle), puis seules les lignes dont la
+    région est manquante sont remplacées (assignation masquée).
     """
 
     if test_mode:
@@ -202,28 +253,50 @@ def fix_region_with_city(data, test_mode=False):
         print("Before fixing, rows where city == 'errachidia':")
         print(data.loc[data["city"].astype(str).str.lower() == "errachidia", ["city", "region"]].head(10))
 
-    # --- Clean text ---
-    data["city"] = data["city"].astype(str).str.lower().str.strip()
-    data["region"] = data["region"].astype(str).str.lower().str.strip()
-
-    # --- Convert fake NaN strings to real NA ---
-    fake_nans = ["nan", "<na>", "none", "na", "n/a", ""]
-    data["region"] = data["region"].apply(
-        lambda x: pd.NA if x in fake_nans else x
-    )
+    # --- Clean text + convert fake NaN strings to real NA ---
+    data = _prepare_city_region(data)
 
     # --- Fill missing/invalid region using city-to-region mapping ---
+    region_from_city = data["city"].map(city_to_region)
+    to_fill = data["region"].isna() & region_from_city.notna()
+
+    if isinstance(data["region"].dtype, pd.CategoricalDtype):
+        new_regions = pd.unique(np.asarray(region_from_city[to_fill], dtype=object))
+        missing_categories = [r for r in new_regions if r not in data["region"].cat.categories]
+        data["region"] = data["region"].cat.add_categories(missing_categories)
+        data.loc[to_fill, "region"] = np.asarray(region_from_city[to_fill], dtype=object)
+    else:
+        data["region"] = data["region"].mask(to_fill, region_from_city)
+
+    if test_mode:
+        print(f"\nRegions filled from city: {to_fill.sum()}")
+        print("After fixing, rows where city == 'errachidia':")
+        print(data.loc[data["city"] == "errachidia", ["city", "region"]].head(10))
+        print("========================================================\n")
+
+    return data
+
+
+def fix_region_with_city_rowwise(data):
+    """
+    Ancienne implémentation ligne par ligne (DataFrame.apply(axis=1)),
+    conservée comme référence pour les benchmarks et les tests d'égalité.
+    """
+    data["city"] = transform_text(data["city"], lambda s: s.astype(str).str.lower().str.strip())
+    data["region"] = transform_text(data["region"], lambda s: s.astype(str).str.lower().str.strip())
+    data["region"] = transform_text(data["region"], lambda s: s.apply(
+        lambda x: pd.NA if x in FAKE_NANS else x
+    ))
+
+    categorical = isinstance(data["region"].dtype, pd.CategoricalDtype)
     data["region"] = data.apply(
         lambda row: city_to_region[row["city"]]
         if pd.isna(row["region"]) and row["city"] in city_to_region
         else row["region"],
         axis=1
     )
-
-    if test_mode:
-        print("\nAfter fixing, rows where city == 'errachidia':")
-        print(data.loc[data["city"] == "errachidia", ["city", "region"]].head(10))
-        print("========================================================\n")
+    if categorical:
+        data["region"] = data["region"].astype("category")
 
     return data
 
@@ -232,45 +305,11 @@ def fix_region_with_city(data, test_mode=False):
 
 
 def clean_city_column(data, column):
-    # convertir en str et nettoyer les espaces
-    data[column] = data[column].astype(str).str.strip().str.lower()
-
-    # remplacer les chaînes "nan" par NaN
-    data[column] = data[column].replace(["nan", " nan ", " none "], pd.NA)
-
-    # dictionnaire de normalisation
-    mapping = {
-        "casa": "casablanca",
-        "casablanca": "casablanca",
-        "khénifra": "khénifra",
-        "béni mellal": "béni mellal",
-        "guelmim": "guelmim",
-        "laâyoune": "laâyoune",
-        "tétouan": "tétouan",
-        "tanger": "tanger",
-        "marrakech": "marrakech",
-        "chichaoua": "chichaoua",
-        "ouarzazate": "ouarzazate",
-        "nador": "nador",
-        "berkane": "berkane",
-        "agadir": "agadir",
-        "fès": "fès",
-        "salé": "salé",
-        "errachidia": "errachidia",
-        "settat": "settat",
-        "mohammedia": "mohammedia",
-        "tiznit": "tiznit",
-        "el jadida": "el jadida",
-        "inezgane": "inezgane",
-        "oujda": "oujda",
-        "meknès": "meknès",
-        "safi": "safi"
-    }
-
-    # appliquer la normalisation si la valeur existe dans le mapping
-    data[column] = data[column].apply(lambda x: mapping.get(x, x))
-
-    return data
+    """
+    Ancienne copie de string_cleaning.clean_city_column (même nettoyage :
+    texte normalisé puis table d'alias des villes, sur les valeurs distinctes).
+    """
+    return string_cleaning.clean_city_column(data, column)
 
 def replace_nan_columns_by_words(data, columns, words):
     if len(columns) != len(words):
@@ -285,7 +324,13 @@ def replace_nan_columns_by_words(data, columns, words):
     return data
 
 
-def fill_missing_dates(df, date_columns):
+def fill_missing_dates(df, date_columns, modes=None):
+    """
+    Convertit les colonnes en datetime puis remplit les NaT par le mode.
+
+    modes (dict, optionnel) : {colonne: Timestamp} précalculés, par exemple
+    fusionnés sur tous les blocs d'un fichier (voir date_value_counts).
+    """
     
     # S'assurer que les colonnes sont en datetime
     for col in date_columns:
@@ -293,7 +338,9 @@ def fill_missing_dates(df, date_columns):
     
     # Remplir les valeurs manquantes par la mode
     for col in date_columns:
-        if df[col].notna().sum() == 0:
+        if modes is not None and col in modes:
+            df[col] = df[col].fillna(modes[col])
+        elif df[col].notna().sum() == 0:
             # Si la colonne est entièrement vide, bon courage...
             # On met une date par défaut
             df[col] = df[col].fillna(pd.Timestamp("2000-01-01"))
@@ -301,4 +348,20 @@ def fill_missing_dates(df, date_columns):
             mode_val = df[col].mode()[0]
             df[col] = df[col].fillna(mode_val)
     
-    return df
\ No newline at end of file
+    return df
+
+
+def date_value_counts(df, column):
+    """Effectifs par date (fusionnables par addition entre blocs)."""
+    return pd.to_datetime(df[column], errors='coerce').value_counts()
+
+
+def mode_from_counts(counts):
+    """
+    Mode à partir d'effectifs fusionnés, avec le même départage que
+    Series.mode()[0] (plus petite valeur parmi les ex aequo).
+    Retourne la date par défaut de fill_missing_dates si counts est vide.
+    """
+    if len(counts) == 0:
+        return pd.Timestamp("2000-01-01")
+    return counts[counts == counts.max()].index.min()
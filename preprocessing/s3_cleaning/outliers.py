@@ -28,10 +28,18 @@ def detect_outliers_iqr(df, column='total_amount'):
         'outliers': outliers
     }
 
-def detect_outliers_zscore(df, column='total_amount', threshold=3):
+def detect_outliers_zscore(df, column='total_amount', threshold=3, moments=None):
+    """
+    moments (tuple, optionnel) : (moyenne, écart-type ddof=0) précalculés sur
+    l'ensemble des données, pour un calcul bloc par bloc. Par défaut, scipy zscore.
+    """
 
     # Calcul du z-score
-    df['zscore_' + column] = zscore(df[column])
+    if moments is None:
+        df['zscore_' + column] = zscore(df[column])
+    else:
+        mean, std = moments
+        df['zscore_' + column] = ((df[column] - mean) / std).astype(float)
 
     # Détection
     outliers = df[df['zscore_' + column].abs() > threshold]
@@ -39,7 +47,7 @@ def detect_outliers_zscore(df, column='total_amount', threshold=3):
     return outliers
 
 
-def mark_outliers_iqr(df, column, test_mode=False):
+def mark_outliers_iqr(df, column, test_mode=False, bounds=None):
     """
     Détecte les outliers via la méthode IQR, ajoute une colonne booléenne indiquant
     si une ligne est un outlier, et retourne les bornes.
@@ -48,6 +56,8 @@ def mark_outliers_iqr(df, column, test_mode=False):
         df (DataFrame): le dataset
         column (str): colonne numérique à analyser
         test_mode (bool): si True, affiche les résultats détaillés
+        bounds (dict, optionnel): bornes précalculées (lower_bound, upper_bound),
+            ex. OutlierStats.iqr_bounds() sur un fichier complet traité par blocs
 
     Returns:
         df (DataFrame): avec une nouvelle colonne is_outlier_<column>_iqr
@@ -55,7 +65,7 @@ def mark_outliers_iqr(df, column, test_mode=False):
     """
 
     # 1️⃣ Détection IQR
-    result = detect_outliers_iqr(df, column=column)
+    result = bounds if bounds is not None else detect_outliers_iqr(df, column=column)
     lower = result["lower_bound"]
     upper = result["upper_bound"]
 
@@ -63,7 +73,10 @@ def mark_outliers_iqr(df, column, test_mode=False):
     outlier_col = f"is_outlier_{column}_iqr"
 
     # 3️⃣ Marquage des outliers
-    df[outlier_col] = df[column].apply(lambda x: x < lower or x > upper)
+    # (comparaison vectorisée ; NaN → False, comme x < lower or x > upper)
+    values = df[column]
+    flags = (values < lower) | (values > upper)
+    df[outlier_col] = flags.to_numpy(dtype=bool, na_value=False)
 
     # 4️⃣ Test Mode Output
     if test_mode:
@@ -0,0 +1,184 @@
+import json
+import os
+import re
+import unicodedata
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# ---------------------------------------------------------------------
+# Purpose of this file:
+# ---------------------------------------------------------------------
+# Normalisation des villes et régions marocaines à partir d'une table
+# d'alias (morocco_places.json : nom canonique → variantes), chargée et
+# compilée une seule fois :
+#   - clé de comparaison : minuscules, accents retirés, ponctuation et
+#     espaces multiples réduits à un espace ("Béni-Mellal " → "beni mellal")
+#   - valeur connue : recherche directe de la clé
+#   - variante inconnue : index de suppressions (SymSpell) puis distance
+#     d'édition, au plus 1 (clé de 4 à 7 caractères) ou 2 (8 et plus) ;
+#     une correspondance à égalité entre deux noms n'est pas retenue
+#   - chaque valeur distincte n'est résolue qu'une fois (cache), le résultat
+#     est redéployé sur les lignes par les codes de pd.factorize
+#
+#   cities = city_normalizer()
+#   cities(pd.Series(["casa", "Marrakesh", "tetouan", "Rabbat", "xyz"]))
+#   # → casablanca, marrakech, tétouan, rabat, xyz (inchangé)
+#   cities.report(df["city"])     # valeurs non reconnues, lignes, nom le plus proche
+#
+# Les valeurs non reconnues sont gardées telles quelles (après la préparation
+# du texte faite par l'appelant) et listées dans normalizer.unmatched.
+
+PLACES_PATH = os.path.join(os.path.dirname(__file__), "morocco_places.json")
+
+
+def fold(text):
+    """Clé de comparaison : minuscules sans accents, séparateurs → un espace."""
+    text = unicodedata.normalize("NFKD", str(text).lower())
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return re.sub(r"[\W_]+", " ", text).strip()
+
+
+def edit_distance(a, b, limit=None):
+    """Distance de Levenshtein (arrêt anticipé au-delà de limit : limit + 1)."""
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is not None and len(a) - len(b) > limit:
+        return limit + 1
+
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def _deletes(word, depth):
+    """word et tous les mots obtenus en retirant jusqu'à depth caractères."""
+    variants = {word}
+    frontier = {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        variants |= frontier
+    return variants
+
+
+@lru_cache(maxsize=None)
+def load_place_table(path=PLACES_PATH):
+    """Table {"cities": {nom: [alias]}, "regions": {nom: [alias]}} (lue une fois par chemin)."""
+    with open(path, encoding="utf-8") as f:
+        table = json.load(f)
+    if set(table) != {"cities", "regions"}:
+        raise ValueError(f"Table de lieux invalide (clés attendues : cities, regions) : {path}")
+    return table
+
+
+class PlaceNormalizer:
+    """
+    Series → Series : remplace les variantes connues (ou proches) par leur
+    nom canonique, valeur par valeur (voir l'en-tête du fichier).
+
+    Parameters:
+        aliases (dict): {nom canonique: [variantes]}
+        max_distance (int): distance d'édition maximale (clés de 8 caractères et plus)
+    """
+
+    def __init__(self, aliases, max_distance=2):
+        self.max_distance = max_distance
+        self.canonical = sorted(aliases)
+        self._keys = {}
+        for name, variants in aliases.items():
+            for variant in [name, *variants]:
+                key = fold(variant)
+                if self._keys.get(key, name) != name:
+                    raise ValueError(f"Alias ambigu : '{variant}' ({self._keys[key]} / {name})")
+                self._keys[key] = name
+
+        self._index = {}
+        for key in self._keys:
+            for variant in _deletes(key, max_distance):
+                self._index.setdefault(variant, set()).add(key)
+
+        self._cache = {}
+        self.unmatched = {}
+
+    def _allowed(self, key):
+        if len(key) < 4:
+            return 0
+        return 1 if len(key) < 8 else self.max_distance
+
+    def _fuzzy(self, key):
+        allowed = self._allowed(key)
+        if allowed == 0:
+            return None
+
+        candidates = set()
+        for variant in _deletes(key, allowed):
+            candidates |= self._index.get(variant, set())
+
+        best, names = allowed + 1, set()
+        for candidate in candidates:
+            distance = edit_distance(key, candidate, limit=allowed)
+            if distance < best:
+                best, names = distance, {self._keys[candidate]}
+            elif distance == best:
+                names.add(self._keys[candidate])
+        return names.pop() if best <= allowed and len(names) == 1 else None
+
+    def lookup(self, value):
+        """Nom canonique de value, ou None si elle n'est pas reconnue."""
+        if value in self._cache:
+            return self._cache[value]
+
+        key = fold(value)
+        name = self._keys.get(key)
+        if name is None:
+            name = self._fuzzy(key)
+        if name is None:
+            self.unmatched[value] = self.closest(value)
+        self._cache[value] = name
+        return name
+
+    def closest(self, value):
+        """(nom canonique le plus proche, distance) — pour les rapports."""
+        key = fold(value)
+        distance, candidate = min((edit_distance(key, k), k) for k in self._keys)
+        return self._keys[candidate], distance
+
+    def __call__(self, s):
+        codes, uniques = pd.factorize(s, use_na_sentinel=True)
+        names = [self.lookup(value) for value in uniques]
+        replace = np.array([name is not None and name != value for name, value in zip(names, uniques)] + [False])
+        if not replace.any():
+            return s
+
+        mask = replace[codes]
+        values = np.array(names + [None], dtype=object)[codes]
+        return s.mask(mask, pd.Series(values, index=s.index))
+
+    def report(self, s):
+        """Valeurs de s non reconnues : nombre de lignes et nom le plus proche."""
+        counts = s.dropna().value_counts()
+        rows = []
+        for value, count in counts.items():
+            if self.lookup(value) is None:
+                name, distance = self.unmatched[value]
+                rows.append({"value": value, "rows": int(count), "closest": name, "distance": distance})
+        return pd.DataFrame(rows, columns=["value", "rows", "closest", "distance"])
+
+
+@lru_cache(maxsize=None)
+def city_normalizer(path=PLACES_PATH):
+    """Normaliseur des villes de la table (compilé une fois par chemin)."""
+    return PlaceNormalizer(load_place_table(path)["cities"])
+
+
+@lru_cache(maxsize=None)
+def region_normalizer(path=PLACES_PATH):
+    """Normaliseur des régions de la table (compilé une fois par chemin)."""
+    return PlaceNormalizer(load_place_table(path)["regions"])
@@ -1,23 +1,160 @@
 #(Q20–Q21)
+import numpy as np
 import pandas as pd
 
+from .place_normalizer import city_normalizer, region_normalizer
+
+
+# -----------------------------------------------------------
+# Helper: run a text transformation on categories only
+# -----------------------------------------------------------
+def transform_text(series, func):
+    """
+    Applique func (Series → Series, valeur par valeur) à une colonne texte.
+
+    Si la colonne est catégorielle, func n'est exécutée que sur les catégories
+    (quelques dizaines de valeurs) plus une valeur manquante, puis le résultat
+    est redéployé sur les lignes via les codes : aucune chaîne n'est recréée
+    par ligne et le résultat reste catégoriel (les catégories qui deviennent
+    identiques sont fusionnées). Sinon, func est appliquée à la colonne.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        return func(series)
+
+    categories = series.cat.categories
+    # catégories + une valeur manquante (pour les lignes NaN, code -1)
+    values = pd.Series(categories, dtype=categories.dtype)
+    values = values.reindex(range(len(categories) + 1))
+
+    transformed = func(values)
+    new_codes, new_categories = pd.factorize(transformed, use_na_sentinel=True)
+
+    codes = series.cat.codes.to_numpy()
+    codes = np.where(codes == -1, len(categories), codes)
+
+    return pd.Series(
+        pd.Categorical.from_codes(new_codes[codes], categories=new_categories),
+        index=series.index,
+        name=series.name,
+    )
+
+
+def transform_unique(series, func):
+    """
+    Comme transform_text, mais aussi pour une colonne non catégorielle :
+    func n'est exécutée qu'une fois par valeur distincte (+ une valeur
+    manquante), puis le résultat est redéployé sur les lignes. À réserver
+    aux colonnes à faible cardinalité (ville, région, catégorie, ...).
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return transform_text(series, func)
+
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    values = pd.Series(uniques).reindex(range(len(uniques) + 1))
+
+    transformed = func(values)
+    codes = np.where(codes == -1, len(uniques), codes)
+
+    result = transformed.take(codes)
+    result.index = series.index
+    result.name = series.name
+    return result
+
+
+# -----------------------------------------------------------
+# Series → Series text operations (valeur par valeur).
+# Utilisées par les fonctions de nettoyage ci-dessous et par le moteur
+# de pipeline, qui enchaîne celles d'étapes consécutives en une seule passe.
+# Villes et régions : noms canoniques de la table d'alias
+# (morocco_places.json, voir place_normalizer.py).
+# -----------------------------------------------------------
+
+
+def strip_text(s):
+    """Texte sans espaces en début / fin."""
+    return s.astype(str).str.strip()
+
+
+def title_text(s):
+    """Texte sans espaces en début / fin, en Title Case."""
+    return s.astype(str).str.strip().str.title()
+
+
+def normalize_city_text(s):
+    """Minuscules, espaces retirés, faux NaN ("nan", "none", "") → NaN."""
+    s = s.astype(str).str.strip().str.lower()
+
+    # map common invalid string placeholders to NaN
+    return s.replace(
+        ["nan", " nan ", "none", " none ", ""],
+        pd.NA
+    )
+
+
+def map_city(s):
+    """Variantes connues ou proches → nom de ville canonique (place_normalizer)."""
+    return city_normalizer()(s)
+
+
+def normalize_city(s):
+    """normalize_city_text puis map_city (= clean_city_column sans test_mode)."""
+    return map_city(normalize_city_text(s))
+
+
+def normalize_region_text(s):
+    """Minuscules, espaces et tirets normalisés, faux NaN → NaN."""
+    s = s.astype(str).str.strip().str.lower()
+
+    # convert common fake-NAN text to real NaN
+    s = s.replace(
+        ["nan", " none ", "nan "],
+        pd.NA
+    )
+
+    # normalize multiple spaces
+    s = s.str.replace(r"\s+", " ", regex=True)
+
+    # normalize spaces around hyphens
+    return s.str.replace(r"\s*-\s*", "-", regex=True)
+
+
+def map_region(s):
+    """Variantes connues ou proches → nom de région canonique (place_normalizer)."""
+    return region_normalizer()(s)
+
+
+def normalize_region(s):
+    """normalize_region_text puis map_region (= clean_region_column sans test_mode)."""
+    return map_region(normalize_region_text(s))
+
+
+def replace_casa_text(s):
+    """Toute variante 'Casa*' → 'Casablanca'."""
+    return s.replace(
+        to_replace=r"(?i)casa.*",
+        value="Casablanca",
+        regex=True
+    )
+
+
+def fill_text_na(s, word):
+    """Chaînes "nan" et valeurs manquantes → word."""
+    return s.replace("nan", pd.NA).fillna(word)
+
+
 def clean_city_format(df):
     """Trim spaces and convert city to Title Case."""
     if "city" in df.columns:
-        df["city"] = df["city"].astype(str).str.strip().str.title()
+        df["city"] = transform_text(df["city"], title_text)
     return df
 
 
 
 
 def replace_casa_variants(df):
-    """Replace any variation of 'Casa*' with 'Casablanca'."""
+    """Replace any variation of 'Casa*' with 'Casablanca' (regex run on distinct values only)."""
     if "city" in df.columns:
-        df["city"] = df["city"].replace(
-            to_replace=r"(?i)casa.*",
-            value="Casablanca",
-            regex=True
-        )
+        df["city"] = transform_unique(df["city"], replace_casa_text)
     return df
 
 
@@ -26,10 +163,8 @@ def replace_nan_columns_by_words(data, columns, words):
         raise ValueError("Les listes columns et words doivent avoir la même longueur.")
     
     for col, word in zip(columns, words):
-        # Remplacer les chaînes "nan" par un vrai NaN
-        data[col] = data[col].replace("nan", pd.NA)
-        # Remplacer les NaN par le mot fourni
-        data[col] = data[col].fillna(word)
+        # Remplacer les chaînes "nan" par un vrai NaN, puis les NaN par le mot fourni
+        data[col] = transform_text(data[col], lambda s, word=word: fill_text_na(s, word))
     
     return data
 
@@ -64,46 +199,14 @@ def clean_city_column(data, column, test_mode=False):
         print(data[column].dropna().astype(str).unique()[:20])
 
     # -----------------------
-    # Step 1 — Normalize text
+    # Step 1 — Normalize text (distinct values only)
     # -----------------------
-    data[column] = data[column].astype(str).str.strip().str.lower()
-
-    # map common invalid string placeholders to NaN
-    data[column] = data[column].replace(
-        ["nan", " nan ", "none", " none ", ""], 
-        pd.NA
-    )
+    data[column] = transform_unique(data[column], normalize_city_text)
 
     # -----------------------
-    # Step 2 — City normalization dictionary
+    # Step 2 — City alias table (place_normalizer, compiled once)
     # -----------------------
-    mapping = {
-        "casa": "casablanca",
-        "casablanca": "casablanca",
-        "khénifra": "khénifra",
-        "béni mellal": "béni mellal",
-        "guelmim": "guelmim",
-        "laâyoune": "laâyoune",
-        "tétouan": "tétouan",
-        "tanger": "tanger",
-        "marrakech": "marrakech",
-        "chichaoua": "chichaoua",
-        "ouarzazate": "ouarzazate",
-        "nador": "nador",
-        "berkane": "berkane",
-        "agadir": "agadir",
-        "fès": "fès",
-        "salé": "salé",
-        "errachidia": "errachidia",
-        "settat": "settat",
-        "mohammedia": "mohammedia",
-        "tiznit": "tiznit",
-        "el jadida": "el jadida",
-        "inezgane": "inezgane",
-        "oujda": "oujda",
-        "meknès": "meknès",
-        "safi": "safi"
-    }
+    normalizer = city_normalizer()
 
     # -----------------------
     # Step 3 — Apply mapping
@@ -111,7 +214,7 @@ def clean_city_column(data, column, test_mode=False):
     if test_mode:
         before_map = data[column].copy()
 
-    data[column] = data[column].apply(lambda x: mapping.get(x, x))
+    data[column] = transform_unique(data[column], normalizer)
 
     # -----------------------
     # TEST MODE: AFTER + ANALYSIS
@@ -119,17 +222,15 @@ def clean_city_column(data, column, test_mode=False):
     if test_mode:
 
         print("\nValues replaced by mapping:")
-        replaced = before_map[before_map != data[column]]
+        replaced = before_map[before_map.astype(str) != data[column].astype(str)]
         if len(replaced) > 0:
             print(replaced.head(10))
         else:
             print("No values were replaced.")
 
-        print("\nUnknown city names (not in mapping):")
-        unknown = sorted(
-            {c for c in data[column].dropna().unique() if c not in mapping.values()}
-        )
-        print(unknown[:20] if unknown else "None")
+        print("\nUnknown city names (not in the alias table, with the closest name):")
+        unknown = normalizer.report(data[column])
+        print(unknown.head(20) if len(unknown) else "None")
 
         print("\nAFTER cleaning:")
         print(data[column].head(10))
@@ -173,61 +274,14 @@ def clean_region_column(data, column, test_mode=False):
         print(data[column].dropna().astype(str).unique()[:20])
 
     # -----------------------
-    # Step 1 — Normalize casing & whitespace
+    # Step 1 — Normalize casing & whitespace (distinct values only)
     # -----------------------
-    data[column] = data[column].astype(str).str.strip().str.lower()
-
-    # convert common fake-NAN text to real NaN
-    data[column] = data[column].replace(
-        ["nan", " none ", "nan "],
-        pd.NA
-    )
-
-    # normalize multiple spaces
-    data[column] = data[column].str.replace(r"\s+", " ", regex=True)
-
-    # normalize spaces around hyphens
-    data[column] = data[column].str.replace(r"\s*-\s*", "-", regex=True)
+    data[column] = transform_unique(data[column], normalize_region_text)
 
     # -----------------------
-    # Step 2 — Mapping dictionary
+    # Step 2 — Region alias table (place_normalizer, compiled once)
     # -----------------------
-    mapping = {
-        "casablanca-settat": "casablanca-settat",
-        "casablanca settat": "casablanca-settat",
-
-        "béni mellal-khénifra": "béni mellal-khénifra",
-        "béni mellal khénifra": "béni mellal-khénifra",
-
-        "oriental": "oriental",
-
-        "marrakech-safi": "marrakech-safi",
-        "marrakech safi": "marrakech-safi",
-
-        "tanger-tétouan-al hoceïma": "tanger-tétouan-al hoceïma",
-        "tanger tétouan al hoceïma": "tanger-tétouan-al hoceïma",
-
-        "souss-massa": "souss-massa",
-        "souss massa": "souss-massa",
-
-        "dakhla-oued ed-dahab": "dakhla-oued ed-dahab",
-        "dakhla oued ed dahab": "dakhla-oued ed-dahab",
-
-        "drâa-tafilalet": "drâa-tafilalet",
-        "drâa tafilalet": "drâa-tafilalet",
-
-        "laâyoune-sakia el hamra": "laâyoune-sakia el hamra",
-        "laâyoune sakia el hamra": "laâyoune-sakia el hamra",
-
-        "guelmim-oued noun": "guelmim-oued noun",
-        "guelmim oued noun": "guelmim-oued noun",
-
-        "fès-meknès": "fès-meknès",
-        "fès meknès": "fès-meknès",
-
-        "rabat-salé-kénitra": "rabat-salé-kénitra",
-        "rabat salé kénitra": "rabat-salé-kénitra",
-    }
+    normalizer = region_normalizer()
 
     # -----------------------
     # Step 3 — Apply mapping
@@ -235,25 +289,22 @@ def clean_region_column(data, column, test_mode=False):
     if test_mode:
         before_map = data[column].copy()
 
-    data[column] = data[column].apply(lambda x: mapping.get(x, x) if pd.notna(x) else x)
+    data[column] = transform_unique(data[column], normalizer)
 
     # -----------------------
     # TEST MODE: AFTER
     # -----------------------
     if test_mode:
         print("\nValues replaced by mapping:")
-        replaced = before_map[before_map != data[column]]
+        replaced = before_map[before_map.astype(str) != data[column].astype(str)]
         if len(replaced) > 0:
             print(replaced.head(10))
         else:
             print("No region names were replaced.")
 
-        print("\nUnknown region names (not in mapping):")
-        unknown = sorted({
-            r for r in data[column].dropna().unique()
-            if r not in mapping.values()
-        })
-        print(unknown[:20] if unknown else "None")
+        print("\nUnknown region names (not in the alias table, with the closest name):")
+        unknown = normalizer.report(data[column])
+        print(unknown.head(20) if len(unknown) else "None")
 
         print("\nAFTER cleaning:")
         print(data[column].head(10))
@@ -266,14 +317,14 @@ def clean_region_column(data, column, test_mode=False):
 def strip_whitespace(df, column):
     """Remove leading/trailing whitespace from a string column."""
     if column in df.columns:
-        df[column] = df[column].astype(str).str.strip()
+        df[column] = transform_text(df[column], strip_text)
     return df
 
 
 def standardize_case(df, columns):
     """Standardize casing of text columns."""
     for col in columns:
-      df[col] = df[col].astype(str).str.strip().str.title()
+      df[col] = transform_text(df[col], title_text)
     
     return df
 
@@ -1,6 +1,17 @@
 import pandas as pd
 import numpy as np
 import re
+from .string_cleaning import transform_text, strip_text
+
+# Colonnes texte à faible cardinalité (quelques dizaines de valeurs distinctes)
+CATEGORICAL_COLUMNS = [
+    "region",
+    "city",
+    "payment_method",
+    "product_category",
+    "order_status",
+    "discount_code",
+]
 
 def convert_to_float(df, column):
     """Convert a column to float, coercing invalid values to NaN."""
@@ -12,7 +23,8 @@ def convert_to_type(data, columns, types):
     """
     Convertit plusieurs colonnes selon leur type :
     - 'numerique'  -> numeric (float ou int)
-    - 'string'     -> string propre
+    - 'string'     -> string propre (calculé sur les catégories si la colonne est catégorielle)
+    - 'category'   -> pd.Categorical
     - 'date'       -> datetime (NaT si invalide)
     """
 
@@ -22,7 +34,10 @@ def convert_to_type(data, columns, types):
             data[col] = pd.to_numeric(data[col], errors="coerce")
 
         elif t == "string":
-            data[col] = data[col].astype(str).str.strip()
+            data[col] = transform_text(data[col], strip_text)
+
+        elif t == "category":
+            data[col] = data[col].astype("category")
 
         elif t == "date":
             data[col] = pd.to_datetime(data[col], errors="coerce")
@@ -31,6 +46,17 @@ def convert_to_type(data, columns, types):
             print(f"Type inconnu : {t} pour la colonne {col}")
 
     return data
+def convert_to_categorical(data, columns=CATEGORICAL_COLUMNS):
+    """
+    Mode catégoriel (optionnel) : convertit les colonnes texte à faible
+    cardinalité en pd.Categorical. Les nettoyages de texte (transform_text)
+    travaillent alors sur les catégories au lieu de chaque ligne, la mémoire
+    et les groupby sur ces colonnes sont beaucoup plus légers.
+    """
+    columns = [col for col in columns if col in data.columns]
+    return convert_to_type(data, columns, ["category"] * len(columns))
+
+
 # -----------------------------
 # Convert number words → numeric
 # -----------------------------
@@ -101,6 +127,57 @@ def detect_unusual_values(df, column, expected_type="float"):
     return df[unusual_mask]
 
 
+# -----------------------------
+# Fast path (production mode)
+# -----------------------------
+# Les nombres écrits en chiffres ("12", "12.50", ".5") sont convertis en une
+# passe par le cast pyarrow (même arrondi que float()). Tout le reste
+# ("twenty-one", "-3", "1e5", "free", "nan", ...) passe par
+# convert_number_words_to_numeric, une fois par valeur distincte.
+WHITESPACE = " \t\n\r\f\v"
+
+
+def _clean_numeric_value(value):
+    """Étapes 1 à 3 pour une valeur : mots → nombre, valeur invalide → 0."""
+    value = convert_number_words_to_numeric(value)
+    # texte resté non numérique après conversion = valeur invalide
+    return 0 if isinstance(value, str) else value
+
+
+def _fast_clean_numeric(series):
+    """
+    Même résultat que les étapes 1 à 4 de clean_numeric_column pour une
+    colonne texte : les nombres sont convertis en une passe (cast pyarrow),
+    le reste une seule fois par valeur distincte. Retourne None si la colonne
+    ne s'y prête pas (types mélangés, pas de pyarrow, aucun nombre écrit en
+    chiffres) : on garde alors le chemin ligne par ligne.
+    """
+    if pd.api.types.infer_dtype(series, skipna=True) != "string":
+        return None
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+    except ImportError:
+        return None
+
+    text = pc.utf8_trim(pa.array(series, from_pandas=True), characters=WHITESPACE)
+    digits = pc.replace_substring(text, ".", "", max_replacements=1)
+    numeric = pc.fill_null(pc.ascii_is_decimal(digits), False).to_numpy(zero_copy_only=False)
+    if not numeric.any():
+        return None
+
+    values = np.full(len(series), np.nan)
+    values[numeric] = pc.cast(pc.filter(text, numeric), pa.float64()).to_numpy()
+
+    residue = ~numeric & series.notna().to_numpy()
+    if residue.any():
+        rare = series[residue]
+        cleaned = {value: _clean_numeric_value(value) for value in rare.unique()}
+        values[residue] = rare.map(cleaned).to_numpy(dtype="float64", na_value=np.nan)
+
+    return pd.Series(values, index=series.index, name=series.name)
+
+
 # -----------------------------
 # Main cleaning function
 # -----------------------------
@@ -111,11 +188,23 @@ def clean_numeric_column(df, column, test_mode=False):
     2. Detect unusual or invalid values (free, unknown, non-numeric)
     3. Replace invalid values with 0
     4. Convert column to float
+
+    In production mode (test_mode=False) a text column goes through the fast
+    path (_fast_clean_numeric): same values, without the row-by-row steps.
     """
     if column not in df.columns:
         print(f"[WARNING] Column '{column}' does not exist.")
         return df
 
+    if not test_mode:
+        if pd.api.types.is_numeric_dtype(df[column].dtype) and isinstance(df[column].dtype, np.dtype):
+            # already numeric (numpy dtype): steps 1-4 leave the column unchanged
+            return df
+        cleaned = _fast_clean_numeric(df[column])
+        if cleaned is not None:
+            df[column] = cleaned
+            return df
+
     # PREVIEW BEFORE CLEANING
     if test_mode:
         print(f"\n[TEST MODE] Cleaning '{column}' → BEFORE:")
@@ -128,8 +217,9 @@ def clean_numeric_column(df, column, test_mode=False):
     unusual = detect_unusual_values(df, column)
 
     if len(unusual) > 0:
-        print(f"\nInvalid values detected in '{column}':")
-        print(unusual)
+        if test_mode:
+            print(f"\nInvalid values detected in '{column}':")
+            print(unusual)
 
         # Step 3 — Replace all invalid/unusual values with 0
         df.loc[unusual.index, column] = 0
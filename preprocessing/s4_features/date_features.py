@@ -1,39 +1,179 @@
 import pandas as pd
 
+# ---------------------------------------------------------------------
+# Purpose of this file:
+# ---------------------------------------------------------------------
+# Variables de date (année, mois, jour, jour de la semaine).
+#
+# add_date_variables(df, lazy=True) ne crée aucune colonne : les dates sont
+# converties (si elles ne le sont pas déjà) et les variables sont seulement
+# déclarées dans df.attrs["date_variables"]. Elles sont calculées :
+#   - à la demande, une par une : df.date_variables["order_weekday"]
+#     (valeur gardée pour ce DataFrame)
+#   - toutes ensemble : materialize_date_variables(df) (dernière étape de
+#     features du pipeline, et save_data / ChunkedWriter à l'export), à la
+#     place où add_date_variables les aurait créées
+#
+# Jour de la semaine : catégoriel ordonné Monday..Sunday (1 octet par
+# ligne) par défaut, ou entier 0 = Monday (weekday="int"), ou texte
+# (weekday="name", ancien format).
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+WEEKDAY_DTYPE = pd.CategoricalDtype(WEEKDAYS, ordered=True)
+WEEKDAY_FORMATS = ["category", "int", "name"]
+DATE_PARTS = ["year", "month", "day", "weekday"]
+
+# Clé de df.attrs : {nom de variable: [colonne de date, partie, format du
+# jour, colonne après laquelle l'insérer]}
+PENDING_KEY = "date_variables"
+
+
+def weekday_values(dates, weekday="category"):
+    """Jour de la semaine d'une Series datetime au format weekday (NaT → NA)."""
+    if weekday == "name":
+        return dates.dt.day_name()
+
+    days = dates.dt.dayofweek
+    missing = days.isna().to_numpy()
+    codes = days.fillna(-1).to_numpy().astype("int8")
+    if weekday == "int":
+        return pd.Series(pd.arrays.IntegerArray(codes, missing), index=dates.index)
+    return pd.Series(pd.Categorical.from_codes(codes, dtype=WEEKDAY_DTYPE), index=dates.index)
+
+
+def date_part(dates, part, weekday="category"):
+    """Une variable (year, month, day, weekday) d'une Series datetime."""
+    if part == "weekday":
+        return weekday_values(dates, weekday)
+    return getattr(dates.dt, part).astype("Int64")
+
+
 def add_date_features(df):
     """Create year, month, weekday from order_date."""
     if "order_date" in df.columns:
         df["year"] = df["order_date"].dt.year
         df["month"] = df["order_date"].dt.month
-        df["weekday"] = df["order_date"].dt.day_name()
+        df["weekday"] = weekday_values(df["order_date"])
     return df
 
-def add_date_variables(df, date_cols=["order_date", "ship_date"]):
+def add_date_variables(df, date_cols=["order_date", "ship_date"], lazy=False, weekday="category"):
     """
     Ajoute des variables de date pour chaque colonne dans date_cols :
-    - <col>_year   (int)
-    - <col>_month  (int)
-    - <col>_day    (int)
-    - <col>_weekday (string)
+    - <col>_year   (Int64)
+    - <col>_month  (Int64)
+    - <col>_day    (Int64)
+    - <col>_weekday (catégoriel Monday..Sunday, voir weekday)
+
+    lazy=True : les variables sont seulement déclarées (df.attrs), puis
+    calculées par df.date_variables[...] ou materialize_date_variables(df).
+    Le DataFrame d'entrée n'est pas modifié (copie superficielle).
     """
-    
-    df = df.copy()
-    
+    if weekday not in WEEKDAY_FORMATS:
+        raise ValueError(f"weekday doit être parmi {WEEKDAY_FORMATS} (reçu : {weekday!r}).")
+
+    df = df.copy(deep=False)
+
+    specs = dict(df.attrs.get(PENDING_KEY, {}))
+    anchor = df.columns[-1] if len(df.columns) else None
     for date_col in date_cols:
-        # Convertir en datetime
-        df[date_col] = pd.to_datetime(df[date_col], errors="coerce")
-        
+        # Convertir en datetime (sauf si la colonne l'est déjà)
+        if not pd.api.types.is_datetime64_any_dtype(df[date_col].dtype):
+            df[date_col] = pd.to_datetime(df[date_col], errors="coerce")
+
         # Suffixe basé sur le nom de la colonne
         suffix = date_col.replace("_date", "")
-        
-        # Extraction
-        df[f"{suffix}_year"] = df[date_col].dt.year.astype("Int64")
-        df[f"{suffix}_month"] = df[date_col].dt.month.astype("Int64")
-        df[f"{suffix}_day"] = df[date_col].dt.day.astype("Int64")
-        df[f"{suffix}_weekday"] = df[date_col].dt.day_name()
+        for part in DATE_PARTS:
+            specs[f"{suffix}_{part}"] = [date_col, part, weekday, anchor]
+    df.attrs[PENDING_KEY] = specs
+
+    if lazy:
+        return df
+    return materialize_date_variables(df)
+
+
+def _declared_date_variables(df):
+    """Déclarations de df.attrs dont la colonne de date est encore dans df (df[[...]] peut l'avoir retirée)."""
+    return {name: spec for name, spec in df.attrs.get(PENDING_KEY, {}).items() if spec[0] in df.columns}
+
+
+def pending_date_variables(df):
+    """Noms des variables de date déclarées mais pas encore créées."""
+    return [name for name in _declared_date_variables(df) if name not in df.columns]
 
+
+def has_pending_date_variables(df):
+    return bool(pending_date_variables(df))
+
+
+def materialize_date_variables(df, names=None, compute=date_part):
+    """
+    Crée les variables de date déclarées par add_date_variables(lazy=True)
+    (toutes, ou seulement names), à la place où add_date_variables les
+    aurait ajoutées. compute(dates, part, weekday) → Series calcule une
+    variable (moteur pyarrow : pipeline/arrow_engine.py). Les déclarations
+    dont la colonne de date n'est plus dans df sont retirées.
+    """
+    specs = _declared_date_variables(df)
+    if PENDING_KEY in df.attrs and len(specs) < len(df.attrs[PENDING_KEY]):
+        df.attrs[PENDING_KEY] = specs
+    names = [name for name in (specs if names is None else names)
+             if name in specs and name not in df.columns]
+
+    cached = df.date_variables._cache
+    for name in names:
+        date_col, part, weekday, anchor = specs[name]
+        values = cached.pop(name, None)
+        if values is None:
+            values = compute(df[date_col], part, weekday)
+
+        # Juste après anchor et les variables de même ancrage déjà créées
+        before = [other for other, spec in specs.items() if spec[3] == anchor]
+        before = before[:before.index(name)]
+        if anchor in df.columns:
+            position = df.columns.get_loc(anchor) + 1 + sum(other in df.columns for other in before)
+        else:
+            position = len(df.columns)
+        df.insert(position, name, values.array)
+
+    # Tout est créé : plus rien à déclarer (ni à écrire dans les métadonnées)
+    if PENDING_KEY in df.attrs and not pending_date_variables(df):
+        del df.attrs[PENDING_KEY]
     return df
 
+
+@pd.api.extensions.register_dataframe_accessor("date_variables")
+class DateVariables:
+    """
+    df.date_variables["order_weekday"] : variable de date déclarée par
+    add_date_variables(lazy=True), calculée à la première demande puis
+    gardée pour ce DataFrame (colonne existante : renvoyée telle quelle).
+    """
+
+    def __init__(self, df):
+        self._df = df
+        self._cache = {}
+
+    @property
+    def pending(self):
+        return pending_date_variables(self._df)
+
+    def __getitem__(self, name):
+        if name in self._df.columns:
+            return self._df[name]
+        spec = _declared_date_variables(self._df).get(name)
+        if spec is None:
+            raise KeyError(f"Variable de date inconnue : '{name}'")
+        if name not in self._cache:
+            date_col, part, weekday, _ = spec
+            values = date_part(self._df[date_col], part, weekday)
+            values.name = name
+            self._cache[name] = values
+        return self._cache[name]
+
+    def materialize(self, names=None):
+        return materialize_date_variables(self._df, names)
+
+
 def convert_dates(df):
     """Convert order_date and ship_date to datetime."""
     date_cols = ["order_date", "ship_date"]
@@ -6,7 +6,8 @@ def apply_discount(data, discount_mapping,tva=0.2):
     """
     
     # Calculer le taux de remise à partir du code
-    data["discount_rate"] = data["discount_code"].map(discount_mapping).fillna(0.0)
+    # (astype(float) : le map d'une colonne catégorielle reste catégoriel)
+    data["discount_rate"] = data["discount_code"].map(discount_mapping).astype(float).fillna(0.0)
     
     # Montant de la remise
     data["discount_amount"] = data["total_amount"] * data["discount_rate"]
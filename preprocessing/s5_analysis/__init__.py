@@ -1,4 +1,7 @@
 from .descriptive_stats import *
 from .filtering import *
 from .grouped_kpis import *
-from .time_series import *
\ No newline at end of file
+from .time_series import *
+from .mergeable_kpis import *
+from .kpi_cube import *
+from .daily_rollups import *
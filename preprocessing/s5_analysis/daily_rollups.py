@@ -0,0 +1,220 @@
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from .kpi_cube import _fingerprint
+
+# ---------------------------------------------------------------------
+# Purpose of this file:
+# ---------------------------------------------------------------------
+# Moteur de séries temporelles : agrégats journaliers (somme, effectif
+# non-NaN, min, max de value_column) calculés en une seule passe triée sur
+# les lignes, puis toutes les séries sont dérivées de cette table de
+# quelques centaines de jours :
+#   - hebdomadaire (W), mensuelle (ME), trimestrielle (QE), annuelle (YE)
+#   - statistiques sum, count, mean (somme / effectif), min, max
+#   - fenêtres glissantes (rolling) et comparaison avec l'année précédente
+#     (year_over_year)
+#
+#   rollup = daily_rollup(df)              # une passe sur df
+#   rollup.series("ME", "sum")            # = df.set_index(date)[value].resample("ME").sum()
+#   rollup.rolling(7, "D", "mean")        # moyenne glissante sur 7 jours
+#   rollup.year_over_year("QE")           # trimestre, même trimestre N-1, écart
+#   rollup.merge(other_rollup)            # agrégats additifs (blocs, passages)
+#
+# Jours sans ligne : somme 0, effectif 0, min / max / mean NaN (comme
+# resample). Les dates manquantes (NaT) sont ignorées.
+#
+# Par défaut chaque appel calcule un nouveau rollup. cache=True (sur demande :
+# étapes d'analyse du pipeline) réutilise celui du même DataFrame, avec les
+# mêmes règles que kpi_cube : une modification sur place (df.loc[i, col] = ...)
+# n'est pas détectée (refresh=True).
+# Le graphique est une étape séparée (time_series.plot_time_series).
+
+FREQUENCIES = ["D", "W", "ME", "QE", "YE"]
+STATS = ["sum", "count", "mean", "min", "max"]
+
+# Même période de l'année précédente (W : 52 semaines, même jour de semaine)
+YEAR_BEFORE = {
+    "D": pd.DateOffset(years=1),
+    "W": pd.DateOffset(weeks=52),
+    "ME": pd.DateOffset(years=1),
+    "QE": pd.DateOffset(years=1),
+    "YE": pd.DateOffset(years=1),
+}
+
+# id(df) → (référence faible, empreinte, rollup), comme kpi_cube
+_CACHE = {}
+
+
+def _check(freq, stat):
+    if freq not in FREQUENCIES:
+        raise ValueError(f"Fréquence inconnue : {freq!r} (attendu : {FREQUENCIES})")
+    if stat not in STATS:
+        raise ValueError(f"Statistique inconnue : {stat!r} (attendu : {STATS})")
+
+
+class DailyRollup:
+    """
+    Table journalière (sum, count, min, max) de value_column et séries
+    dérivées (voir l'en-tête du fichier).
+
+    Parameters:
+        daily (DataFrame): sum, count, min, max indexés par jour (calendrier
+            continu du premier au dernier jour)
+        dtype: type des séries renvoyées (celui de value_column, ex. Float64)
+    """
+
+    def __init__(self, daily, date_column="order_date", value_column="total_amount", dtype="float64"):
+        self.daily = daily
+        self.date_column = date_column
+        self.value_column = value_column
+        self.dtype = dtype
+        self._tables = {"D": daily}
+
+    @classmethod
+    def from_frame(cls, df, date_column="order_date", value_column="total_amount"):
+        """Agrégats journaliers de df en une passe : tri des jours puis réductions par segment."""
+        dates = df[date_column]
+        if not pd.api.types.is_datetime64_dtype(dates.dtype):
+            raise ValueError(f"La colonne '{date_column}' doit être de type datetime (sans fuseau).")
+        unit = dates.dt.unit
+
+        days = dates.to_numpy().astype("datetime64[D]")
+        values = df[value_column].to_numpy(dtype="float64", na_value=np.nan)
+        known = ~np.isnat(days)
+        days, values = days[known], values[known]
+
+        order = np.argsort(days, kind="stable")
+        days, values = days[order], values[order]
+        starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]]) if len(days) else np.array([], dtype=int)
+
+        present = ~np.isnan(values)
+        if len(days):
+            table = pd.DataFrame({
+                "sum": np.add.reduceat(np.where(present, values, 0.0), starts),
+                "count": np.add.reduceat(present.astype("int64"), starts),
+                "min": np.fmin.reduceat(values, starts),
+                "max": np.fmax.reduceat(values, starts),
+            }, index=pd.DatetimeIndex(days[starts].astype(f"datetime64[{unit}]")))
+        else:
+            table = pd.DataFrame({"sum": [], "count": [], "min": [], "max": []},
+                                 index=pd.DatetimeIndex([], dtype=f"datetime64[{unit}]"))
+        dtype = df[value_column].dtype if pd.api.types.is_float_dtype(df[value_column].dtype) else "float64"
+        return cls(cls._calendar(table, unit, date_column), date_column, value_column, dtype)
+
+    @staticmethod
+    def _calendar(table, unit, date_column):
+        """Jours manquants ajoutés (somme / effectif 0, min / max NaN)."""
+        if len(table):
+            days = pd.date_range(table.index.min(), table.index.max(), freq="D", unit=unit)
+            table = table.reindex(days)
+        table = table.fillna({"sum": 0.0, "count": 0}).astype({"sum": "float64", "count": "int64"})
+        table.index.name = date_column
+        return table
+
+    def merge(self, other):
+        """Rollup des lignes des deux rollups (sommes et effectifs additionnés, min / max combinés)."""
+        left, right = self.daily.align(other.daily, join="outer")
+        table = pd.DataFrame({
+            "sum": left["sum"].fillna(0.0) + right["sum"].fillna(0.0),
+            "count": left["count"].fillna(0) + right["count"].fillna(0),
+            "min": np.fmin(left["min"], right["min"]),
+            "max": np.fmax(left["max"], right["max"]),
+        })
+        unit = self.daily.index.unit if len(self.daily) else other.daily.index.unit
+        return DailyRollup(self._calendar(table, unit, self.date_column), self.date_column,
+                           self.value_column, self.dtype)
+
+    # -----------------------------------------------------------
+    # Séries dérivées
+    # -----------------------------------------------------------
+    def table(self, freq="ME"):
+        """sum, count, min, max par période freq (D, W, ME, QE, YE), dérivés de la table journalière."""
+        _check(freq, "sum")
+        if freq not in self._tables:
+            periods = self.daily.resample(freq)
+            self._tables[freq] = pd.DataFrame({
+                "sum": periods["sum"].sum(),
+                "count": periods["count"].sum(),
+                "min": periods["min"].min(),
+                "max": periods["max"].max(),
+            })
+        return self._tables[freq]
+
+    def _typed(self, values, stat):
+        """
+        Série nommée comme value_column, du type que donne resample : type de
+        value_column, effectifs en int64 (Int64 pour une colonne Float64).
+        """
+        if stat != "count":
+            values = values.astype(self.dtype)
+        elif isinstance(pd.api.types.pandas_dtype(self.dtype), (pd.Float32Dtype, pd.Float64Dtype)):
+            values = values.astype("Int64")
+        return values.rename(self.value_column)
+
+    def series(self, freq="ME", stat="sum"):
+        """Série de stat (sum, count, mean, min, max) par période freq."""
+        _check(freq, stat)
+        table = self.table(freq)
+        if stat == "mean":
+            values = table["sum"] / table["count"].where(table["count"] > 0)
+        else:
+            values = table[stat].copy()
+        return self._typed(values, stat)
+
+    def rolling(self, window, freq="D", stat="sum", min_periods=1):
+        """
+        stat sur une fenêtre glissante de window périodes freq (ou une durée,
+        ex. "30D" en journalier). mean = somme glissante / effectif glissant.
+        """
+        _check(freq, stat)
+        table = self.table(freq)
+        if stat == "mean":
+            sums = table["sum"].rolling(window, min_periods=min_periods).sum()
+            counts = table["count"].rolling(window, min_periods=min_periods).sum()
+            values = sums / counts.where(counts > 0)
+        else:
+            how = "sum" if stat in ("sum", "count") else stat
+            values = getattr(table[stat].rolling(window, min_periods=min_periods), how)()
+        return self._typed(values, stat)
+
+    def year_over_year(self, freq="ME", stat="sum"):
+        """
+        Pour chaque période : valeur, valeur de la même période un an plus
+        tôt (NaN hors historique), écart absolu et relatif.
+        """
+        _check(freq, stat)
+        current = self.series(freq, stat)
+        previous = current.reindex(current.index - YEAR_BEFORE[freq]).to_numpy()
+        table = pd.DataFrame({stat: current, "previous_year": previous}, index=current.index)
+        table["change"] = table[stat] - table["previous_year"]
+        table["pct_change"] = table["change"] / table["previous_year"].where(table["previous_year"] != 0)
+        return table
+
+
+def daily_rollup(df, date_column="order_date", value_column="total_amount", refresh=False, cache=False):
+    """
+    Rollup journalier de df. cache=True : depuis le cache s'il correspond
+    toujours à df (mêmes règles que kpi_cube) ; refresh=True force alors le
+    recalcul.
+    """
+    if not cache:
+        return DailyRollup.from_frame(df, date_column, value_column)
+
+    key = id(df)
+    fingerprint = (_fingerprint(df, [date_column, value_column]), date_column, value_column)
+
+    entry = _CACHE.get(key)
+    if not refresh and entry is not None and entry[0]() is df and entry[1] == fingerprint:
+        return entry[2]
+
+    rollup = DailyRollup.from_frame(df, date_column, value_column)
+    _CACHE[key] = (weakref.ref(df, lambda _ref, key=key: _CACHE.pop(key, None)), fingerprint, rollup)
+    return rollup
+
+
+def clear_rollup_cache():
+    """Vide le cache des rollups."""
+    _CACHE.clear()
@@ -1,22 +1,26 @@
+from .kpi_cube import kpi_cube
+
+
 #(Q17–Q19)
-def summarize_total_amount(df):
+# Answered from the KPI cube (kpi_cube.py). cache=True reuses the cube of the
+# same DataFrame across calls (pipeline analysis stages, df not modified).
+def summarize_total_amount(df, cache=False):
     """Return mean, median, min, max of total_amount."""
-    col = df["total_amount"]
+    totals = kpi_cube(df, cache=cache, dimensions=[]).totals()
     return {
-        "mean": col.mean(),
-        "median": col.median(),
-        "min": col.min(),
-        "max": col.max()
+        "mean": totals["mean"],
+        "median": totals["median"],
+        "min": totals["min"],
+        "max": totals["max"]
     }
 
 
-def region_highest_average_total(df):
+def region_highest_average_total(df, cache=False):
     """Return region with highest average total_amount."""
-    return df.groupby("region")["total_amount"].mean().idxmax()#["total_amount"].mean()  → résultat : une Series 
-                                                               # où l’index = les régions les valeurs = la moyenne du total_amount
+    return kpi_cube(df, cache=cache, dimensions=["region"]).mean_by("region").idxmax()  # moyenne = somme / effectif par région
 
 
-def product_highest_revenue(df):
+def product_highest_revenue(df, cache=False):
     """Return product_id with highest total revenue."""
-    revenue = df.groupby("product_id")["total_amount"].sum()
+    revenue = kpi_cube(df, cache=cache, dimensions=["product_id"]).by("product_id")["sum"]
     return revenue.idxmax(), revenue.max()
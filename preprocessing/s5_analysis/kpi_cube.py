@@ -0,0 +1,180 @@
+import weakref
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.offsets import MonthEnd
+
+# ---------------------------------------------------------------------
+# Purpose of this file:
+# ---------------------------------------------------------------------
+# Cube de statistiques suffisantes pour les KPIs : somme, effectif (non-NaN),
+# nombre de commandes, min et max de total_amount par
+# région × catégorie × produit × mois, calculés en un seul groupby.
+#
+# compute_grouped_kpis, summarize_total_amount, region_highest_average_total,
+# product_highest_revenue et average_monthly_revenue répondent à partir de ce
+# cube (agrégation de quelques milliers de cellules au lieu d'un groupby sur
+# toutes les lignes).
+#
+#   cube = kpi_cube(df)          # un groupby sur df
+#   cube.by("region")            # sum / count / orders / min / max par région
+#   cube.totals()                # mêmes valeurs sur toutes les lignes
+#   cube.monthly()               # par mois (fin de mois, mois vides inclus)
+#
+# Par défaut chaque appel calcule un nouveau cube. cache=True (sur demande :
+# étapes d'analyse du pipeline, qui ne modifient pas df) réutilise le cube
+# déjà calculé pour le même DataFrame (référence faible : libéré avec le
+# DataFrame). Il est recalculé si le nombre de lignes, les colonnes ou l'une
+# des colonnes utilisées est remplacée (df[col] = ...). Une modification sur
+# place (df.loc[i, col] = ...) n'est pas détectée : refresh=True.
+
+DIMENSIONS = ["region", "product_category", "product_id"]
+MONTH = "month"
+
+# id(df) → (référence faible, empreinte, cube)
+_CACHE = {}
+
+
+def _column_token(series):
+    """Identité des données d'une colonne (change si la colonne est remplacée)."""
+    if isinstance(series.dtype, np.dtype):
+        return np.asarray(series).__array_interface__["data"][0]
+    return id(series.array)
+
+
+def _fingerprint(df, columns):
+    return (len(df), tuple(df.columns), tuple(_column_token(df[col]) for col in columns))
+
+
+class KpiCube:
+    """
+    Statistiques suffisantes de value_column par région × catégorie × produit
+    × mois (dimensions présentes dans df), et moyenne et médiane globales
+    (Series.mean, Series.median : mêmes arrondis que pandas).
+
+    dimensions (list, optionnel) : sous-ensemble de DIMENSIONS + [MONTH]
+    (ex. [] pour totals() seulement) ; par défaut toutes.
+    """
+
+    def __init__(self, df, date_column="order_date", value_column="total_amount", dimensions=None):
+        self.date_column = date_column
+        self.value_column = value_column
+        wanted = DIMENSIONS + [MONTH] if dimensions is None else list(dimensions)
+
+        values = df[value_column]
+        keys = {dim: df[dim] for dim in DIMENSIONS if dim in wanted and dim in df.columns}
+        if (MONTH in wanted and date_column in df.columns
+                and pd.api.types.is_datetime64_dtype(df[date_column])):
+            self.date_unit = df[date_column].dt.unit
+            keys[MONTH] = df[date_column].to_numpy().astype("datetime64[M]")
+        if not keys:
+            # Aucune dimension : une seule cellule
+            keys["all"] = np.zeros(len(df), dtype="int8")
+
+        orders = df["order_id"].notna() if "order_id" in df.columns else True
+        frame = pd.DataFrame({"value": values, "order": orders})
+        grouped = frame.groupby(list(keys.values()), observed=True, dropna=False, sort=False)
+        self.cells = grouped.agg(
+            sum=("value", "sum"),
+            count=("value", "count"),
+            orders=("order", "sum"),
+            min=("value", "min"),
+            max=("value", "max"),
+        )
+        self.cells.index.names = list(keys)
+        self.mean = values.mean()
+        self.median = values.median()
+        self._tables = {}
+
+    def _rollup(self, cells):
+        return {
+            "sum": cells["sum"].sum(),
+            "count": int(cells["count"].sum()),
+            "orders": int(cells["orders"].sum()),
+            "min": cells["min"].min(),
+            "max": cells["max"].max(),
+        }
+
+    def totals(self):
+        """sum, count, orders, min, max sur toutes les lignes (+ mean, median)."""
+        totals = self._rollup(self.cells)
+        totals["mean"] = self.mean
+        totals["median"] = self.median
+        return totals
+
+    def by(self, dimension):
+        """sum, count, orders, min, max par valeur de dimension (NaN exclus, trié)."""
+        if dimension not in self.cells.index.names:
+            raise KeyError(dimension)
+        if dimension not in self._tables:
+            table = self.cells.groupby(level=dimension, observed=True).agg(
+                {"sum": "sum", "count": "sum", "orders": "sum", "min": "min", "max": "max"}
+            )
+            self._tables[dimension] = table.astype({"count": "int64", "orders": "int64"})
+        return self._tables[dimension].copy()
+
+    def mean_by(self, dimension):
+        table = self.by(dimension)
+        return table["sum"] / table["count"].where(table["count"] > 0)
+
+    def monthly(self):
+        """
+        sum, count par mois, indexé par la fin de mois comme resample("ME") :
+        mois sans ligne inclus (somme 0, effectif 0), dates manquantes exclues.
+        """
+        table = self.by(MONTH)[["sum", "count"]]
+        table.index = (pd.DatetimeIndex(table.index) + MonthEnd(0)).as_unit(self.date_unit)
+        if len(table):
+            table = table.reindex(pd.date_range(table.index.min(), table.index.max(), freq="ME",
+                                                unit=self.date_unit), fill_value=0)
+        table.index.name = self.date_column
+        return table
+
+    def aggregates(self):
+        """Agrégats additifs au format de mergeable_kpis (dimensions présentes)."""
+        totals = self.totals()
+        aggregates = {
+            "total": {
+                "sum": float(totals["sum"]),
+                "count": totals["count"],
+                "min": float(totals["min"]) if totals["count"] else np.nan,
+                "max": float(totals["max"]) if totals["count"] else np.nan,
+            },
+        }
+        names = self.cells.index.names
+        for name, dimension in (("region", "region"), ("category", "product_category")):
+            if dimension in names:
+                aggregates[name] = self.by(dimension)[["sum", "count", "orders"]]
+        if "product_id" in names:
+            aggregates["product"] = self.by("product_id")[["sum"]]
+        if MONTH in names:
+            aggregates["monthly"] = self.monthly()
+        return aggregates
+
+
+def kpi_cube(df, refresh=False, date_column="order_date", value_column="total_amount", cache=False,
+             dimensions=None):
+    """
+    Cube des KPIs de df, limité à dimensions si elles sont données. cache=True :
+    cube complet, depuis le cache s'il correspond toujours à df (voir l'en-tête
+    du fichier) ; refresh=True force alors le recalcul.
+    """
+    if not cache:
+        return KpiCube(df, date_column, value_column, dimensions)
+
+    key = id(df)
+    columns = [col for col in [value_column, "order_id", date_column] + DIMENSIONS if col in df.columns]
+    fingerprint = (_fingerprint(df, columns), date_column, value_column)
+
+    entry = _CACHE.get(key)
+    if not refresh and entry is not None and entry[0]() is df and entry[1] == fingerprint:
+        return entry[2]
+
+    cube = KpiCube(df, date_column, value_column)
+    _CACHE[key] = (weakref.ref(df, lambda _ref, key=key: _CACHE.pop(key, None)), fingerprint, cube)
+    return cube
+
+
+def clear_kpi_cache():
+    """Vide le cache des cubes."""
+    _CACHE.clear()
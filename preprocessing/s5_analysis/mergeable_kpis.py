@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+from .kpi_cube import kpi_cube
+
+# ---------------------------------------------------------------------
+# Purpose of this file:
+# ---------------------------------------------------------------------
+# KPIs de compute_grouped_kpis et analyze_time_series à partir d'agrégats
+# additifs (sommes, effectifs, min / max). Les agrégats de deux lots de
+# lignes se fusionnent par addition : le mode incrémental les garde d'un
+# passage à l'autre et n'agrège que les nouvelles lignes.
+#
+#   aggregates = kpi_aggregates(df)          # depuis le cube des KPIs (kpi_cube.py)
+#   aggregates = merge_kpi_aggregates(old, aggregates)
+#   kpis, time_series = kpis_from_aggregates(aggregates, median)
+
+
+def kpi_aggregates(df, date_column="order_date", value_column="total_amount"):
+    """
+    Agrégats additifs de df :
+        region / category : somme, effectif (non-NaN) et nombre de commandes
+        product : chiffre d'affaires par produit
+        monthly : somme et effectif par mois (fin de mois)
+        total : somme, effectif, min, max de value_column
+    """
+    return kpi_cube(df, date_column=date_column, value_column=value_column).aggregates()
+
+
+def merge_kpi_aggregates(old, new):
+    """Fusionne deux jeux d'agrégats (old peut être None)."""
+    if old is None:
+        return new
+
+    merged = {}
+    for name in ("region", "category", "product", "monthly"):
+        frame = old[name].add(new[name], fill_value=0)
+        counts = [col for col in ("count", "orders") if col in frame.columns]
+        merged[name] = frame.astype({col: "int64" for col in counts})
+
+    merged["total"] = {
+        "sum": old["total"]["sum"] + new["total"]["sum"],
+        "count": old["total"]["count"] + new["total"]["count"],
+        "min": np.fmin(old["total"]["min"], new["total"]["min"]),
+        "max": np.fmax(old["total"]["max"], new["total"]["max"]),
+    }
+    return merged
+
+
+def _group_kpis(sums, key):
+    table = pd.DataFrame({
+        "Total_Revenue": sums["sum"],
+        "Avg_Order_Value": sums["sum"] / sums["count"].where(sums["count"] > 0),
+        "Order_Count": sums["orders"],
+    })
+    table.index.name = key
+    return table.sort_values(by="Total_Revenue", ascending=False)
+
+
+def _float(value):
+    """Statistique en float (NaN pour NA : colonne Float64 vide ou sans valeur)."""
+    return np.nan if pd.isna(value) else float(value)
+
+
+def grouped_kpis_from_aggregates(aggregates, median, value_column="total_amount", mean=None):
+    """
+    Résultat de compute_grouped_kpis à partir des agrégats (sans monthly).
+    mean : moyenne de value_column si elle est connue (Series.mean) ; sinon
+    somme / effectif, qui peut différer de Series.mean au dernier chiffre.
+    """
+    total = aggregates["total"]
+    if mean is None:
+        mean = total["sum"] / total["count"] if total["count"] else np.nan
+    total_amount_stats = pd.Series({
+        "mean": _float(mean),
+        "median": _float(median),
+        "min": total["min"],
+        "max": total["max"],
+    }, name=value_column)
+
+    top_5_products = aggregates["product"]["sum"].nlargest(5).rename(value_column)
+    top_5_products.index.name = "product_id"
+
+    return {
+        "total_amount_stats": total_amount_stats,
+        "region_analysis": _group_kpis(aggregates["region"], "region"),
+        "category_analysis": _group_kpis(aggregates["category"], "product_category"),
+        "top_5_products": top_5_products,
+    }
+
+
+def kpis_from_aggregates(aggregates, median, date_column="order_date",
+                         value_column="total_amount"):
+    """
+    Résultats de compute_grouped_kpis et analyze_time_series (sans le
+    graphique) à partir des agrégats. median : médiane de value_column, seule
+    statistique non additive (ex. OutlierStats.median()).
+
+    Returns:
+        (kpis, time_series) : mêmes clés que les deux fonctions d'origine
+    """
+    kpis = grouped_kpis_from_aggregates(aggregates, median, value_column)
+
+    # Mois sans commande : chiffre d'affaires 0 et panier moyen NaN (comme resample)
+    monthly = aggregates["monthly"]
+    if len(monthly):
+        months = pd.date_range(monthly.index.min(), monthly.index.max(), freq="ME", name=date_column)
+        monthly = monthly.reindex(months, fill_value=0)
+
+    monthly_revenue = monthly["sum"].rename(value_column)
+    monthly_aov = (monthly["sum"] / monthly["count"].where(monthly["count"] > 0)).rename(value_column)
+
+    time_series = {
+        "monthly_revenue": monthly_revenue,
+        "monthly_aov": monthly_aov,
+        "best_month": monthly_revenue.idxmax() if len(monthly_revenue) else None,
+        "best_month_revenue": monthly_revenue.max() if len(monthly_revenue) else np.nan,
+        "monthly_revenue_alt": monthly_revenue.copy(),
+    }
+    return kpis, time_series
@@ -1,62 +1,75 @@
 import pandas as pd
-import matplotlib.pyplot as plt
 
-def analyze_time_series(df, date_column="order_date", value_column="total_amount"):
+from .daily_rollups import daily_rollup
+
+def analyze_time_series(df, date_column="order_date", value_column="total_amount", cache=False):
     """
     Performs full time-series analysis:
-    
-    1. Sets datetime index
+
+    1. Builds the daily rollups (daily_rollups.py; cache=True reuses those
+       of the same DataFrame, e.g. in the pipeline analysis stages)
     2. Computes monthly total revenue
     3. Computes monthly average order value
-    4. Computes same KPIs using Grouper (optional)
-    5. Identifies best-performing month
-    6. Generates monthly revenue trend plot
-    
+    4. Identifies best-performing month
+
+    The monthly revenue trend plot is a separate step (plot_time_series).
+
     Returns:
         dict with:
             - monthly_revenue
             - monthly_aov
             - best_month
             - best_month_revenue
-            - monthly_revenue_alt (Grouper version)
+            - monthly_revenue_alt (alias of monthly_revenue, kept for
+              callers of the former Grouper version)
     """
 
-    df = df.copy()
-
-    # 1️⃣ Set index to datetime column
-    df.set_index(date_column, inplace=True)
-    df.sort_index(inplace=True)
+    # 1️⃣ Daily sum / count / min / max, one sorted pass (df is not copied or modified)
+    rollup = daily_rollup(df, date_column, value_column, cache=cache)
 
     # 2️⃣ Monthly total revenue
-    monthly_revenue = df[value_column].resample("ME").sum()
+    monthly_revenue = rollup.series("ME", "sum")
 
     # 3️⃣ Monthly AOV
-    monthly_aov = df[value_column].resample("ME").mean()
-
-    # 4️⃣ Alternative method (Grouper)
-    df_reset = df.reset_index()
-    monthly_revenue_alt = df_reset.groupby(
-        pd.Grouper(key=date_column, freq="ME")
-    )[value_column].sum()
+    monthly_aov = rollup.series("ME", "mean")
 
-    # 5️⃣ Best performing month
+    # 4️⃣ Best performing month
     best_month = monthly_revenue.idxmax()
     best_month_revenue = monthly_revenue.max()
 
-    # 6️⃣ Plot trend
-    plt.figure(figsize=(12, 6))
-    monthly_revenue.plot(kind='line', marker='o')
-    plt.title("Monthly Total Revenue Trend")
-    plt.xlabel("Month")
-    plt.ylabel("Total Revenue (MAD)")
-    plt.grid(True)
-    plt.savefig("monthly_revenue_trend.png")
-    plt.close()
-
     return {
         "monthly_revenue": monthly_revenue,
         "monthly_aov": monthly_aov,
         "best_month": best_month,
         "best_month_revenue": best_month_revenue,
-        "monthly_revenue_alt": monthly_revenue_alt
+        "monthly_revenue_alt": monthly_revenue.copy()
     }
+
+
+def plot_time_series(data, path="monthly_revenue_trend.png", title="Monthly Total Revenue Trend",
+                     ylabel="Total Revenue (MAD)", cache=False):
+    """
+    Saves the trend plot of a series (e.g. rollup.series("W", "sum")), of the
+    analyze_time_series results (monthly_revenue) or of a cleaned DataFrame
+    (monthly revenue from its daily rollups, cache as in analyze_time_series).
+    Needs matplotlib.
+
+    Returns:
+        str: path of the saved image
+    """
+    import matplotlib.pyplot as plt
+
+    if isinstance(data, pd.DataFrame):
+        data = daily_rollup(data, cache=cache).series("ME", "sum")
+    elif isinstance(data, dict):
+        data = data["monthly_revenue"]
+
+    plt.figure(figsize=(12, 6))
+    data.plot(kind='line', marker='o')
+    plt.title(title)
+    plt.xlabel("Month" if getattr(data.index, "freqstr", None) == "ME" else "Date")
+    plt.ylabel(ylabel)
+    plt.grid(True)
+    plt.savefig(path)
+    plt.close()
+    return path
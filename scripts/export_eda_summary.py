@@ -2,6 +2,8 @@ import pandas as pd
 import argparse
 import numpy as np
 import os
+from preprocessing.s1_loading.loading import load_data
+from preprocessing.s3_cleaning.outlier_stats import OutlierStats, mad_outliers
 # -------------------------------------------------
 # Purpose of this file:
 # -------------------------------------------------
@@ -9,24 +11,19 @@ import os
 # not to run the entire preprocessing suite.
 # -------------------------------------------------
 
-def mad_outlier_count(df):
+def mad_outlier_count(df, rank_error=None):
     """
     Detect outliers using the MAD (Median Absolute Deviation) method.
-    Returns the count of outliers in total_amount.
+    Returns the count of outliers in total_amount (missing values ignored).
+
+    rank_error: approximate median / MAD from a quantile sketch
+    (None: exact values).
     """
     col = df["total_amount"]
 
-    median = col.median()
-    mad = np.median(np.abs(col - median))
-
-    # Avoid division by zero
-    if mad == 0:
-        return 0
-
-    modified_z_scores = 0.6745 * (col - median) / mad
-
-    outliers = np.abs(modified_z_scores) > 3.5
-    return outliers.sum()
+    stats = OutlierStats(rank_error).update(col)
+    outliers = mad_outliers(col.to_numpy(dtype="float64", na_value=np.nan), stats.median(), stats.mad())
+    return int(outliers.sum())
 
 
 def generate_eda_report(df, output_path):
@@ -66,14 +63,18 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Export EDA summary to text file.")
 
     parser.add_argument("--input", type=str, required=True,
-                        help="Path to the cleaned CSV file")
+                        help="Path to the cleaned file (.csv, .parquet, .feather/.arrow)")
 
     parser.add_argument("--output", type=str, required=True,
                         help="Where to save the report")
 
     args = parser.parse_args()
 
-    df = pd.read_csv(args.input)
+    # Cleaned CSV files are comma-separated; other formats go through load_data
+    if args.input.endswith(".csv"):
+        df = pd.read_csv(args.input)
+    else:
+        df = load_data(args.input)
     path = generate_eda_report(df, args.output)
 
     print(f"EDA summary saved to {path}")
\ No newline at end of file
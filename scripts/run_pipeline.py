@@ -3,7 +3,10 @@ import logging
 import os
 from tqdm import tqdm
 import pandas as pd
-from preprocessing.pipeline import full_preprocessing
+from preprocessing.pipeline import full_preprocessing, full_preprocessing_chunked, full_preprocessing_incremental
+from preprocessing.s1_loading.loading import save_data
+from preprocessing.pipeline.instrumentation import PipelineTracer
+from preprocessing.pipeline.quality import QualityReport
 
 # -------------------------------------------------
 #  Purpose of this file:
@@ -11,6 +14,28 @@ from preprocessing.pipeline import full_preprocessing
 #📌 Automating the cleaning process without opening Jupyter Notebook
 #📌 Make sure the Command is like this :
 #   python scripts/run_pipeline.py --input data/morocco_ecommerce.csv --output results/clean.csv
+#📌 For very large exports, stream the file by blocks of N rows :
+#   python scripts/run_pipeline.py --input big.csv --output results/clean.csv --chunksize 500000
+#📌 The output format follows the extension (.csv, .parquet, .feather/.arrow, .xlsx, .json);
+#   Parquet/Arrow keep the dtypes (Int64 quantity, datetime dates, categories) :
+#   python scripts/run_pipeline.py --input data/morocco_ecommerce.csv --output results/clean.parquet
+#📌 Choose the stages with a JSON config (only / skip stages or groups, test_mode, ...) :
+#   python scripts/run_pipeline.py --input ... --output ... --config config/cleaning_only.json
+#📌 The run is silent by default; print every cleaning diagnostic with --test-mode, or save a
+#   sampled quality report (changed / filled values per stage, examples) as JSON :
+#   python scripts/run_pipeline.py --input ... --output ... --quality results/quality.json
+#📌 Run the independent column stages in parallel (threads, or processes for Python-heavy steps) :
+#   python scripts/run_pipeline.py --input ... --output ... --workers 8 --backend process
+#📌 Run the heavy cleaning / feature stages with the PyArrow implementations (same output) :
+#   python scripts/run_pipeline.py --input ... --output ... --engine pyarrow
+#📌 Daily feed: process only the rows added since the last run and append them to the output :
+#   python scripts/run_pipeline.py --input data/orders.csv --output results/clean.csv --state results/state
+#📌 Approximate IQR quantiles with a fixed-size sketch (chunked / incremental modes, target rank error) :
+#   python scripts/run_pipeline.py --input big.csv --output results/clean.csv --chunksize 500000 --rank-error 0.001
+#📌 Keep intermediate results on disk; a rerun skips every stage group whose inputs did not change :
+#   python scripts/run_pipeline.py --input ... --output ... --cache results/stage_cache
+#📌 Per-stage timings (JSON) and a Chrome trace (chrome://tracing, ui.perfetto.dev) :
+#   python scripts/run_pipeline.py --input ... --output ... --timings results/timings.json --trace results/trace.json
 
 
 
@@ -45,7 +70,20 @@ def validate_output_folder(path):
 # -------------------------------------------------
 # Main run function
 # -------------------------------------------------
-def run_pipeline(input_path, output_path):
+def progress_callback(bar):
+    """Tracer callback: one tick of the progress bar per finished stage."""
+    def callback(event, record):
+        if event == "start":
+            bar.set_description(record["stage"][:30])
+        else:
+            bar.update(1)
+    return callback
+
+
+def run_pipeline(input_path, output_path, chunksize=None, categorical=False,
+                 timings_path=None, trace_path=None, config_path=None,
+                 test_mode=False, quality_path=None, workers=None, backend="thread",
+                 state_path=None, rank_error=None, engine="pandas", cache_path=None):
 
     try:
         logging.info("🔍 Starting pipeline...")
@@ -54,26 +92,51 @@ def run_pipeline(input_path, output_path):
         validate_input_file(input_path)
         validate_output_folder(output_path)
 
-        # Progress bar
-        steps = [
-            "Loading + Inspecting",
-            "Missing Values",
-            "Duplicates",
-            "String Cleaning",
-            "Datetime",
-            "Outliers",
-            "Exporting"
-        ]
-
-        for _ in tqdm(range(len(steps)), desc="Processing", ncols=80):
-            pass
-
-        # Run full pipeline
-        cleaned_df = full_preprocessing(input_path)
-
-        # Save cleaned data
-        cleaned_df.to_csv(output_path, index=False)
-        logging.info(f"✨ Cleaned dataset saved to: {output_path}")
+        # Progress bar driven by the real pipeline stages
+        with tqdm(desc="Processing", unit="stage", ncols=80) as bar:
+            tracer = PipelineTracer(callbacks=[progress_callback(bar)], log_level=logging.DEBUG)
+
+            if state_path:
+                # Incremental mode: only the rows added since the last run
+                summary = full_preprocessing_incremental(input_path, output_path, state_path, tracer=tracer,
+                                                         rank_error=rank_error)
+                logging.info(f"✨ {summary['rows_out']} new cleaned rows appended to: {output_path} "
+                             f"({summary['rows_total']} rows in total)")
+                kpis = summary["kpis"]
+                if kpis is not None:
+                    logging.info("Regional KPIs (all runs):\n" + kpis["region_analysis"].to_string())
+            elif chunksize:
+                # Streaming mode: output is written block by block
+                summary = full_preprocessing_chunked(input_path, output_path, chunksize, tracer=tracer,
+                                                     workers=workers, backend=backend, rank_error=rank_error,
+                                                     engine=engine)
+                logging.info(f"✨ {summary['rows_out']} cleaned rows saved to: {output_path}")
+            else:
+                # Run full pipeline
+                quality = QualityReport() if quality_path else None
+                cleaned_df = full_preprocessing(input_path, categorical=categorical, tracer=tracer,
+                                                config=config_path, test_mode=test_mode,
+                                                quality=quality, workers=workers, backend=backend,
+                                                engine=engine, cache=cache_path)
+
+                # Save cleaned data (format from the file extension)
+                tracer.run("save_data", save_data, cleaned_df, output_path)
+                logging.info(f"✨ Cleaned dataset saved to: {output_path}")
+
+                if quality is not None:
+                    quality.to_json(quality_path)
+                    logging.info(f"Quality report saved to: {quality_path}")
+
+        # Stage summary (slowest first)
+        table = tracer.summary(by_stage=True).sort_values("wall_s", ascending=False)
+        logging.info("⏱ Stage timings:\n" + table.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+
+        if timings_path:
+            tracer.to_json(timings_path)
+            logging.info(f"Stage timings saved to: {timings_path}")
+        if trace_path:
+            tracer.to_chrome_trace(trace_path)
+            logging.info(f"Chrome trace saved to: {trace_path}")
 
         logging.info("🎉 Pipeline completed successfully.")
 
@@ -89,11 +152,52 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Run full data preprocessing pipeline.")
 
     parser.add_argument("--input", type=str, required=True,
-                        help="Path to input CSV file")
+                        help="Path to input file (.csv, .json, .xlsx, .parquet, .feather/.arrow)")
 
     parser.add_argument("--output", type=str, required=True,
-                        help="Path to save cleaned CSV file")
+                        help="Path to save cleaned file (.csv, .parquet, .feather/.arrow, .xlsx, .json)")
+
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="Process the input by blocks of N rows (bounded memory)")
+
+    parser.add_argument("--categorical", action="store_true",
+                        help="Store low-cardinality text columns (region, city, ...) as categories")
+
+    parser.add_argument("--timings", type=str, default=None,
+                        help="Save per-stage timings (wall, CPU, rows, memory) as JSON")
+
+    parser.add_argument("--trace", type=str, default=None,
+                        help="Save a Chrome trace file of the pipeline stages")
+
+    parser.add_argument("--config", type=str, default=None,
+                        help="JSON pipeline config: stages to run or skip, test_mode, fuse")
+
+    parser.add_argument("--test-mode", action="store_true",
+                        help="Print the diagnostics of every cleaning step (slower)")
+
+    parser.add_argument("--quality", type=str, default=None,
+                        help="Save a sampled data quality report as JSON")
+
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Run independent column stages in parallel on N workers")
+
+    parser.add_argument("--backend", choices=["thread", "process"], default="thread",
+                        help="Parallel backend used with --workers (default: thread)")
+
+    parser.add_argument("--state", type=str, default=None,
+                        help="Incremental mode: state folder kept between runs, only new rows are processed")
+
+    parser.add_argument("--rank-error", type=float, default=None,
+                        help="Chunked / incremental modes: approximate IQR quantiles with this rank error (default: exact)")
+
+    parser.add_argument("--engine", choices=["pandas", "pyarrow"], default="pandas",
+                        help="Implementation of the heavy cleaning / feature stages (default: pandas)")
+
+    parser.add_argument("--cache", type=str, default=None,
+                        help="Stage result cache folder: reruns resume after the last unchanged stage group")
 
     args = parser.parse_args()
 
-    run_pipeline(args.input, args.output)
+    run_pipeline(args.input, args.output, args.chunksize, args.categorical,
+                 args.timings, args.trace, args.config, args.test_mode, args.quality,
+                 args.workers, args.backend, args.state, args.rank_error, args.engine, args.cache)